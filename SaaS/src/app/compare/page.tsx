@@ -170,7 +170,32 @@ export default function ComparePage() {
         throw new Error(errorData.detail || 'Failed to process contracts');
       }
 
-      const data = await response.json();
+      const { job_id: jobId } = await response.json();
+      console.log('Queued analysis job:', jobId);
+
+      // Poll the job until the analysis finishes
+      let data: any = null;
+      while (!data) {
+        await new Promise(resolve => setTimeout(resolve, 2000));
+        const jobResponse = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/jobs/${jobId}`, {
+          headers: {
+            'Authorization': `Bearer ${session.access_token}`
+          }
+        });
+
+        if (!jobResponse.ok) {
+          const errorData = await jobResponse.json();
+          throw new Error(errorData.detail || 'Failed to check analysis status');
+        }
+
+        const job = await jobResponse.json();
+        if (job.status === 'failed') {
+          throw new Error(job.error || 'Failed to process contracts');
+        }
+        if (job.status === 'completed') {
+          data = job;
+        }
+      }
       console.log('Success response:', data);
 
       if (!data) {
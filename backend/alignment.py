@@ -0,0 +1,335 @@
+import os
+import re
+import math
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from structure import NUMBERED_HEADING, KEYWORD_HEADING, is_heading
+
+# Pairs scoring below this are reported as unmatched instead of aligned
+ALIGNMENT_MIN_SIMILARITY = float(os.environ.get("ALIGNMENT_MIN_SIMILARITY", "0.2"))
+# Weight of heading similarity when both clauses have a heading
+HEADING_WEIGHT = 0.3
+
+MISSING_CLAUSE = "(no corresponding clause)"
+
+# Bump when segmentation changes so stored clauses are cut again
+SEGMENTER_VERSION = 2
+
+WORD = re.compile(r"[a-z][a-z0-9']+")
+STOPWORDS = {
+    "the", "and", "of", "to", "in", "or", "a", "an", "for", "by", "be", "is",
+    "are", "on", "with", "as", "at", "any", "such", "this", "that", "shall",
+    "will", "may", "its", "it", "all", "from", "under", "not", "which",
+}
+
+
+@dataclass
+class Clause:
+    index: int
+    heading: Optional[str]
+    text: str
+
+
+@dataclass
+class AlignedClause:
+    buyer: Optional[Clause]
+    seller: Optional[Clause]
+    score: float = 0.0
+
+    @property
+    def status(self) -> str:
+        if self.buyer and self.seller:
+            return "matched"
+        return "buyer_only" if self.buyer else "seller_only"
+
+
+def tokenize(text: str) -> List[str]:
+    return [word for word in WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+def split_oversized(text: str, max_size: int, length: Callable[[str], int] = len) -> List[str]:
+    """Split ``text`` into parts of at most ``max_size`` as measured by ``length``.
+
+    Splits fall on paragraph breaks where possible, then on sentence
+    boundaries, and only cut mid-sentence as a last resort.
+    """
+    if length(text) <= max_size:
+        return [text]
+    parts = []
+    current = ""
+    current_size = 0
+    pieces = [
+        sentence
+        for paragraph in text.split("\n")
+        for sentence in (
+            [paragraph] if length(paragraph) <= max_size
+            else re.split(r"(?<=[.;:])\s+", paragraph)
+        )
+    ]
+    for piece in pieces:
+        piece_size = length(piece)
+        while piece_size > max_size:
+            if current:
+                parts.append(current)
+                current, current_size = "", 0
+            cut = max(1, len(piece) * max_size // piece_size)
+            parts.append(piece[:cut])
+            piece = piece[cut:]
+            piece_size = length(piece)
+        if current and current_size + piece_size > max_size:
+            parts.append(current)
+            current, current_size = piece, piece_size
+        else:
+            current = f"{current} {piece}" if current else piece
+            current_size += piece_size
+    if current:
+        parts.append(current)
+    return parts
+
+
+class ClauseSegmenter:
+    """Incrementally split contract text into clauses at heading lines.
+
+    Lines are fed one at a time, so segmentation can run while later pages
+    are still being extracted. Clauses larger than ``max_size`` are split at
+    sentence boundaries into continuation clauses with the same heading,
+    which also bounds clause size for documents without detectable headings.
+    """
+
+    def __init__(self, max_size: int, length: Callable[[str], int] = len):
+        self.max_size = max_size
+        self.length = length
+        self.count = 0
+        self.heading = None
+        self.lines = []
+        self.size = 0
+
+    def feed(self, line: str) -> List[Clause]:
+        clauses = []
+        if is_heading(line) and self.lines:
+            clauses = self.flush()
+        if not self.lines and is_heading(line):
+            self.heading = line.strip()
+        if line.strip():
+            self.lines.append(line.strip())
+            self.size += self.length(line)
+        if self.size > self.max_size:
+            clauses.extend(self.flush(keep_heading=True))
+        return clauses
+
+    def flush(self, keep_heading: bool = False) -> List[Clause]:
+        """Emit the buffered clause.
+
+        With ``keep_heading`` the clause is still open: only full-size parts
+        are emitted and the remainder stays buffered under the same heading.
+        """
+        text = " ".join(" ".join(self.lines).split())
+        heading = self.heading
+        parts = split_oversized(text, self.max_size, self.length) if text else []
+        self.lines = []
+        self.size = 0
+        if keep_heading:
+            if parts:
+                remainder = parts.pop()
+                self.lines = [remainder]
+                self.size = self.length(remainder)
+        else:
+            self.heading = None
+        clauses = []
+        for part in parts:
+            clauses.append(Clause(index=self.count, heading=heading, text=part))
+            self.count += 1
+        return clauses
+
+
+def iter_clauses(text_stream: Iterable[str], max_size: int, length: Callable[[str], int] = len) -> Iterator[Clause]:
+    """Yield clauses from a stream of raw extracted text as each one completes."""
+    segmenter = ClauseSegmenter(max_size, length)
+    pending = ""
+    for piece in text_stream:
+        pending += piece
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield from segmenter.feed(line)
+    if pending:
+        yield from segmenter.feed(pending)
+    yield from segmenter.flush()
+
+
+def segment_clauses(text: str, max_size: int, length: Callable[[str], int] = len) -> List[Clause]:
+    """Split raw extracted text into clauses.
+
+    Uses the same ``ClauseSegmenter`` as ``iter_clauses`` on the buyer side,
+    so identical text is cut at the same points however it is paged.
+    """
+    return list(iter_clauses([text], max_size, length))
+
+
+def heading_tokens(heading: Optional[str]) -> set:
+    if not heading:
+        return set()
+    heading = NUMBERED_HEADING.sub("", heading)
+    heading = KEYWORD_HEADING.sub("", heading)
+    return set(tokenize(" ".join(heading.split()[:8])))
+
+
+class ClauseIndex:
+    """Local TF-IDF index over seller clauses for finding buyer counterparts.
+
+    IDF is computed from the seller clauses alone, so buyer clauses can be
+    matched one at a time as they are extracted.
+    """
+
+    def __init__(self, clauses: List[Clause]):
+        self.clauses = clauses
+        document_frequency = Counter()
+        for clause in clauses:
+            document_frequency.update(set(tokenize(clause.text)))
+        count = len(clauses)
+        self.default_idf = math.log(1 + count) + 1
+        self.idf = {
+            term: math.log((1 + count) / (1 + df)) + 1
+            for term, df in document_frequency.items()
+        }
+        self.postings = defaultdict(list)
+        for position, clause in enumerate(clauses):
+            for term, weight in self.vectorize(clause.text).items():
+                self.postings[term].append((position, weight))
+        self.headings = [heading_tokens(clause.heading) for clause in clauses]
+
+    def vectorize(self, text: str) -> dict:
+        counts = Counter(tokenize(text))
+        vector = {
+            term: (1 + math.log(tf)) * self.idf.get(term, self.default_idf)
+            for term, tf in counts.items()
+        }
+        norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+        return {term: w / norm for term, w in vector.items()}
+
+    def scores(self, clause: Clause) -> dict:
+        """Return ``{seller_position: similarity}`` for candidate seller clauses."""
+        content = defaultdict(float)
+        for term, weight in self.vectorize(clause.text).items():
+            for position, seller_weight in self.postings.get(term, ()):
+                content[position] += weight * seller_weight
+
+        heading = heading_tokens(clause.heading)
+        if not heading:
+            return dict(content)
+
+        scores = {}
+        for position, seller_heading in enumerate(self.headings):
+            if seller_heading:
+                overlap = len(heading & seller_heading) / len(heading | seller_heading)
+                score = (1 - HEADING_WEIGHT) * content.get(position, 0.0) + HEADING_WEIGHT * overlap
+            else:
+                score = content.get(position, 0.0)
+            if score > 0:
+                scores[position] = score
+        return scores
+
+
+def align_clauses(buyer_clauses: List[Clause], seller_clauses: List[Clause], min_similarity: float = ALIGNMENT_MIN_SIMILARITY) -> List[AlignedClause]:
+    """Match buyer clauses to seller clauses by heading and content similarity.
+
+    Pairs are assigned greedily from the most similar down. Buyer clauses are
+    returned in document order, followed by seller clauses that have no
+    counterpart in the buyer contract.
+    """
+    index = ClauseIndex(seller_clauses)
+    candidates = []
+    for buyer_position, clause in enumerate(buyer_clauses):
+        for seller_position, score in index.scores(clause).items():
+            if score >= min_similarity:
+                candidates.append((score, buyer_position, seller_position))
+    candidates.sort(key=lambda candidate: -candidate[0])
+
+    matches = {}
+    used = set()
+    for score, buyer_position, seller_position in candidates:
+        if buyer_position in matches or seller_position in used:
+            continue
+        matches[buyer_position] = (seller_position, score)
+        used.add(seller_position)
+
+    aligned = []
+    for buyer_position, clause in enumerate(buyer_clauses):
+        if buyer_position in matches:
+            seller_position, score = matches[buyer_position]
+            aligned.append(AlignedClause(clause, seller_clauses[seller_position], score))
+        else:
+            aligned.append(AlignedClause(clause, None))
+    aligned.extend(
+        AlignedClause(None, clause)
+        for position, clause in enumerate(seller_clauses)
+        if position not in used
+    )
+    log_alignment(aligned)
+    return aligned
+
+
+def iter_align(buyer_clauses: Iterable[Clause], seller_clauses: List[Clause], min_similarity: float = ALIGNMENT_MIN_SIMILARITY, index: Optional[ClauseIndex] = None) -> Iterator[AlignedClause]:
+    """Streaming variant of ``align_clauses``.
+
+    Each buyer clause is matched to its best unused seller clause as it
+    arrives. Unmatched seller clauses are yielded once the buyer stream ends.
+    Pass a prebuilt ``index`` of ``seller_clauses`` to reuse it across calls.
+    """
+    index = index or ClauseIndex(seller_clauses)
+    used = set()
+    aligned = []
+    for clause in buyer_clauses:
+        best = None
+        for position, score in index.scores(clause).items():
+            if position not in used and score >= min_similarity and (best is None or score > best[1]):
+                best = (position, score)
+        if best:
+            used.add(best[0])
+            pair = AlignedClause(clause, seller_clauses[best[0]], best[1])
+        else:
+            pair = AlignedClause(clause, None)
+        aligned.append(pair)
+        yield pair
+    for position, clause in enumerate(seller_clauses):
+        if position not in used:
+            pair = AlignedClause(None, clause)
+            aligned.append(pair)
+            yield pair
+    log_alignment(aligned)
+
+
+def log_alignment(aligned: List[AlignedClause]):
+    counts = Counter(pair.status for pair in aligned)
+    print(
+        f"Aligned clauses: {counts['matched']} matched, "
+        f"{counts['buyer_only']} buyer-only, {counts['seller_only']} seller-only"
+    )
+
+
+def pack_aligned_pairs(aligned: Iterable[AlignedClause], max_size: int, length: Callable[[str], int] = len) -> Iterator[tuple]:
+    """Pack aligned clauses into ``(buyer_chunk, seller_chunk)`` request pairs.
+
+    Corresponding clauses share a ``[Clause n]`` label on both sides, and a
+    clause present on only one side is paired with a placeholder. A pair is
+    emitted as soon as adding the next clause would push the combined size of
+    both sides, as measured by ``length``, over ``max_size``.
+    """
+    buyer_parts, seller_parts = [], []
+    size = 0
+    for number, pair in enumerate(aligned, 1):
+        label = f"[Clause {number}]"
+        buyer_part = f"{label} {pair.buyer.text if pair.buyer else MISSING_CLAUSE}"
+        seller_part = f"{label} {pair.seller.text if pair.seller else MISSING_CLAUSE}"
+        # Account for the blank line that separates clauses on each side
+        part_size = length(buyer_part) + length(seller_part) + 2 * length("\n\n")
+        if buyer_parts and size + part_size > max_size:
+            yield "\n\n".join(buyer_parts), "\n\n".join(seller_parts)
+            buyer_parts, seller_parts = [], []
+            size = 0
+        buyer_parts.append(buyer_part)
+        seller_parts.append(seller_part)
+        size += part_size
+    if buyer_parts:
+        yield "\n\n".join(buyer_parts), "\n\n".join(seller_parts)
@@ -0,0 +1,257 @@
+import os
+import re
+import json
+import uuid
+import hashlib
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from alignment import AlignedClause
+from cache import LRUCache
+from supabase_rest import SupabaseTable
+
+logger = logging.getLogger(__name__)
+
+# Set to "false" to analyze every clause of a revised contract from scratch
+INCREMENTAL_ANALYSIS = os.getenv("INCREMENTAL_ANALYSIS", "true").lower() == "true"
+# Clause analyses looked up per history query
+HISTORY_LOOKUP_BATCH = int(os.getenv("HISTORY_LOOKUP_BATCH", "50"))
+# Bounds of the in-memory store: clause analyses (LRU) and recent reports
+HISTORY_MEMORY_MAX_CLAUSES = int(os.getenv("HISTORY_MEMORY_MAX_CLAUSES", "10000"))
+HISTORY_MEMORY_MAX_ANALYSES = int(os.getenv("HISTORY_MEMORY_MAX_ANALYSES", "500"))
+
+# A clause's analysis starts at its label, e.g. "[Clause 3]" or "**[Clause 3] ...**"
+CLAUSE_LABEL = re.compile(r"^[^\w\[]*\[Clause (\d+)\]", re.MULTILINE)
+LABEL = re.compile(r"\[Clause \d+\]")
+
+
+def clause_hash(pair: AlignedClause, system_prompt: str) -> str:
+    """Key a clause analysis by the buyer and seller wording and the prompt.
+
+    Whitespace is collapsed so re-extracted or re-flowed text still matches.
+    The system prompt carries the company name and priorities, so changing
+    either makes earlier analyses stale.
+    """
+    payload = json.dumps(
+        [
+            hashlib.sha256(system_prompt.encode("utf-8")).hexdigest(),
+            " ".join(pair.buyer.text.split()) if pair.buyer else None,
+            " ".join(pair.seller.text.split()) if pair.seller else None,
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def split_by_clause(response: str) -> Dict[int, str]:
+    """Split a model response into ``{label number: analysis}``.
+
+    Text before the first label belongs to no clause and is dropped. A label
+    that appears more than once keeps all of its sections.
+    """
+    matches = list(CLAUSE_LABEL.finditer(response))
+    sections = {}
+    for match, following in zip(matches, matches[1:] + [None]):
+        end = following.start() if following else len(response)
+        number = int(match.group(1))
+        section = response[match.start():end].strip()
+        sections[number] = f"{sections[number]}\n\n{section}" if number in sections else section
+    return sections
+
+
+class HistoryStore:
+    """Storage backend for clause analyses and completed analysis reports.
+
+    Clause analyses map a ``clause_hash`` to the model's analysis of that
+    clause. Analyses are plain dicts matching ``schemas.AnalysisHistoryResponse``.
+    """
+
+    def get_clause_analyses(self, hashes: List[str]) -> Dict[str, str]:
+        raise NotImplementedError
+
+    def save_clause_analyses(self, analyses: Dict[str, str], company_id: str = None):
+        raise NotImplementedError
+
+    def save_analysis(self, analysis: Dict) -> Dict:
+        raise NotImplementedError
+
+    def list_analyses(self, user_id: str) -> List[Dict]:
+        raise NotImplementedError
+
+
+class InMemoryHistoryStore(HistoryStore):
+    """Process-local history for development; use ``HISTORY_STORE=supabase`` in production.
+
+    Everything is lost when the worker restarts. Clause analyses are kept in
+    an LRU of ``max_clauses`` entries and only the ``max_analyses`` most
+    recent reports are listed.
+    """
+
+    def __init__(self, max_clauses: int = HISTORY_MEMORY_MAX_CLAUSES, max_analyses: int = HISTORY_MEMORY_MAX_ANALYSES):
+        self._clauses = LRUCache(maxsize=max_clauses)
+        self._analyses = deque(maxlen=max_analyses)
+        self._lock = threading.Lock()
+
+    def get_clause_analyses(self, hashes):
+        found = {}
+        for h in hashes:
+            analysis = self._clauses.get(h)
+            if analysis is not None:
+                found[h] = analysis
+        return found
+
+    def save_clause_analyses(self, analyses, company_id=None):
+        for h, analysis in analyses.items():
+            self._clauses.set(h, analysis)
+
+    def save_analysis(self, analysis):
+        with self._lock:
+            self._analyses.append(dict(analysis))
+            return dict(analysis)
+
+    def list_analyses(self, user_id):
+        with self._lock:
+            rows = [dict(a) for a in self._analyses if a["user_id"] == user_id]
+        return sorted(rows, key=lambda a: a["created_at"], reverse=True)
+
+
+class SupabaseHistoryStore(HistoryStore):
+    """History persisted to the ``clause_analyses`` and ``analysis_history`` tables."""
+
+    def __init__(self, url: str, key: str):
+        self.clauses = SupabaseTable("clause_analyses", url, key)
+        self.analyses = SupabaseTable("analysis_history", url, key)
+
+    def get_clause_analyses(self, hashes):
+        if not hashes:
+            return {}
+        rows = self.clauses.select(
+            {"select": "clause_hash,analysis", "clause_hash": f"in.({','.join(hashes)})"},
+            "fetch clause analyses",
+        )
+        return {row["clause_hash"]: row["analysis"] for row in rows}
+
+    def save_clause_analyses(self, analyses, company_id=None):
+        if not analyses:
+            return
+        rows = [
+            {"clause_hash": h, "company_id": company_id, "analysis": analysis}
+            for h, analysis in analyses.items()
+        ]
+        # Upsert, so a clause analyzed twice concurrently is not an error
+        self.clauses.upsert(rows, "save clause analyses")
+
+    def save_analysis(self, analysis):
+        return self.analyses.insert(analysis, "save analysis")[0]
+
+    def list_analyses(self, user_id):
+        return self.analyses.select(
+            {"user_id": f"eq.{user_id}", "order": "created_at.desc"},
+            "fetch analysis history",
+        )
+
+
+def create_history_store() -> HistoryStore:
+    """Build the store selected by the ``HISTORY_STORE`` environment variable."""
+    if os.getenv("HISTORY_STORE", "memory") == "supabase":
+        return SupabaseHistoryStore(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+    return InMemoryHistoryStore()
+
+
+# Shared by every analysis in this process
+history_store = create_history_store()
+
+
+def record_analysis(analysis_id: str, user_id: str, company_doc_filename: str, client_doc_filename: str, summary: str) -> Optional[Dict]:
+    """Save a completed report; failures are logged rather than raised."""
+    try:
+        return history_store.save_analysis({
+            "id": str(uuid.uuid4()),
+            "analysis_id": analysis_id,
+            "user_id": user_id,
+            "company_doc_filename": company_doc_filename,
+            "client_doc_filename": client_doc_filename,
+            "summary": summary,
+            "created_at": datetime.utcnow().isoformat(),
+        })
+    except Exception as e:
+        logger.error(f"Failed to record analysis {analysis_id}: {str(e)}")
+        return None
+
+
+class IncrementalAnalysis:
+    """Reuse stored clause analyses across revisions of the same contract.
+
+    ``filter`` passes on only the clauses with no stored analysis, in the
+    order they are labeled for the model, and collects the others in
+    ``reused``. Once the model has answered, ``record`` splits each response
+    by clause label and stores every clause's analysis for the next revision.
+    """
+
+    def __init__(self, system_prompt: str, company_id: str = None, store: HistoryStore = None):
+        self.system_prompt = system_prompt
+        self.company_id = company_id
+        self.store = store or history_store
+        self.analyzed: List[tuple] = []
+        self.reused: List[tuple] = []
+
+    def lookup(self, hashes: List[str]) -> Dict[str, str]:
+        if not INCREMENTAL_ANALYSIS:
+            return {}
+        try:
+            return self.store.get_clause_analyses(hashes)
+        except Exception as e:
+            # History only saves work; analyze everything if it is unavailable
+            logger.error(f"Clause history lookup failed: {str(e)}")
+            return {}
+
+    def filter(self, aligned: Iterable[AlignedClause]) -> Iterator[AlignedClause]:
+        batch = []
+        for pair in aligned:
+            batch.append(pair)
+            if len(batch) >= HISTORY_LOOKUP_BATCH:
+                yield from self._filter_batch(batch)
+                batch = []
+        yield from self._filter_batch(batch)
+
+    def _filter_batch(self, batch: List[AlignedClause]) -> Iterator[AlignedClause]:
+        hashes = [clause_hash(pair, self.system_prompt) for pair in batch]
+        stored = self.lookup(hashes)
+        for pair, h in zip(batch, hashes):
+            if h in stored:
+                self.reused.append((pair, stored[h]))
+            else:
+                self.analyzed.append((pair, h))
+                yield pair
+
+    def record(self, responses: Iterable[str]) -> int:
+        """Store the per-clause analyses found in ``responses``; returns how many."""
+        sections = {}
+        for response in responses:
+            sections.update(split_by_clause(response))
+        analyses = {
+            h: sections[number]
+            for number, (pair, h) in enumerate(self.analyzed, 1)
+            if number in sections
+        }
+        try:
+            self.store.save_clause_analyses(analyses, self.company_id)
+        except Exception as e:
+            logger.error(f"Failed to save clause analyses: {str(e)}")
+            return 0
+        return len(analyses)
+
+    def describe_reused(self) -> str:
+        """Report the stored analyses of clauses unchanged since a previous revision."""
+        if not self.reused:
+            return ""
+        lines = ["CLAUSES UNCHANGED SINCE A PREVIOUS REVISION (earlier analysis):"]
+        for pair, analysis in self.reused:
+            clause = pair.buyer or pair.seller
+            title = clause.heading or clause.text[:60].rstrip() + "..."
+            # Stored labels numbered the clause within its earlier report
+            lines.append("\n" + LABEL.sub(lambda _: f"[{title}]", analysis, count=1))
+        return "\n".join(lines)
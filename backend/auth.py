@@ -4,14 +4,17 @@ from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 import json
+import time
 import base64
+import hashlib
 from passlib.context import CryptContext
 import os
 from dotenv import load_dotenv
 import logging
-import requests
 from pydantic import BaseModel
-from supabase import create_client, Client
+
+from cache import LRUCache
+from supabase_rest import supabase_rest
 
 load_dotenv()
 
@@ -27,8 +30,18 @@ logger.info(f"Registration is {'open' if REGISTRATION_OPEN else 'closed'}")
 SUPABASE_URL = os.getenv("SUPABASE_URL", "your-supabase-url")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY", "your-supabase-key")
 
-# Initialize Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Supabase SDK client for sign-up and sign-in, created on first use
+_supabase = None
+
+
+def get_supabase():
+    global _supabase
+    if _supabase is None:
+        from supabase import create_client
+
+        _supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _supabase
+
 
 # Debug: Print the actual values being used
 logger.info(f"Using SUPABASE_URL: {SUPABASE_URL}")
@@ -37,6 +50,22 @@ logger.info(
 )
 logger.info(f"Environment variables: {list(os.environ.keys())}")
 
+# Local JWT verification: HS256 tokens are checked against the project's JWT
+# secret, asymmetric tokens against the project's JWKS
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+SUPABASE_JWKS_URL = os.getenv(
+    "SUPABASE_JWKS_URL", f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json"
+)
+JWKS_CACHE_TTL = float(os.getenv("JWKS_CACHE_TTL", "3600"))
+
+# Verified users keyed by token hash; entries never outlive the token's expiry
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "4096"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+
+token_cache = LRUCache(maxsize=TOKEN_CACHE_MAX_ENTRIES, ttl=TOKEN_CACHE_TTL)
+jwks_cache = LRUCache(maxsize=4, ttl=JWKS_CACHE_TTL)
+
 # Password hashing for local verification
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -92,7 +121,7 @@ async def sign_up_user(email: str, password: str, username: str = None):
 
     try:
         user_data = {"username": username} if username else {}
-        response = supabase.auth.sign_up(
+        response = get_supabase().auth.sign_up(
             {"email": email, "password": password, "options": {"data": user_data}}
         )
         return response.user
@@ -105,7 +134,7 @@ async def sign_up_user(email: str, password: str, username: str = None):
 
 async def sign_in_user(email: str, password: str):
     try:
-        response = supabase.auth.sign_in_with_password(
+        response = get_supabase().auth.sign_in_with_password(
             {"email": email, "password": password}
         )
         return response
@@ -133,6 +162,52 @@ def decode_jwt_without_verification(token: str) -> Dict[str, Any]:
     return payload
 
 
+def token_cache_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def cache_verified_user(token: str, user: Dict[str, Any], expires_at: Optional[float]):
+    """Cache a verified user until the token expires, capped at TOKEN_CACHE_TTL."""
+    ttl = TOKEN_CACHE_TTL
+    if expires_at is not None:
+        ttl = min(ttl, expires_at - time.time())
+    if ttl > 0:
+        token_cache.set(token_cache_key(token), user, ttl=ttl)
+
+
+async def get_jwks() -> Dict[str, Any]:
+    jwks = jwks_cache.get(SUPABASE_JWKS_URL)
+    if jwks is None:
+        # The JWKS is public; the service key must not go to SUPABASE_JWKS_URL
+        response = await supabase_rest.get(SUPABASE_JWKS_URL, credentials=False)
+        response.raise_for_status()
+        jwks = response.json()
+        jwks_cache.set(SUPABASE_JWKS_URL, jwks)
+    return jwks
+
+
+async def verify_token_locally(token: str) -> Optional[Dict[str, Any]]:
+    """Verify the token's signature and claims without calling Supabase.
+
+    Returns the verified claims, or None when no key is available for the
+    token's algorithm. Raises JWTError for invalid or expired tokens.
+    """
+    algorithm = jwt.get_unverified_header(token).get("alg")
+    if algorithm == "HS256":
+        if not SUPABASE_JWT_SECRET:
+            return None
+        key = SUPABASE_JWT_SECRET
+    else:
+        try:
+            key = await get_jwks()
+        except Exception as e:
+            logger.warning(f"Could not load JWKS from {SUPABASE_JWKS_URL}: {str(e)}")
+            return None
+    return jwt.decode(
+        token, key, algorithms=[algorithm], audience=SUPABASE_JWT_AUDIENCE
+    )
+
+
 # Token verification
 async def verify_token(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
@@ -140,6 +215,24 @@ async def verify_token(token: str = Depends(oauth2_scheme)):
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    cached_user = token_cache.get(token_cache_key(token))
+    if cached_user is not None:
+        return cached_user
+
+    try:
+        claims = await verify_token_locally(token)
+    except JWTError as e:
+        logger.warning(f"Token rejected by local verification: {str(e)}")
+        raise credentials_exception
+    if claims is not None:
+        user = {
+            "id": claims.get("sub"),
+            "email": claims.get("email"),
+            "user_metadata": claims.get("user_metadata", {}),
+        }
+        cache_verified_user(token, user, claims.get("exp"))
+        return user
+
     try:
         logger.info(f"Verifying token: {token[:10]}...")
 
@@ -153,16 +246,18 @@ async def verify_token(token: str = Depends(oauth2_scheme)):
 
             headers = {"apikey": SUPABASE_KEY, "Authorization": f"Bearer {token}"}
 
-            response = requests.get(f"{SUPABASE_URL}/auth/v1/user", headers=headers)
+            response = await supabase_rest.get("/auth/v1/user", headers=headers)
 
             if response.status_code == 200:
                 user_data = response.json()
                 logger.info(f"Successfully authenticated user via REST API")
-                return {
+                user = {
                     "id": user_data.get("id"),
                     "email": user_data.get("email"),
                     "user_metadata": user_data.get("user_metadata", {}),
                 }
+                cache_verified_user(token, user, decoded_payload.get("exp"))
+                return user
             else:
                 logger.error(
                     f"REST API authentication failed: {response.status_code} - {response.text}"
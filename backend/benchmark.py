@@ -0,0 +1,238 @@
+"""Benchmark the text pipeline over a synthetic contract corpus.
+
+Times each stage of the analysis pipeline short of the model calls, for
+contracts of each page count: ``extract_text``, ``preprocess_text``,
+``segment_clauses``, ``iter_align`` (against a seller template prepared once,
+as ``compare_with_template`` does), ``triage_aligned``, ``pack_aligned_pairs``
+and ``generate_change_summary``. The seller contract has the same clause
+layout as the buyer's but different wording, so every clause is aligned and
+packed into requests::
+
+    python benchmark.py --pages 1,10,50,100,300 --repeat 5 --save-baseline bench_baseline.json
+    python benchmark.py --baseline bench_baseline.json
+
+Each page count runs in a fresh process, so its peak RSS is not inflated by
+earlier, larger documents. With ``--baseline`` the run exits with status 1
+when a stage's p50 latency or a document's peak RSS grew by more than
+``--tolerance``; latency changes under ``--min-delta-ms`` are treated as
+noise.
+"""
+import os
+import io
+import sys
+import json
+import math
+import time
+import platform
+import argparse
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from synthetic_contracts import build_corpus
+
+DEFAULT_PAGES = "1,10,50,100,300"
+STAGES = [
+    "extract_text",
+    "preprocess_text",
+    "segment_clauses",
+    "iter_align",
+    "triage_aligned",
+    "pack_aligned_pairs",
+    "generate_change_summary",
+]
+# Seed of the seller contracts, so their wording differs from the buyer's
+SELLER_SEED = 1
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Nearest-rank percentile of ``values``."""
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(fraction * len(ordered))) - 1]
+
+
+def peak_rss_mb(who=None) -> float:
+    """Peak resident set size in MiB, or None where it can't be measured."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who is None else who)
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(usage.ru_maxrss / divisor, 1)
+
+
+def bench_document(path: str, seller_path: str, pages: int, repeat: int) -> dict:
+    """Run every stage ``repeat`` times on one PDF; runs in a worker process."""
+    import process
+    from alignment import segment_clauses, iter_align, pack_aligned_pairs
+    from clause_diff import triage_aligned
+    from extraction import shutdown_extraction_pool
+    from extraction_cache import extraction_cache
+
+    with open(path, "rb") as f:
+        content = f.read()
+    with open(seller_path, "rb") as f:
+        seller_content = f.read()
+    timings = {stage: [] for stage in STAGES}
+    # The pipeline prints progress; keep it out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Prepared once, like a registered template reused across comparisons
+        template = process.prepare_seller_template(seller_content, os.path.basename(seller_path))
+        clause_size = template.budget // 2
+        for _ in range(repeat):
+            # Every run parses the PDF instead of hitting the extraction cache
+            extraction_cache.clear()
+            start = time.perf_counter()
+            text = process.extract_text(content)
+            timings["extract_text"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            cleaned = process.preprocess_text(text)
+            timings["preprocess_text"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            clauses = segment_clauses(cleaned, clause_size, process.count_llm_tokens)
+            timings["segment_clauses"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            aligned = list(iter_align(clauses, template.clauses, index=template.index))
+            timings["iter_align"].append(time.perf_counter() - start)
+
+            unchanged = []
+            start = time.perf_counter()
+            changed = list(triage_aligned(aligned, unchanged))
+            timings["triage_aligned"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            pairs = list(pack_aligned_pairs(changed, template.budget, process.count_llm_tokens))
+            timings["pack_aligned_pairs"].append(time.perf_counter() - start)
+
+            # One report section per request, as analyze_chunk_pairs would return
+            transformed = "\n\n---\n\n".join(buyer_chunk for buyer_chunk, _ in pairs)
+            start = time.perf_counter()
+            process.generate_change_summary(cleaned, transformed, "Seller")
+            timings["generate_change_summary"].append(time.perf_counter() - start)
+    # Wait for the extraction workers so their peak RSS is counted below
+    shutdown_extraction_pool(wait=True)
+
+    return {
+        "pages": pages,
+        "bytes": len(content),
+        "characters": len(text),
+        "clauses": len(clauses),
+        "unchanged_clauses": len(unchanged),
+        "requests": len(pairs),
+        "timings": timings,
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_child_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+    }
+
+
+def summarize(result: dict) -> dict:
+    stages = {}
+    for stage, values in result.pop("timings").items():
+        mean = sum(values) / len(values)
+        stages[stage] = {
+            "runs": len(values),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+            "mean_ms": round(mean * 1000, 3),
+            "pages_per_s": round(result["pages"] / mean, 1) if mean else None,
+        }
+    result["stages"] = stages
+    return result
+
+
+def run_benchmark(page_counts: list, repeat: int, corpus_dir: str) -> dict:
+    paths = build_corpus(page_counts, corpus_dir)
+    seller_paths = build_corpus(page_counts, corpus_dir, party="Lessor", seed=SELLER_SEED)
+    documents = []
+    for pages in page_counts:
+        # A fresh spawned process per document isolates its peak RSS
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            result = executor.submit(bench_document, paths[pages], seller_paths[pages], pages, repeat).result()
+        documents.append(summarize(result))
+        print_document(documents[-1])
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "repeat": repeat,
+        "documents": documents,
+    }
+
+
+def print_document(document: dict):
+    print(
+        f"\n{document['pages']} pages: {document['bytes'] // 1024} KiB, {document['characters']} characters, "
+        f"{document['clauses']} clauses ({document['unchanged_clauses']} unchanged) "
+        f"packed into {document['requests']} requests, peak RSS {document['peak_rss_mb']} MiB "
+        f"(extraction workers {document['peak_child_rss_mb']} MiB)"
+    )
+    print(f"  {'stage':<26}{'p50 ms':>12}{'p95 ms':>12}{'pages/s':>12}")
+    for stage, stats in document["stages"].items():
+        print(f"  {stage:<26}{stats['p50_ms']:>12.2f}{stats['p95_ms']:>12.2f}{stats['pages_per_s']:>12}")
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float, min_delta_ms: float = 1.0) -> list:
+    """Return a description of every metric that regressed beyond ``tolerance``."""
+    previous = {d["pages"]: d for d in baseline["documents"]}
+    regressions = []
+    print(f"\nComparison with baseline from {baseline.get('created_at', 'unknown date')}:")
+    for document in results["documents"]:
+        before = previous.get(document["pages"])
+        if not before:
+            continue
+        metrics = [(f"{stage} p50_ms", stats["p50_ms"], before["stages"].get(stage, {}).get("p50_ms"), min_delta_ms)
+                   for stage, stats in document["stages"].items()]
+        metrics.append(("peak_rss_mb", document["peak_rss_mb"], before.get("peak_rss_mb"), 0))
+        for name, value, old, floor in metrics:
+            if not old or value is None:
+                continue
+            change = (value - old) / old
+            flag = "REGRESSION" if change > tolerance and value - old >= floor else ""
+            print(f"  {document['pages']:>4} pages {name:<32}{old:>12.2f} -> {value:<12.2f}{change:+8.1%} {flag}")
+            if flag:
+                regressions.append(f"{document['pages']} pages {name}: {old} -> {value} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF extraction, clause alignment, request packing and report assembly")
+    parser.add_argument("--pages", default=DEFAULT_PAGES, help="Comma-separated page counts")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per document")
+    parser.add_argument("--corpus", default="bench_corpus", help="Directory for the generated PDFs")
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument("--save-baseline", help="Write the results as the new baseline")
+    parser.add_argument("--baseline", help="Compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown before failing")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore latency changes smaller than this")
+    args = parser.parse_args()
+
+    page_counts = [int(p) for p in args.pages.split(",")]
+    results = run_benchmark(page_counts, args.repeat, args.corpus)
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regressions beyond {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
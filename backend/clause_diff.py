@@ -0,0 +1,117 @@
+import os
+import re
+import difflib
+import unicodedata
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List
+
+from alignment import AlignedClause
+from structure import NUMBERED_HEADING, KEYWORD_HEADING
+
+IDENTICAL = "identical"
+COSMETIC = "cosmetic"
+SUBSTANTIVE = "substantive"
+
+# Set to "false" to send every aligned clause to the model
+SKIP_UNCHANGED_CLAUSES = os.environ.get("SKIP_UNCHANGED_CLAUSES", "true").lower() == "true"
+# Below 1, clauses at least this similar (by words) that differ only in
+# COSMETIC_WORDS also count as cosmetic; 1 only skips exact canonical matches
+CLAUSE_COSMETIC_SIMILARITY = float(os.environ.get("CLAUSE_COSMETIC_SIMILARITY", "1"))
+
+# Words, percent signs and currency symbols ($, ¢ to ¥, and the U+20A0 block)
+TOKEN = re.compile(r"\w+|[%$\u00a2-\u00a5\u20a0-\u20cf]")
+# The only words a near-identical clause may add, drop or swap
+COSMETIC_WORDS = {"a", "an", "the", "said"}
+
+
+@dataclass
+class ClauseComparison:
+    pair: AlignedClause
+    status: str
+    # Similarity of the canonical texts; below 1 for near-identical wording
+    similarity: float
+
+
+def canonical(text: str) -> str:
+    """Reduce clause text to its words, ignoring case, punctuation and numbering.
+
+    Digits, currency symbols and percent signs are kept, so a changed
+    amount, currency or rate still reads as a different clause.
+    """
+    # NFKC folds PDF ligatures and full-width forms into plain characters
+    text = unicodedata.normalize("NFKC", text)
+    text = KEYWORD_HEADING.sub("", NUMBERED_HEADING.sub("", text.strip()))
+    return " ".join(TOKEN.findall(text.lower()))
+
+
+def near_identical(buyer: str, seller: str, threshold: float = None) -> float:
+    """Word-level similarity of two canonical texts if they are near-identical, else 0.
+
+    Only words in ``COSMETIC_WORDS`` may differ, so a swapped party, an
+    added qualifier or a changed amount is never near-identical however
+    similar the rest of the clause is.
+    """
+    threshold = CLAUSE_COSMETIC_SIMILARITY if threshold is None else threshold
+    if threshold >= 1.0:
+        return 0.0
+    buyer_words, seller_words = buyer.split(), seller.split()
+    matcher = difflib.SequenceMatcher(None, buyer_words, seller_words, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal" and not set(buyer_words[i1:i2] + seller_words[j1:j2]) <= COSMETIC_WORDS:
+            return 0.0
+    score = matcher.ratio()
+    return score if score >= threshold else 0.0
+
+
+def compare_clause(pair: AlignedClause) -> ClauseComparison:
+    """Label an aligned clause identical, cosmetic or substantive.
+
+    Identical clauses match word for word. Cosmetic ones differ only in case,
+    punctuation, whitespace or clause numbering, or, with
+    ``CLAUSE_COSMETIC_SIMILARITY`` below 1, only in articles. Clauses present
+    on only one side are always substantive.
+    """
+    if not (pair.buyer and pair.seller):
+        return ClauseComparison(pair, SUBSTANTIVE, 0.0)
+    buyer = " ".join(pair.buyer.text.split())
+    seller = " ".join(pair.seller.text.split())
+    if buyer == seller:
+        return ClauseComparison(pair, IDENTICAL, 1.0)
+    buyer, seller = canonical(buyer), canonical(seller)
+    if buyer == seller:
+        return ClauseComparison(pair, COSMETIC, 1.0)
+    score = near_identical(buyer, seller)
+    if score:
+        return ClauseComparison(pair, COSMETIC, score)
+    return ClauseComparison(pair, SUBSTANTIVE, pair.score)
+
+
+def triage_aligned(aligned: Iterable[AlignedClause], unchanged: List[ClauseComparison]) -> Iterator[AlignedClause]:
+    """Yield only substantive clauses, collecting the rest into ``unchanged``."""
+    for pair in aligned:
+        comparison = compare_clause(pair)
+        if comparison.status == SUBSTANTIVE or not SKIP_UNCHANGED_CLAUSES:
+            yield pair
+        else:
+            unchanged.append(comparison)
+
+
+def describe_unchanged(unchanged: List[ClauseComparison]) -> str:
+    """Report clauses that match the seller template without model analysis."""
+    if not unchanged:
+        return ""
+    lines = ["CLAUSES MATCHING YOUR TEMPLATE (no analysis needed):"]
+    for comparison in unchanged:
+        clause = comparison.pair.buyer
+        title = clause.heading or clause.text[:60].rstrip() + "..."
+        if comparison.status == IDENTICAL:
+            lines.append(f"- {title}: identical to your terms")
+        elif comparison.similarity < 1.0:
+            lines.append(
+                f"- {title}: differs only in articles ({comparison.similarity:.0%} similar)"
+            )
+        else:
+            lines.append(
+                f"- {title}: same wording, differs only in formatting, punctuation or numbering"
+            )
+    return "\n".join(lines)
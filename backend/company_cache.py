@@ -0,0 +1,96 @@
+import os
+import threading
+from typing import Callable, Optional
+
+from cache import LRUCache
+
+COMPANY_CACHE_MAX_ENTRIES = int(os.getenv("COMPANY_CACHE_MAX_ENTRIES", "1024"))
+COMPANY_CACHE_TTL = float(os.getenv("COMPANY_CACHE_TTL", "300"))
+# Locks shared out by company id so concurrent misses fetch only once
+FETCH_LOCK_STRIPES = 64
+
+
+class CompanyCache:
+    """TTL cache of company profiles, priorities and built system prompts.
+
+    Profiles are keyed by user id; priorities and system prompts by company
+    id. Writes to a profile go through ``invalidate_user`` so the next read
+    sees the new data, and the company's priorities and prompt are dropped
+    with it.
+    """
+
+    def __init__(self, max_entries: int = COMPANY_CACHE_MAX_ENTRIES, ttl: float = COMPANY_CACHE_TTL):
+        self.profiles = LRUCache(maxsize=max_entries, ttl=ttl)
+        self.priorities = LRUCache(maxsize=max_entries, ttl=ttl)
+        self.prompts = LRUCache(maxsize=max_entries, ttl=ttl)
+        self._user_companies = {}
+        self._lock = threading.Lock()
+        self._fetch_locks = [threading.Lock() for _ in range(FETCH_LOCK_STRIPES)]
+
+    def get_profile(self, user_id: str) -> Optional[dict]:
+        return self.profiles.get(user_id)
+
+    def set_profile(self, user_id: str, profile: dict):
+        self.profiles.set(user_id, profile)
+        if profile.get("id"):
+            with self._lock:
+                self._user_companies[user_id] = profile["id"]
+
+    def invalidate_user(self, user_id: str):
+        """Drop the user's profile and everything cached for their company."""
+        self.profiles.delete(user_id)
+        with self._lock:
+            company_id = self._user_companies.pop(user_id, None)
+        if company_id:
+            self.invalidate_company(company_id)
+
+    def get_priorities(self, company_id: str, fetch: Callable[[str], list]) -> list:
+        """Return the company's priorities, calling ``fetch`` on a miss.
+
+        Concurrent misses for the same company wait for a single ``fetch``.
+        """
+        priorities = self.priorities.get(company_id)
+        if priorities is not None:
+            return priorities
+        with self._fetch_locks[hash(company_id) % FETCH_LOCK_STRIPES]:
+            priorities = self.priorities.get(company_id)
+            if priorities is None:
+                priorities = fetch(company_id)
+                self.priorities.set(company_id, priorities)
+        return priorities
+
+    def get_prompt(self, company_id: str, company_name: str, priorities: list, build: Callable[[], str]) -> str:
+        """Return the company's system prompt, calling ``build`` on a miss.
+
+        A cached prompt is reused only while it was built from the same
+        company name and the same cached ``priorities`` list, so refetched
+        priorities or a renamed company rebuild it.
+        """
+        cached = self.prompts.get(company_id)
+        if cached is not None and cached[0] == company_name and cached[1] is priorities:
+            return cached[2]
+        prompt = build()
+        self.prompts.set(company_id, (company_name, priorities, prompt))
+        return prompt
+
+    def invalidate_company(self, company_id: str):
+        self.priorities.delete(company_id)
+        self.prompts.delete(company_id)
+
+    def clear(self):
+        self.profiles.clear()
+        self.priorities.clear()
+        self.prompts.clear()
+        with self._lock:
+            self._user_companies.clear()
+
+    def stats(self) -> dict:
+        return {
+            "profiles": self.profiles.stats(),
+            "priorities": self.priorities.stats(),
+            "prompts": self.prompts.stats(),
+        }
+
+
+# Shared by request handlers and analysis jobs in this process
+company_cache = CompanyCache()
@@ -33,4 +33,83 @@ CREATE POLICY "Users can update their own company profile" ON company_profiles
 -- Create policy to allow users to delete their own company profile
 CREATE POLICY "Users can delete their own company profile" ON company_profiles
     FOR DELETE
-    USING (auth.uid() = user_id); 
\ No newline at end of file
+    USING (auth.uid() = user_id); 
+
+-- Create analysis_jobs table (used when JOB_STORE=supabase)
+CREATE TABLE IF NOT EXISTS analysis_jobs (
+    id UUID PRIMARY KEY,
+    user_id UUID NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    chunks_total INTEGER DEFAULT 0,
+    chunks_completed INTEGER DEFAULT 0,
+    completed_chunks JSONB DEFAULT '[]'::jsonb,
+    summary TEXT,
+    error TEXT,
+    metadata JSONB DEFAULT '{}'::jsonb,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS analysis_jobs_user_id_idx ON analysis_jobs (user_id);
+
+-- Create clause_analyses table (used when HISTORY_STORE=supabase)
+-- One row per analyzed clause, keyed by a hash of the buyer and seller
+-- wording and the system prompt, so revised contracts reuse earlier analyses
+CREATE TABLE IF NOT EXISTS clause_analyses (
+    clause_hash TEXT PRIMARY KEY,
+    company_id UUID,
+    analysis TEXT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS clause_analyses_company_id_idx ON clause_analyses (company_id);
+
+-- Create analysis_history table (used when HISTORY_STORE=supabase)
+CREATE TABLE IF NOT EXISTS analysis_history (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    analysis_id UUID NOT NULL,
+    user_id UUID NOT NULL,
+    company_doc_filename TEXT NOT NULL,
+    client_doc_filename TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS analysis_history_user_id_idx ON analysis_history (user_id);
+
+-- Create company_documents table (registered seller templates, used when
+-- TEMPLATE_STORE=supabase). normalized_text and clauses hold the extracted,
+-- segmented template so comparisons never re-parse the PDF
+CREATE TABLE IF NOT EXISTS company_documents (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    company_id UUID NOT NULL,
+    filename TEXT NOT NULL,
+    document_type TEXT NOT NULL,
+    description TEXT,
+    is_primary_template BOOLEAN DEFAULT FALSE,
+    file_path TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    normalized_text TEXT,
+    clauses JSONB DEFAULT '[]'::jsonb,
+    clause_size INTEGER,
+    segmenter_version INTEGER,
+    uploaded_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Templates stored before segmenter_version was added are re-segmented on load
+ALTER TABLE company_documents ADD COLUMN IF NOT EXISTS segmenter_version INTEGER;
+
+CREATE INDEX IF NOT EXISTS company_documents_company_id_idx ON company_documents (company_id);
+
+-- Create contract_priorities table (each company's priorities, listed in the
+-- analysis system prompt as "priority_name: priority_description")
+CREATE TABLE IF NOT EXISTS contract_priorities (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    company_id UUID NOT NULL,
+    priority_name TEXT NOT NULL,
+    priority_description TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS contract_priorities_company_id_idx ON contract_priorities (company_id);
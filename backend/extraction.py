@@ -0,0 +1,219 @@
+import os
+import io
+import time
+import threading
+import multiprocessing
+from typing import NamedTuple, Optional
+from concurrent.futures import ProcessPoolExecutor
+
+from uploads import PDFContent, SpooledPDF
+from extraction_engines import PdfplumberEngine, PyPDF2Engine, text_quality_problem
+
+# Documents with fewer pages than this are parsed in the calling process
+PARALLEL_EXTRACTION_MIN_PAGES = int(os.environ.get("PARALLEL_EXTRACTION_MIN_PAGES", "16"))
+EXTRACTION_WORKERS = int(os.environ.get("EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+# Try PyPDF2 on each page before falling back to pdfplumber
+EXTRACTION_FAST_PATH = os.environ.get("EXTRACTION_FAST_PATH", "true").lower() == "true"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def current_rss_mb() -> Optional[float]:
+    """Resident set size of this process in MiB, or None off Linux."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """Return the shared extraction process pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned workers are safe to start from the threaded job pool
+            _pool = ProcessPoolExecutor(
+                max_workers=EXTRACTION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+def shutdown_extraction_pool(wait: bool = False):
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=wait, cancel_futures=True)
+            _pool = None
+
+def open_pdf_stream(source):
+    """Binary stream over PDF bytes, a PDF file path or a ``SpooledPDF``."""
+    if isinstance(source, SpooledPDF):
+        return source.stream()
+    if isinstance(source, str):
+        return open(source, "rb")
+    return io.BytesIO(source)
+
+def pool_source(source):
+    """What to send an extraction worker: the temp file path when there is one."""
+    if isinstance(source, SpooledPDF):
+        return source.path or source.buffer
+    return source
+
+class PageResult(NamedTuple):
+    page_num: int
+    text: str
+    seconds: float
+    rss_mb: Optional[float]
+    engine: str
+
+class PageExtractor:
+    """Extract pages with PyPDF2, falling back to pdfplumber page by page.
+
+    Each page's PyPDF2 text goes through ``text_quality_problem``; only the
+    pages that fail it (or all of them, with the fast path disabled or when
+    PyPDF2 can't read the file) are parsed by pdfplumber, which is opened on
+    first need.
+    """
+
+    def __init__(self, source: PDFContent, fast_path: bool = None):
+        self.source = source
+        self._streams = []
+        self.fast = None
+        self.slow = None
+        if EXTRACTION_FAST_PATH if fast_path is None else fast_path:
+            try:
+                self.fast = PyPDF2Engine(self._open_stream())
+            except Exception as e:
+                print(f"Fast-path extractor could not read the PDF ({str(e)}), using pdfplumber")
+        if self.fast is None:
+            self._slow_engine()
+
+    def _open_stream(self):
+        # Each engine gets its own stream so their read positions don't clash
+        stream = open_pdf_stream(self.source)
+        self._streams.append(stream)
+        return stream
+
+    def _slow_engine(self) -> PdfplumberEngine:
+        if self.slow is None:
+            self.slow = PdfplumberEngine(self._open_stream())
+        return self.slow
+
+    def page_count(self) -> int:
+        return (self.fast or self.slow).page_count()
+
+    def extract_page(self, index: int) -> PageResult:
+        started = time.perf_counter()
+        if self.fast is not None:
+            try:
+                page_text = self.fast.extract_page(index)
+                problem = text_quality_problem(page_text)
+            except Exception as e:
+                problem = f"error {str(e)}"
+            if problem is None:
+                return PageResult(index + 1, page_text, time.perf_counter() - started, current_rss_mb(), self.fast.name)
+            print(f"Page {index + 1} failed the fast-path check ({problem}), re-extracting with pdfplumber")
+        page_text = self._slow_engine().extract_page(index)
+        return PageResult(index + 1, page_text, time.perf_counter() - started, current_rss_mb(), self.slow.name)
+
+    def close(self):
+        for engine in (self.fast, self.slow):
+            if engine is not None:
+                engine.close()
+        for stream in self._streams:
+            stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def extract_page_range(pdf_content, start: int, end: int) -> list:
+    """Extract pages ``start``..``end - 1`` (0-based) from PDF bytes or a path.
+
+    Runs inside pool workers, so it opens the PDF itself. Returns a list of
+    ``PageResult`` with 1-based page numbers; ``rss_mb`` is the worker's
+    resident memory after the page.
+    """
+    with PageExtractor(pdf_content) as extractor:
+        return [extractor.extract_page(index) for index in range(start, end)]
+
+def page_ranges(page_count: int, parts: int) -> list:
+    """Split ``page_count`` pages into at most ``parts`` contiguous ranges."""
+    parts = max(1, min(parts, page_count))
+    size, extra = divmod(page_count, parts)
+    ranges = []
+    start = 0
+    for part in range(parts):
+        end = start + size + (1 if part < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+def iter_pages(pdf_content: PDFContent, parallel: bool = None):
+    """Yield a ``PageResult`` for each page, in page order.
+
+    Documents with at least ``PARALLEL_EXTRACTION_MIN_PAGES`` pages are split
+    into page ranges and parsed across the extraction process pool; ranges
+    are yielded in order as they finish. Pass ``parallel`` to force either
+    mode. ``pdf_content`` is PDF bytes or a ``SpooledPDF``; workers are given
+    a spooled upload's temp file path rather than a copy of its bytes.
+    """
+    with PageExtractor(pdf_content) as extractor:
+        page_count = extractor.page_count()
+        if parallel is None:
+            parallel = EXTRACTION_WORKERS > 1 and page_count >= PARALLEL_EXTRACTION_MIN_PAGES
+        if not parallel or page_count < 2:
+            print(f"Processing PDF with {page_count} pages")
+            for index in range(page_count):
+                yield extractor.extract_page(index)
+            return
+
+    print(f"Processing PDF with {page_count} pages across {EXTRACTION_WORKERS} processes")
+    pool = get_extraction_pool()
+    futures = [
+        pool.submit(extract_page_range, pool_source(pdf_content), start, end)
+        for start, end in page_ranges(page_count, EXTRACTION_WORKERS)
+    ]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+def iter_page_text(pdf_content: PDFContent, parallel: bool = None):
+    """Yield each page's text, newline-terminated, as soon as it is parsed.
+
+    Also logs how many pages needed pdfplumber and the peak resident memory
+    of the process that parsed the pages (the largest extraction worker
+    when the document was split).
+    """
+    started = time.perf_counter()
+    total_length = 0
+    page_time = 0.0
+    peak_rss = None
+    engines = {}
+    for page_num, page_text, seconds, rss, engine in iter_pages(pdf_content, parallel):
+        page_time += seconds
+        engines[engine] = engines.get(engine, 0) + 1
+        if rss is not None:
+            peak_rss = max(peak_rss or 0.0, rss)
+        if page_text:
+            total_length += len(page_text) + 1
+            print(f"Extracted {len(page_text)} characters from page {page_num} with {engine} in {seconds:.3f}s")
+            yield page_text + "\n"
+        else:
+            print(f"Warning: No text extracted from page {page_num} ({seconds:.3f}s)")
+    print(f"Total extracted text length: {total_length} characters")
+    print(f"Extraction took {time.perf_counter() - started:.3f}s ({page_time:.3f}s of page time)")
+    print("Pages per engine: " + ", ".join(f"{engine} {count}" for engine, count in sorted(engines.items())))
+    if peak_rss is not None:
+        print(f"Peak extraction memory: {peak_rss:.1f} MiB resident")
+
+def parse_pdf_text(pdf_content: PDFContent, parallel: bool = None) -> str:
+    """Parse text content from PDF bytes or a ``SpooledPDF``."""
+    return "".join(iter_page_text(pdf_content, parallel))
@@ -0,0 +1,130 @@
+import os
+import hashlib
+import logging
+import threading
+from typing import Optional
+
+from cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "64"))
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR")
+EXTRACTION_CACHE_DISK_MAX_ENTRIES = int(
+    os.getenv("EXTRACTION_CACHE_DISK_MAX_ENTRIES", "1000")
+)
+
+
+def content_hash(content) -> str:
+    """Return the SHA-256 hex digest used to key extracted documents.
+
+    Spooled uploads are hashed while they are received, so their digest is
+    reused instead of reading the file again.
+    """
+    return getattr(content, "sha256", None) or hashlib.sha256(content).hexdigest()
+
+
+class ExtractionCache:
+    """Content-addressed cache of extracted PDF text.
+
+    Lookups hit a bounded in-memory LRU first, then the optional on-disk tier
+    (one ``<sha256>.txt`` file per document). Disk hits are promoted back into
+    memory. When the disk tier exceeds its entry limit the least recently
+    used files (by modification time) are removed.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = EXTRACTION_CACHE_MAX_ENTRIES,
+        cache_dir: Optional[str] = EXTRACTION_CACHE_DIR,
+        disk_max_entries: int = EXTRACTION_CACHE_DISK_MAX_ENTRIES,
+    ):
+        self.memory = LRUCache(maxsize=max_entries)
+        self.cache_dir = cache_dir
+        self.disk_max_entries = disk_max_entries
+        self._disk_lock = threading.Lock()
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self.disk_evictions = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def get(self, key: str) -> Optional[str]:
+        text = self.memory.get(key)
+        if text is not None or not self.cache_dir:
+            return text
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            self.disk_misses += 1
+            return None
+        except OSError as e:
+            logger.warning(f"Failed to read extraction cache entry {key}: {str(e)}")
+            self.disk_misses += 1
+            return None
+
+        self.disk_hits += 1
+        self.memory.set(key, text)
+        return text
+
+    def set(self, key: str, text: str):
+        self.memory.set(key, text)
+        if not self.cache_dir:
+            return
+
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write extraction cache entry {key}: {str(e)}")
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        with self._disk_lock:
+            try:
+                entries = [
+                    os.path.join(self.cache_dir, name)
+                    for name in os.listdir(self.cache_dir)
+                    if name.endswith(".txt")
+                ]
+            except OSError:
+                return
+            overflow = len(entries) - self.disk_max_entries
+            if overflow <= 0:
+                return
+            entries.sort(key=lambda path: os.path.getmtime(path))
+            for path in entries[:overflow]:
+                try:
+                    os.remove(path)
+                    self.disk_evictions += 1
+                except OSError:
+                    pass
+
+    def clear(self):
+        self.memory.clear()
+
+    def stats(self) -> dict:
+        return {
+            "memory": self.memory.stats(),
+            "disk": {
+                "enabled": bool(self.cache_dir),
+                "hits": self.disk_hits,
+                "misses": self.disk_misses,
+                "evictions": self.disk_evictions,
+            },
+        }
+
+
+# Shared by every extraction in this process
+extraction_cache = ExtractionCache()
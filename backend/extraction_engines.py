@@ -0,0 +1,103 @@
+import os
+import re
+from typing import Optional
+
+# Pages whose fast-path text is shorter than this are re-extracted with pdfplumber
+EXTRACTION_MIN_PAGE_CHARS = int(os.environ.get("EXTRACTION_MIN_PAGE_CHARS", "20"))
+# Largest share of control, replacement and private-use characters accepted
+EXTRACTION_MAX_GARBAGE_RATIO = float(os.environ.get("EXTRACTION_MAX_GARBAGE_RATIO", "0.05"))
+
+# Words run together ("Thesellershallpay") push the average far above English
+MAX_AVERAGE_WORD_LENGTH = 12
+# Letter-spaced text ("T h e s e l l e r") is mostly one-letter words
+MAX_SINGLE_LETTER_WORD_RATIO = 0.3
+
+GARBAGE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f\ufffd\ue000-\uf8ff]")
+
+
+def text_quality_problem(text: Optional[str]) -> Optional[str]:
+    """Describe why a page's extracted text looks unreliable, or return None.
+
+    Checks the character count, the share of garbage characters left by
+    unmapped font encodings, and whether words are sensibly spaced.
+    """
+    text = (text or "").strip()
+    if len(text) < EXTRACTION_MIN_PAGE_CHARS:
+        return f"only {len(text)} characters"
+
+    garbage_ratio = len(GARBAGE.findall(text)) / len(text)
+    if garbage_ratio > EXTRACTION_MAX_GARBAGE_RATIO:
+        return f"garbage ratio {garbage_ratio:.2f}"
+
+    words = [word for word in text.split() if any(ch.isalpha() for ch in word)]
+    if words:
+        average_length = sum(len(word) for word in words) / len(words)
+        if average_length > MAX_AVERAGE_WORD_LENGTH:
+            return f"average word length {average_length:.1f}"
+        single_letters = sum(1 for word in words if len(word) == 1) / len(words)
+        if single_letters > MAX_SINGLE_LETTER_WORD_RATIO:
+            return f"{single_letters:.0%} single-letter words"
+    return None
+
+
+class ExtractionEngine:
+    """Extracts text one page at a time from an open PDF stream."""
+
+    name = None
+
+    def page_count(self) -> int:
+        raise NotImplementedError
+
+    def extract_page(self, index: int) -> str:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PyPDF2Engine(ExtractionEngine):
+    """Plain content-stream extraction.
+
+    Many times faster than pdfplumber, but it can run words together or
+    lose text drawn with unusual font encodings.
+    """
+
+    name = "pypdf2"
+
+    def __init__(self, stream):
+        from PyPDF2 import PdfReader
+
+        self.reader = PdfReader(stream)
+
+    def page_count(self):
+        return len(self.reader.pages)
+
+    def extract_page(self, index):
+        return self.reader.pages[index].extract_text()
+
+
+class PdfplumberEngine(ExtractionEngine):
+    """Layout-aware extraction from character positions; slow but robust."""
+
+    name = "pdfplumber"
+
+    def __init__(self, stream):
+        # pdfplumber pulls in pdfminer, so it is only imported when a page needs it
+        import pdfplumber
+
+        self.pdf = pdfplumber.open(stream)
+
+    def page_count(self):
+        return len(self.pdf.pages)
+
+    def extract_page(self, index):
+        page = self.pdf.pages[index]
+        page_text = page.extract_text()
+        # pdfplumber keeps each page's layout objects and text map until told
+        # otherwise, so without this memory grows with every page parsed
+        page.flush_cache()
+        page.get_textmap.cache_clear()
+        return page_text
+
+    def close(self):
+        self.pdf.close()
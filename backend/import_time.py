@@ -0,0 +1,94 @@
+"""Check that importing the API stays within a startup budget.
+
+Imports ``main`` in fresh interpreters with ``-X importtime`` and reports the
+median wall time and the slowest modules::
+
+    python import_time.py --runs 5 --budget 2.0
+
+Exits with status 1 when the median import time exceeds ``--budget`` seconds
+(``IMPORT_TIME_BUDGET``) or when one of the modules that should only load on
+first use (the OpenAI and Supabase SDKs, the PDF parsers) was imported.
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import subprocess
+from statistics import median
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+IMPORT_TIME_BUDGET = float(os.getenv("IMPORT_TIME_BUDGET", "2.0"))
+
+# Created lazily by process.py, auth.py, extraction.py and clause_diff.py
+DEFERRED_MODULES = ["openai", "supabase", "pdfplumber", "PyPDF2", "reportlab", "diff_match_patch", "tiktoken"]
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_once(module: str) -> dict:
+    """Import ``module`` in a new interpreter; returns wall time and per-module timings."""
+    check = f"import sys, {module}; print('deferred:' + ','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", check],
+        cwd=HERE,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    # main.py prints its configuration, so look for the check's own line
+    marker = [line for line in result.stdout.splitlines() if line.startswith("deferred:")][-1]
+    loaded = [m for m in marker[len("deferred:"):].split(",") if m]
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            # Only top-level packages, so "openai" isn't listed next to "openai.types"
+            name = match.group(4).split(".")[0]
+            cumulative[name] = max(cumulative.get(name, 0), int(match.group(2)))
+    return {
+        "wall_s": elapsed,
+        "cumulative_us": cumulative,
+        "deferred_loaded": loaded,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how long importing the API takes")
+    parser.add_argument("--module", default="main", help="Module to import")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time")
+    parser.add_argument("--budget", type=float, default=IMPORT_TIME_BUDGET, help="Allowed median import time in seconds")
+    parser.add_argument("--top", type=int, default=10, help="Slowest packages to list")
+    args = parser.parse_args()
+
+    runs = [import_once(args.module) for _ in range(args.runs)]
+    wall = [run["wall_s"] for run in runs]
+    print(f"import {args.module}: median {median(wall):.2f}s, max {max(wall):.2f}s over {args.runs} runs "
+          f"(budget {args.budget:.2f}s, including interpreter startup)")
+
+    slowest = sorted(runs[-1]["cumulative_us"].items(), key=lambda item: item[1], reverse=True)
+    print(f"\n  {'package':<32}{'cumulative ms':>14}")
+    for name, micros in slowest[:args.top]:
+        print(f"  {name:<32}{micros / 1000:>14.1f}")
+
+    failures = []
+    if median(wall) > args.budget:
+        failures.append(f"median import time {median(wall):.2f}s is over the {args.budget:.2f}s budget")
+    loaded = sorted({m for run in runs for m in run["deferred_loaded"]})
+    if loaded:
+        failures.append(f"imported at startup but should load on first use: {', '.join(loaded)}")
+    if failures:
+        print()
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("\nWithin budget")
+
+
+if __name__ == "__main__":
+    main()
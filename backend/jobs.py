@@ -0,0 +1,196 @@
+import os
+import uuid
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional, Dict, Any, Callable
+
+from cache import LRUCache
+from supabase_rest import SupabaseTable
+
+logger = logging.getLogger(__name__)
+
+# Job lifecycle states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Workers for batch comparisons, kept apart so batches don't starve /process
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+BATCH_MAX_CONTRACTS = int(os.getenv("BATCH_MAX_CONTRACTS", "50"))
+# Finished jobs kept by the in-memory store (seconds, and at most this many)
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+JOB_RETENTION_MAX = int(os.getenv("JOB_RETENTION_MAX", "1000"))
+
+
+class JobStore:
+    """Storage backend for analysis jobs.
+
+    Jobs are plain dicts matching ``schemas.JobResponse``. Backends only need
+    to implement create/get/update; the manager handles everything else.
+    """
+
+    def create(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def update(self, job_id: str, **fields) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+
+class InMemoryJobStore(JobStore):
+    """Process-local job store for development. Jobs are lost when the worker restarts.
+
+    Queued and running jobs are always kept. Finished jobs move to an LRU
+    cache and expire after ``retention`` seconds or once ``max_finished``
+    newer jobs have finished, so memory does not grow with every job run.
+    """
+
+    def __init__(self, retention: float = JOB_RETENTION_SECONDS, max_finished: int = JOB_RETENTION_MAX):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._finished = LRUCache(maxsize=max_finished, ttl=retention)
+        self._lock = threading.Lock()
+
+    def create(self, job):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+            return dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id) or self._finished.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                job = self._finished.get(job_id)
+                if job is None:
+                    return None
+            job.update(fields)
+            if job["status"] in (JOB_COMPLETED, JOB_FAILED):
+                self._jobs.pop(job_id, None)
+                self._finished.set(job_id, job)
+            return dict(job)
+
+
+class SupabaseJobStore(JobStore):
+    """Job store persisted to the ``analysis_jobs`` table via Supabase REST."""
+
+    def __init__(self, url: str, key: str, table: str = "analysis_jobs"):
+        self.table = SupabaseTable(table, url, key)
+
+    def create(self, job):
+        return self.table.insert(job, "create job")[0]
+
+    def get(self, job_id):
+        rows = self.table.select({"id": f"eq.{job_id}"}, "fetch job")
+        return rows[0] if rows else None
+
+    def update(self, job_id, **fields):
+        try:
+            rows = self.table.update({"id": f"eq.{job_id}"}, fields, f"update job {job_id}")
+        except Exception as e:
+            logger.error(str(e))
+            return None
+        return rows[0] if rows else None
+
+
+class JobManager:
+    """Runs analysis pipelines on a worker pool and records their progress.
+
+    The pool's internal queue holds jobs waiting for a free worker, so request
+    handlers can enqueue work and return immediately.
+    """
+
+    def __init__(self, store: JobStore, max_workers: int = JOB_WORKERS):
+        self.store = store
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="analysis-job"
+        )
+
+    def submit(self, user_id: str, fn: Callable, *args, metadata: Dict[str, Any] = None, done_callback: Callable = None, **kwargs) -> Dict[str, Any]:
+        """Queue ``fn(*args, job_id=..., **kwargs)`` and return the new job record.
+
+        ``done_callback(job)`` is called with the final job record once the
+        job has completed or failed.
+        """
+        now = datetime.utcnow().isoformat()
+        job = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "status": JOB_QUEUED,
+            "stage": None,
+            "chunks_total": 0,
+            "chunks_completed": 0,
+            "completed_chunks": [],
+            "summary": None,
+            "error": None,
+            "metadata": metadata or {},
+            "created_at": now,
+            "updated_at": now,
+        }
+        job = self.store.create(job)
+        self.executor.submit(self._run, job["id"], fn, args, kwargs, done_callback)
+        logger.info(f"Queued job {job['id']} for user {user_id}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    def update(self, job_id: str, **fields) -> Optional[Dict[str, Any]]:
+        fields["updated_at"] = datetime.utcnow().isoformat()
+        return self.store.update(job_id, **fields)
+
+    def set_stage(self, job_id: str, stage: str):
+        self.update(job_id, stage=stage)
+
+    def chunk_progress(self, job_id: str) -> Callable[[int, int], None]:
+        """Return a callback recording completed chunk indices for ``job_id``."""
+        lock = threading.Lock()
+        completed = []
+
+        def callback(chunk_index: int, total: int):
+            with lock:
+                completed.append(chunk_index)
+                self.update(
+                    job_id,
+                    chunks_total=total,
+                    chunks_completed=len(completed),
+                    completed_chunks=sorted(completed),
+                )
+
+        return callback
+
+    def _run(self, job_id: str, fn: Callable, args, kwargs, done_callback: Callable = None):
+        self.update(job_id, status=JOB_RUNNING)
+        try:
+            summary = fn(*args, job_id=job_id, **kwargs)
+            job = self.update(job_id, status=JOB_COMPLETED, stage=None, summary=summary)
+            logger.info(f"Job {job_id} completed")
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            logger.error(traceback.format_exc())
+            job = self.update(job_id, status=JOB_FAILED, error=str(e))
+        if done_callback:
+            try:
+                done_callback(job)
+            except Exception as e:
+                logger.error(f"Job {job_id} done callback failed: {str(e)}")
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_job_store() -> JobStore:
+    """Build the job store selected by the ``JOB_STORE`` environment variable."""
+    if os.getenv("JOB_STORE", "memory") == "supabase":
+        return SupabaseJobStore(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+    return InMemoryJobStore()
@@ -0,0 +1,114 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Optional
+
+from cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(24 * 60 * 60)))
+
+
+def llm_cache_key(
+    model: str,
+    system_prompt: str,
+    seller_chunk: str,
+    buyer_chunk: str,
+    temperature: float,
+    max_tokens: int,
+) -> str:
+    """Deterministic key for a chunk-pair analysis request."""
+    payload = json.dumps(
+        [model, system_prompt, seller_chunk, buyer_chunk, temperature, max_tokens],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def priorities_fingerprint(priorities: list) -> str:
+    """Hash a company's priorities so changes can be detected cheaply."""
+    payload = json.dumps(
+        sorted(
+            (p.get("priority_name", ""), p.get("priority_description", ""))
+            for p in priorities or []
+        ),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """TTL and size-bounded cache of model responses for chunk-pair analyses.
+
+    Entries are tagged with the company they were produced for so that all of
+    a company's responses can be dropped when its ``contract_priorities``
+    change.
+    """
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES, ttl: float = LLM_CACHE_TTL):
+        self.responses = LRUCache(maxsize=max_entries, ttl=ttl)
+        self._company_keys = {}
+        self._fingerprints = {}
+        self._lock = threading.Lock()
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[str]:
+        return self.responses.get(key)
+
+    def set(self, key: str, response: str, company_id: str = None):
+        self.responses.set(key, response)
+        if company_id:
+            with self._lock:
+                keys = self._company_keys.setdefault(company_id, set())
+                keys.add(key)
+                # Forget keys the LRU has already evicted or expired
+                if len(keys) > self.responses.maxsize:
+                    keys.intersection_update(
+                        k for k in list(keys) if k in self.responses
+                    )
+
+    def invalidate_company(self, company_id: str) -> int:
+        """Drop every cached response produced for ``company_id``."""
+        with self._lock:
+            keys = self._company_keys.pop(company_id, set())
+            self._fingerprints.pop(company_id, None)
+            self.invalidations += 1
+        return sum(1 for key in keys if self.responses.delete(key))
+
+    def observe_priorities(self, company_id: str, priorities: list) -> bool:
+        """Record the company's current priorities, invalidating on change.
+
+        Returns True when cached responses were invalidated.
+        """
+        fingerprint = priorities_fingerprint(priorities)
+        with self._lock:
+            previous = self._fingerprints.get(company_id)
+            self._fingerprints[company_id] = fingerprint
+        if previous is not None and previous != fingerprint:
+            dropped = self.invalidate_company(company_id)
+            with self._lock:
+                self._fingerprints[company_id] = fingerprint
+            logger.info(
+                f"Priorities changed for company {company_id}, dropped {dropped} cached responses"
+            )
+            return True
+        return False
+
+    def clear(self):
+        self.responses.clear()
+        with self._lock:
+            self._company_keys.clear()
+            self._fingerprints.clear()
+
+    def stats(self) -> dict:
+        stats = self.responses.stats()
+        stats["invalidations"] = self.invalidations
+        return stats
+
+
+# Shared by every analysis in this process
+llm_cache = LLMResponseCache()
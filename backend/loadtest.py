@@ -0,0 +1,253 @@
+"""Load test one API worker against mock OpenAI and Supabase servers.
+
+Starts ``mock_batch_server.py`` (OpenAI), ``mock_supabase_server.py`` and a
+single uvicorn worker running ``main:app``, then has ``--users`` concurrent
+clients upload contract pairs to ``/process`` and poll ``/jobs/{job_id}``
+until ``--requests`` analyses have finished::
+
+    python loadtest.py --users 8 --requests 40 --pages 5 --llm-latency 2 --error-rate 0.05
+
+Reports throughput, upload and end-to-end latency percentiles, the worker's
+event-loop lag (from ``/metrics/event-loop``) and ``/health`` latency seen
+by a client while under load. Pass ``--app-url`` to test an API that is
+already running instead of starting one; it must be configured against the
+mock servers.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import subprocess
+
+import httpx
+from jose import jwt
+
+from benchmark import percentile
+from synthetic_contracts import contract_pdf
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FINISHED = {"completed", "failed"}
+
+
+def start_process(args: list, env: dict = None) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable] + args,
+        cwd=HERE,
+        env=dict(os.environ, **(env or {})),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_until_up(url: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def start_stack(args) -> list:
+    """Start the mock servers and the API; returns the processes to stop."""
+    openai_url = f"http://127.0.0.1:{args.openai_port}"
+    supabase_url = f"http://127.0.0.1:{args.supabase_port}"
+    processes = [
+        start_process([
+            "mock_batch_server.py", "--port", str(args.openai_port),
+            "--latency", str(args.llm_latency), "--jitter", str(args.llm_jitter),
+            "--rpm", str(args.rpm), "--error-rate", str(args.error_rate),
+        ]),
+        start_process([
+            "mock_supabase_server.py", "--port", str(args.supabase_port),
+            "--latency", str(args.supabase_latency),
+        ]),
+    ]
+    wait_until_up(f"{openai_url}/stats")
+    wait_until_up(f"{supabase_url}/stats")
+
+    # A JWT-shaped anon key; the mock accepts anything
+    service_key = jwt.encode({"role": "service_role"}, "loadtest", algorithm="HS256")
+    processes.append(start_process(
+        ["-m", "uvicorn", "main:app", "--port", str(args.app_port), "--workers", "1", "--log-level", "warning"],
+        env={
+            "OPENAI_API_KEY": "sk-loadtest",
+            "OPENAI_BASE_URL": f"{openai_url}/v1",
+            "SUPABASE_URL": supabase_url,
+            "SUPABASE_KEY": service_key,
+            "SUPABASE_JWT_SECRET": "",
+            "JOB_STORE": "memory",
+            "HISTORY_STORE": "memory",
+        },
+    ))
+    wait_until_up(f"http://127.0.0.1:{args.app_port}/health", timeout=120)
+    return processes
+
+
+def user_token(index: int) -> str:
+    user_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"loadtest-user-{index}"))
+    return jwt.encode(
+        {"sub": user_id, "email": f"user{index}@example.com", "aud": "authenticated", "exp": int(time.time()) + 3600},
+        "loadtest",
+        algorithm="HS256",
+    )
+
+
+async def run_analysis(client: httpx.AsyncClient, token: str, seller: bytes, buyer: bytes, poll_interval: float) -> dict:
+    """Upload one contract pair and poll its job; returns timings in seconds."""
+    headers = {"Authorization": f"Bearer {token}"}
+    started = time.perf_counter()
+    response = await client.post(
+        "/process",
+        headers=headers,
+        files={
+            "seller_tc": ("seller.pdf", seller, "application/pdf"),
+            "buyer_tc": ("buyer.pdf", buyer, "application/pdf"),
+        },
+    )
+    accepted = time.perf_counter() - started
+    if response.status_code != 202:
+        return {"status": f"http {response.status_code}", "accepted": accepted, "total": accepted}
+
+    job_id = response.json()["job_id"]
+    while True:
+        await asyncio.sleep(poll_interval)
+        job = (await client.get(f"/jobs/{job_id}", headers=headers)).json()
+        if job.get("status") in FINISHED:
+            return {"status": job["status"], "accepted": accepted, "total": time.perf_counter() - started}
+
+
+async def probe_health(client: httpx.AsyncClient, samples: list, stop: asyncio.Event, interval: float = 0.25):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/health")
+        samples.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+
+
+def latency_stats(values: list) -> dict:
+    if not values:
+        return {}
+    return {
+        "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+        "max_ms": round(max(values) * 1000, 1),
+    }
+
+
+async def run_load(args) -> dict:
+    seller = contract_pdf(args.pages, "Lessor", seed=0)
+    # Distinct buyer contracts, so no request is served from a cache
+    buyers = [contract_pdf(args.pages, "Lessee", seed=1000 + i) for i in range(args.requests)]
+    tokens = [user_token(i) for i in range(args.users)]
+    queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(i)
+    results = []
+
+    limits = httpx.Limits(max_connections=args.users + 2)
+    async with httpx.AsyncClient(base_url=args.app_url, timeout=args.timeout, limits=limits) as client:
+        # The metrics endpoints take the same user tokens as the API
+        metrics_headers = {"Authorization": f"Bearer {tokens[0]}"}
+        await client.get("/metrics/event-loop", params={"reset": True}, headers=metrics_headers)
+
+        async def user(index: int):
+            while not queue.empty():
+                i = queue.get_nowait()
+                results.append(await run_analysis(client, tokens[index], seller, buyers[i], args.poll_interval))
+                print(f"  {len(results)}/{args.requests} finished ({results[-1]['status']}, {results[-1]['total']:.1f}s)")
+
+        health, stop = [], asyncio.Event()
+        prober = asyncio.create_task(probe_health(client, health, stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(user(i) for i in range(args.users)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await prober
+        loop_lag = (await client.get("/metrics/event-loop", headers=metrics_headers)).json()
+
+    completed = [r for r in results if r["status"] == "completed"]
+    return {
+        "users": args.users,
+        "requests": args.requests,
+        "pages": args.pages,
+        "llm_latency_s": args.llm_latency,
+        "error_rate": args.error_rate,
+        "completed": len(completed),
+        "failed": len(results) - len(completed),
+        "elapsed_s": round(elapsed, 1),
+        "throughput_per_min": round(len(completed) / elapsed * 60, 2),
+        "upload_latency": latency_stats([r["accepted"] for r in results]),
+        "end_to_end_latency": latency_stats([r["total"] for r in completed]),
+        "health_latency": latency_stats(health),
+        "event_loop_lag": loop_lag,
+    }
+
+
+def print_report(report: dict, mock_stats: dict):
+    print(f"\n{report['completed']} of {report['requests']} analyses completed, {report['failed']} failed, "
+          f"in {report['elapsed_s']}s with {report['users']} concurrent users")
+    print(f"Throughput: {report['throughput_per_min']} analyses/min")
+    for name in ("upload_latency", "end_to_end_latency", "health_latency"):
+        stats = report[name]
+        if stats:
+            print(f"{name:<20} p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms, p99 {stats['p99_ms']} ms, max {stats['max_ms']} ms")
+    lag = report["event_loop_lag"]
+    print(f"{'event_loop_lag':<20} p50 {lag['p50_ms']} ms, p99 {lag['p99_ms']} ms, max {lag['max_ms']} ms ({lag['samples']} samples)")
+    for name, stats in mock_stats.items():
+        print(f"{name} mock: {stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /process against mock OpenAI and Supabase servers")
+    parser.add_argument("--users", type=int, default=4, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=16, help="Analyses to run in total")
+    parser.add_argument("--pages", type=int, default=5, help="Pages per contract")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="Seconds per mock completion")
+    parser.add_argument("--llm-jitter", type=float, default=0.5, help="Extra random seconds per mock completion")
+    parser.add_argument("--rpm", type=int, default=0, help="Mock OpenAI requests per minute (0 for unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of completions answered with 429")
+    parser.add_argument("--supabase-latency", type=float, default=0.0, help="Seconds per mock Supabase response")
+    parser.add_argument("--app-url", help="Test a running API instead of starting one")
+    parser.add_argument("--app-port", type=int, default=8800)
+    parser.add_argument("--openai-port", type=int, default=8765)
+    parser.add_argument("--supabase-port", type=int, default=8766)
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Seconds between job status polls")
+    parser.add_argument("--timeout", type=float, default=600, help="HTTP timeout in seconds")
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    processes = []
+    if not args.app_url:
+        processes = start_stack(args)
+        args.app_url = f"http://127.0.0.1:{args.app_port}"
+    try:
+        report = asyncio.run(run_load(args))
+        mock_stats = {}
+        for name, port in (("openai", args.openai_port), ("supabase", args.supabase_port)):
+            try:
+                mock_stats[name] = httpx.get(f"http://127.0.0.1:{port}/stats", timeout=5).json()
+            except httpx.HTTPError:
+                pass
+        report["mocks"] = mock_stats
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+    print_report(report, mock_stats)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
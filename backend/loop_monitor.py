@@ -0,0 +1,71 @@
+import os
+import asyncio
+import logging
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds between event-loop lag samples; 0 disables the monitor
+EVENT_LOOP_MONITOR_INTERVAL = float(os.getenv("EVENT_LOOP_MONITOR_INTERVAL", "0.1"))
+EVENT_LOOP_MONITOR_SAMPLES = int(os.getenv("EVENT_LOOP_MONITOR_SAMPLES", "3000"))
+
+
+class EventLoopLagMonitor:
+    """Measure how late the event loop wakes up from a timed sleep.
+
+    A sleep that overshoots its deadline means a callback held the loop, so
+    the overshoot is the delay every other request saw at that moment.
+    """
+
+    def __init__(self, interval: float = EVENT_LOOP_MONITOR_INTERVAL, samples: int = EVENT_LOOP_MONITOR_SAMPLES):
+        self.interval = interval
+        self.samples = deque(maxlen=samples)
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"Event loop lag monitor sampling every {self.interval}s")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def reset(self):
+        self.samples.clear()
+        self.max_lag = 0.0
+
+    def stats(self) -> dict:
+        ordered = sorted(self.samples)
+
+        def percentile(fraction):
+            return round(ordered[int(fraction * (len(ordered) - 1))] * 1000, 2) if ordered else None
+
+        return {
+            "interval_s": self.interval,
+            "samples": len(ordered),
+            "p50_ms": percentile(0.50),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(self.max_lag * 1000, 2),
+            "current_ms": round(self.samples[-1] * 1000, 2) if self.samples else None,
+        }
+
+
+# Started by the app's lifespan
+loop_monitor = EventLoopLagMonitor()
@@ -1,32 +1,63 @@
 import os
+import hmac
+import json
 import uuid
+import asyncio
 import traceback
+from typing import List, Optional
+from contextlib import asynccontextmanager
 from fastapi import (
     FastAPI,
     File,
+    Form,
     UploadFile,
     HTTPException,
     Request,
     Depends,
     status,
-    BackgroundTasks,
     Body,
 )
-from fastapi.responses import Response, JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from dotenv import load_dotenv
-from process import extract_text, transform_clauses, process_documents_sync
 import base64
 import logging
 from datetime import timedelta, datetime
 import uvicorn
-import requests
+
+# Load environment variables from .env file. The local modules below read
+# their settings when imported, so this has to come first
+env_path = os.path.join(os.path.dirname(__file__), ".env")
+load_dotenv(dotenv_path=env_path)
+
+from process import (
+    process_documents_streaming,
+    prepare_seller_template,
+    compare_with_template,
+)
 
 # Import auth module
 import auth
 import schemas
+from jobs import (
+    JobManager,
+    create_job_store,
+    JOB_COMPLETED,
+    BATCH_WORKERS,
+    BATCH_MAX_CONTRACTS,
+)
+from extraction_cache import extraction_cache
+from llm_cache import llm_cache
+from company_cache import company_cache
+from extraction import shutdown_extraction_pool
+from supabase_rest import supabase_rest
+from analysis_history import history_store, record_analysis
+from loop_monitor import loop_monitor
+from template_registry import template_registry
+from uploads import MAX_UPLOAD_BYTES, SpooledPDF, UploadTooLarge, InvalidPDF, adopt_upload, upload_request_limit
 
 # Configure logging
 logging.basicConfig(
@@ -35,9 +66,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Load environment variables from .env file
-env_path = os.path.join(os.path.dirname(__file__), ".env")
-load_dotenv(dotenv_path=env_path)
 logger.info(f"Loading environment from: {env_path}")
 logger.info(f"Environment file exists: {os.path.exists(env_path)}")
 logger.info(f"Current working directory: {os.getcwd()}")
@@ -47,81 +75,33 @@ SUPABASE_URL = os.getenv("SUPABASE_URL", "your-supabase-url")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY", "your-supabase-key")
 
 
-# Function to ensure database tables exist
-def ensure_tables_exist():
-    try:
-        logger.info(
-            "Checking if company_profiles table exists and creating if needed..."
-        )
+# Worker pool for contract analyses, so /process never blocks the event loop
+job_store = create_job_store()
+job_manager = JobManager(job_store)
+# Batch comparisons share the job store, so /jobs/{job_id} covers them too
+batch_manager = JobManager(job_store, max_workers=BATCH_WORKERS)
 
-        # Important: We need to use the service role key (anon key won't work)
-        headers = {
-            "apikey": SUPABASE_KEY,
-            "Authorization": f"Bearer {SUPABASE_KEY}",
-            "Content-Type": "application/json",
-        }
 
-        # Try to access the company_profiles table
-        test_response = requests.get(
-            f"{SUPABASE_URL}/rest/v1/company_profiles?limit=1", headers=headers
-        )
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await supabase_rest.start()
+    loop_monitor.start()
+    yield
+    await loop_monitor.stop()
+    await supabase_rest.close()
+    job_manager.shutdown()
+    batch_manager.shutdown()
+    shutdown_extraction_pool()
 
-        logger.info(f"Table check response: {test_response.status_code}")
-
-        # If we get a 401/403, we need to disable RLS temporarily
-        if test_response.status_code in [401, 403]:
-            logger.info(
-                "RLS issues detected. Let's create necessary tables with appropriate permissions"
-            )
-
-            # We can't use execute_sql RPC since it doesn't exist.
-            # Instead, we'll use pgAdmin or Supabase dashboard to manually execute SQL
-            logger.info(
-                "Please execute the following SQL in your Supabase dashboard SQL editor:"
-            )
-            sql = """
-            -- Create table if it doesn't exist
-            CREATE TABLE IF NOT EXISTS company_profiles (
-                id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
-                user_id UUID NOT NULL UNIQUE,
-                name TEXT NOT NULL,
-                description TEXT,
-                industry TEXT,
-                business_type TEXT,
-                primary_customers TEXT,
-                contract_preferences TEXT,
-                created_at TIMESTAMPTZ DEFAULT NOW(),
-                updated_at TIMESTAMPTZ DEFAULT NOW()
-            );
-            
-            -- IMPORTANT: Disable RLS temporarily
-            ALTER TABLE company_profiles DISABLE ROW LEVEL SECURITY;
-            
-            -- Grant all permissions to authenticated users
-            GRANT ALL ON company_profiles TO authenticated;
-            GRANT ALL ON company_profiles TO service_role;
-            GRANT ALL ON company_profiles TO anon;
-            """
-
-            logger.info(sql)
-            logger.info("After executing this SQL, restart the server")
-
-        logger.info("Table setup completed")
-
-    except Exception as e:
-        logger.error(f"Error ensuring tables exist: {str(e)}")
-        logger.error(traceback.format_exc())
-
-
-# Call the function to ensure tables exist
-ensure_tables_exist()
 
 app = FastAPI(
     title="ContractLens API",
     description="API for analyzing and comparing legal contracts",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+
 # CORS middleware configuration
 origins = [
     "http://localhost",
@@ -154,6 +134,62 @@ async def health_check():
     return {"status": "healthy"}
 
 
+# Lets a metrics scraper read /metrics/* without a user session
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+
+async def require_metrics_access(token: str = Depends(auth.oauth2_scheme)):
+    """Allow the metrics endpoints with ``METRICS_TOKEN`` or a signed-in user's token."""
+    if METRICS_TOKEN and hmac.compare_digest(token.encode("utf-8"), METRICS_TOKEN.encode("utf-8")):
+        return
+    await auth.get_current_active_user(await auth.verify_token(token))
+
+
+@app.get("/metrics/cache", dependencies=[Depends(require_metrics_access)])
+async def cache_metrics():
+    return {
+        "extraction": extraction_cache.stats(),
+        "llm": llm_cache.stats(),
+        "auth": auth.token_cache.stats(),
+        "company": company_cache.stats(),
+    }
+
+
+@app.get("/metrics/event-loop", dependencies=[Depends(require_metrics_access)])
+async def event_loop_metrics(reset: bool = False):
+    stats = loop_monitor.stats()
+    if reset:
+        loop_monitor.reset()
+    return stats
+
+
+# Routes taking PDF uploads and how many files one request may carry
+UPLOAD_ROUTES = {
+    "/company-documents/templates": 1,
+    "/process": 2,
+    "/process/stream": 2,
+    "/process/batch": BATCH_MAX_CONTRACTS + 1,
+}
+
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """Reject oversized uploads from Content-Length, before the body is read.
+
+    Requests without a Content-Length are still checked per file once the
+    form is parsed.
+    """
+    files = UPLOAD_ROUTES.get(request.url.path)
+    length = request.headers.get("content-length")
+    if files and request.method == "POST" and length and length.isdigit():
+        if int(length) > upload_request_limit(files):
+            return JSONResponse(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                content={"detail": f"Upload too large. Maximum size is {MAX_UPLOAD_BYTES // (1024 * 1024)}MB per file"},
+            )
+    return await call_next(request)
+
+
 # Middleware to log requests
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -185,7 +221,10 @@ async def root():
                 <li><code>POST /auth/signup</code> - Create a new user</li>
                 <li><code>POST /auth/login</code> - User authentication</li>
                 <li><code>GET /users/me</code> - Get current user profile</li>
-                <li><code>POST /process</code> - Upload and analyze contracts</li>
+                <li><code>POST /process</code> - Upload contracts and queue an analysis job</li>
+                <li><code>POST /process/stream</code> - Upload contracts and stream the analysis as Server-Sent Events</li>
+                <li><code>POST /process/batch</code> - Compare one seller template against many buyer contracts, streaming results as Server-Sent Events</li>
+                <li><code>GET /jobs/{job_id}</code> - Check analysis job progress and result</li>
             </ul>
             <p>For more information, visit the <a href="http://localhost:3000">ContractLens Web App</a>.</p>
         </body>
@@ -273,9 +312,11 @@ async def validate_pdf(file: UploadFile):
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="File must be a PDF document")
 
-    if file.size and file.size > 10 * 1024 * 1024:  # 10MB limit
+    # Set by the form parser; receive_pdf checks the bytes themselves too
+    if file.size and file.size > MAX_UPLOAD_BYTES:
         raise HTTPException(
-            status_code=400, detail="File too large. Maximum size is 10MB"
+            status_code=400,
+            detail=f"File too large. Maximum size is {MAX_UPLOAD_BYTES // (1024 * 1024)}MB",
         )
 
     content_type = file.content_type
@@ -285,6 +326,64 @@ async def validate_pdf(file: UploadFile):
         )
 
 
+async def receive_pdf(file: UploadFile) -> SpooledPDF:
+    """Validate an uploaded PDF and hand it to the analysis pipeline.
+
+    The file Starlette spooled while parsing the form is used as is, not
+    copied. It is rejected when it passes ``MAX_UPLOAD_BYTES`` or has no PDF
+    header or trailer. The caller closes the returned ``SpooledPDF``.
+    """
+    await validate_pdf(file)
+    try:
+        return await run_in_threadpool(adopt_upload, file.file, file.filename)
+    except (UploadTooLarge, InvalidPDF) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def close_uploads(*uploads):
+    for upload in uploads:
+        if upload is not None:
+            upload.close()
+
+
+def remember_profile(user_id: str, response_data):
+    """Cache the profile row returned by a Supabase write."""
+    if isinstance(response_data, list):
+        response_data = response_data[0] if response_data else None
+    if isinstance(response_data, dict):
+        company_cache.set_profile(user_id, response_data)
+
+
+async def fetch_company_profile(user_id: str):
+    """Return the user's company profile, from the company cache when fresh.
+
+    Returns None when the user has no profile yet.
+    """
+    profile = company_cache.get_profile(user_id)
+    if profile is not None:
+        return profile
+
+    response = await supabase_rest.get(
+        "/rest/v1/company_profiles", params={"user_id": f"eq.{user_id}"}
+    )
+
+    logger.info(f"Profile lookup response: {response.status_code}")
+
+    if response.status_code != 200:
+        logger.error(f"Failed to retrieve company profile: {response.text}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to retrieve company profile: {response.text}",
+        )
+
+    profiles = response.json()
+    logger.info(f"Found profiles: {len(profiles) if profiles else 0}")
+    if not profiles:
+        return None
+    company_cache.set_profile(user_id, profiles[0])
+    return profiles[0]
+
+
 # Company profile endpoints
 @app.post("/company-profiles", response_model=schemas.CompanyProfileResponse)
 async def create_company_profile(
@@ -304,6 +403,9 @@ async def create_company_profile(
         )
         logger.info(f"Using user_id: {user_id}")
 
+        # The cached profile, priorities and prompt are stale once we write
+        company_cache.invalidate_user(user_id)
+
         # Format data for Supabase
         data = {
             "user_id": user_id,
@@ -324,27 +426,21 @@ async def create_company_profile(
         logger.info(f"SUPABASE_KEY length: {len(SUPABASE_KEY) if SUPABASE_KEY else 0}")
 
         # IMPORTANT: Try multiple header combinations to bypass RLS
-        # 1. Service role headers
-        service_headers = {
-            "apikey": SUPABASE_KEY,
-            "Authorization": f"Bearer {SUPABASE_KEY}",
-            "Content-Type": "application/json",
-            "Prefer": "return=representation",
-        }
+        # 1. Service role headers (the client sends the service key by default)
+        service_headers = {"Prefer": "return=representation"}
 
         # 2. Try with additional headers
         auth_headers = {
-            "apikey": SUPABASE_KEY,
-            "Authorization": f"Bearer {SUPABASE_KEY}",
-            "Content-Type": "application/json",
             "Prefer": "return=representation",
             "X-Client-Info": "supabase-js/2.29.0",
         }
+        profile_filter = {"user_id": f"eq.{user_id}"}
 
         try:
             # First check if profile exists
-            check_response = requests.get(
-                f"{SUPABASE_URL}/rest/v1/company_profiles?user_id=eq.{user_id}",
+            check_response = await supabase_rest.get(
+                "/rest/v1/company_profiles",
+                params=profile_filter,
                 headers=service_headers,
             )
 
@@ -355,8 +451,9 @@ async def create_company_profile(
                 # Update existing profile
                 logger.info("Updating existing profile")
                 try:
-                    update_response = requests.patch(
-                        f"{SUPABASE_URL}/rest/v1/company_profiles?user_id=eq.{user_id}",
+                    update_response = await supabase_rest.patch(
+                        "/rest/v1/company_profiles",
+                        params=profile_filter,
                         headers=service_headers,
                         json=data,
                     )
@@ -369,8 +466,9 @@ async def create_company_profile(
                     if update_response.status_code != 200:
                         # Try with auth headers
                         logger.info("Trying update with auth headers")
-                        update_response = requests.patch(
-                            f"{SUPABASE_URL}/rest/v1/company_profiles?user_id=eq.{user_id}",
+                        update_response = await supabase_rest.patch(
+                            "/rest/v1/company_profiles",
+                            params=profile_filter,
                             headers=auth_headers,
                             json=data,
                         )
@@ -387,6 +485,7 @@ async def create_company_profile(
                             return check_response.json()[0]
 
                     response_data = update_response.json()
+                    remember_profile(user_id, response_data)
                     return (
                         response_data[0]
                         if isinstance(response_data, list) and len(response_data) > 0
@@ -405,8 +504,8 @@ async def create_company_profile(
                 for attempt, headers in enumerate([service_headers, auth_headers], 1):
                     try:
                         logger.info(f"Creation attempt {attempt}")
-                        create_response = requests.post(
-                            f"{SUPABASE_URL}/rest/v1/company_profiles",
+                        create_response = await supabase_rest.post(
+                            "/rest/v1/company_profiles",
                             headers=headers,
                             json=data,
                         )
@@ -420,6 +519,7 @@ async def create_company_profile(
                             logger.info(
                                 f"Successfully created profile on attempt {attempt}"
                             )
+                            remember_profile(user_id, create_response.json())
                             return create_response.json()
                     except Exception as err:
                         logger.error(f"Error in attempt {attempt}: {str(err)}")
@@ -488,30 +588,9 @@ async def get_my_company_profile(current_user=Depends(auth.get_current_active_us
         )
         logger.info(f"Using user_id: {user_id}")
 
-        headers = {
-            "apikey": SUPABASE_KEY,
-            "Authorization": f"Bearer {SUPABASE_KEY}",
-            "Content-Type": "application/json",
-        }
-
-        response = requests.get(
-            f"{SUPABASE_URL}/rest/v1/company_profiles?user_id=eq.{user_id}",
-            headers=headers,
-        )
-
-        logger.info(f"Profile lookup response: {response.status_code}")
-
-        if response.status_code != 200:
-            logger.error(f"Failed to retrieve company profile: {response.text}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to retrieve company profile: {response.text}",
-            )
-
-        profiles = response.json()
-        logger.info(f"Found profiles: {len(profiles) if profiles else 0}")
+        profile = await fetch_company_profile(user_id)
 
-        if not profiles or len(profiles) == 0:
+        if not profile:
             # Instead of returning a 404, create a default profile
             logger.info(
                 f"No profile found for user {user_id}, creating default profile"
@@ -542,12 +621,7 @@ async def get_my_company_profile(current_user=Depends(auth.get_current_active_us
             logger.info(f"Creating profile with data: {data}")
 
             # Create a new profile
-            create_headers = {
-                "apikey": SUPABASE_KEY,
-                "Authorization": f"Bearer {SUPABASE_KEY}",
-                "Content-Type": "application/json",
-                "Prefer": "return=representation",
-            }
+            create_headers = {"Prefer": "return=representation"}
 
             # Log actual Supabase connection info (sanitized)
             logger.info(f"Using SUPABASE_URL: {SUPABASE_URL}")
@@ -556,8 +630,8 @@ async def get_my_company_profile(current_user=Depends(auth.get_current_active_us
             )
 
             try:
-                create_response = requests.post(
-                    f"{SUPABASE_URL}/rest/v1/company_profiles",
+                create_response = await supabase_rest.post(
+                    "/rest/v1/company_profiles",
                     headers=create_headers,
                     json=data,
                 )
@@ -584,6 +658,7 @@ async def get_my_company_profile(current_user=Depends(auth.get_current_active_us
                         "updated_at": datetime.utcnow(),
                     }
 
+                remember_profile(user_id, create_response.json())
                 return create_response.json()
             except Exception as create_err:
                 logger.error(f"Exception creating profile: {str(create_err)}")
@@ -601,7 +676,7 @@ async def get_my_company_profile(current_user=Depends(auth.get_current_active_us
                     "updated_at": datetime.utcnow(),
                 }
 
-        return profiles[0]
+        return profile
 
     except HTTPException as he:
         raise he
@@ -622,71 +697,472 @@ async def get_my_company_profile(current_user=Depends(auth.get_current_active_us
         }
 
 
-@app.post("/process")
-async def process_documents(
-    background_tasks: BackgroundTasks,
+async def get_company_info(user_id: str):
+    """Look up the company name and ID for a user, falling back to defaults."""
+    company_name = "Your Company"
+    company_id = None
+    try:
+        profile = await fetch_company_profile(user_id)
+        if profile:
+            company_name = profile.get("name", "Your Company")
+            company_id = profile.get("id")
+    except Exception as e:
+        logger.warning(f"Failed to get company information: {str(e)}")
+        # Continue with default name
+    return company_name, company_id
+
+
+def run_analysis_job(
+    seller_content: Optional[SpooledPDF],
+    buyer_content: SpooledPDF,
+    seller_filename: str,
+    buyer_filename: str,
+    company_name: str,
+    company_id: str,
+    job_id: str,
+    event_callback=None,
+    template=None,
+) -> str:
+    """Run the full analysis pipeline for a queued job and return the summary.
+
+    With a registered ``template`` only the buyer contract is extracted.
+    The spooled uploads are closed once the job finishes.
+    ``event_callback(event, data)``, if given, receives stage and chunk
+    progress events plus the model's token stream.
+    """
+    chunk_progress = job_manager.chunk_progress(job_id)
+
+    def set_stage(stage: str):
+        job_manager.set_stage(job_id, stage)
+        if event_callback:
+            event_callback("progress", {"stage": stage})
+
+    def on_chunk_done(chunk_index: int, total: int):
+        chunk_progress(chunk_index, total)
+        if event_callback:
+            event_callback("progress", {"chunk_completed": chunk_index, "chunks_total": total})
+
+    # Extraction and analysis overlap: chunks are analyzed as pages are parsed
+    set_stage("analyzing")
+    try:
+        if template is not None:
+            result = compare_with_template(
+                template,
+                buyer_content,
+                buyer_filename,
+                progress_callback=on_chunk_done,
+                event_callback=event_callback,
+            )
+        else:
+            result = process_documents_streaming(
+                seller_content,
+                buyer_content,
+                seller_filename,
+                buyer_filename,
+                company_name,
+                company_id,
+                progress_callback=on_chunk_done,
+                event_callback=event_callback,
+            )
+    finally:
+        close_uploads(seller_content, buyer_content)
+    save_to_history(job_manager, job_id, seller_filename, buyer_filename, result["summary"])
+    return result["summary"]
+
+
+def save_to_history(manager: JobManager, job_id: str, seller_filename: str, buyer_filename: str, summary: str):
+    """Add a finished job's report to its user's analysis history."""
+    job = manager.get(job_id)
+    if job:
+        record_analysis(job_id, job["user_id"], seller_filename, buyer_filename, summary)
+
+
+def run_template_job(template, buyer_content: SpooledPDF, buyer_filename: str, job_id: str) -> str:
+    """Analyze one buyer contract of a batch against the prepared seller template."""
+    batch_manager.set_stage(job_id, "analyzing")
+    try:
+        result = compare_with_template(
+            template,
+            buyer_content,
+            buyer_filename,
+            progress_callback=batch_manager.chunk_progress(job_id),
+        )
+    finally:
+        buyer_content.close()
+    save_to_history(batch_manager, job_id, template.filename, buyer_filename, result["summary"])
+    return result["summary"]
+
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def resolve_template(seller_tc: Optional[UploadFile], template_id: Optional[str], company_name: str, company_id: str):
+    """Return the registered template to compare against.
+
+    Returns None when the seller contract was uploaded instead. Without
+    either, the company's primary template is used.
+    """
+    if seller_tc is not None and template_id:
+        raise HTTPException(
+            status_code=400, detail="Provide either seller_tc or template_id, not both"
+        )
+    if seller_tc is not None:
+        await validate_pdf(seller_tc)
+        return None
+    if not template_id and company_id:
+        template_id = await run_in_threadpool(template_registry.primary_id, company_id)
+    if not template_id:
+        raise HTTPException(
+            status_code=400, detail="Upload seller_tc or pass a template_id"
+        )
+    template = await run_in_threadpool(
+        template_registry.load, template_id, company_name, company_id
+    )
+    if template is None:
+        raise HTTPException(status_code=404, detail="Template not found")
+    return template
+
+
+@app.post(
+    "/company-documents/templates",
+    response_model=schemas.CompanyDocumentResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def register_template(
     seller_tc: UploadFile = File(...),
-    buyer_tc: UploadFile = File(...),
+    description: Optional[str] = Form(None),
+    is_primary_template: bool = Form(True),
     current_user=Depends(auth.get_current_active_user),
 ):
+    """Register a seller contract as a template for later comparisons.
+
+    The PDF is extracted, normalized and segmented once; pass the returned
+    id as ``template_id`` to ``/process`` to skip uploading it again.
+    """
+    company_name, company_id = await get_company_info(current_user["id"])
+    if not company_id:
+        raise HTTPException(
+            status_code=400, detail="Create a company profile before registering templates"
+        )
+
+    seller_content = await receive_pdf(seller_tc)
     try:
-        # Get company name and ID if available
-        company_name = "Your Company"
-        company_id = None
-        try:
-            headers = {
-                "apikey": SUPABASE_KEY,
-                "Authorization": f"Bearer {SUPABASE_KEY}",
-                "Content-Type": "application/json",
-            }
+        return await run_in_threadpool(
+            template_registry.register,
+            seller_content,
+            seller_tc.filename,
+            company_name,
+            company_id,
+            description,
+            is_primary_template,
+        )
+    except Exception as e:
+        logger.error(f"Error registering template: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while processing the template",
+        )
+    finally:
+        seller_content.close()
 
-            response = requests.get(
-                f"{SUPABASE_URL}/rest/v1/company_profiles?user_id=eq.{current_user['id']}",
-                headers=headers,
-            )
 
-            if response.status_code == 200:
-                profiles = response.json()
-                if profiles and len(profiles) > 0:
-                    company_name = profiles[0].get("name", "Your Company")
-                    company_id = profiles[0].get("id")
-        except Exception as e:
-            logger.warning(f"Failed to get company information: {str(e)}")
-            # Continue with default name
+@app.get(
+    "/company-documents/templates",
+    response_model=List[schemas.CompanyDocumentResponse],
+)
+async def list_templates(current_user=Depends(auth.get_current_active_user)):
+    _, company_id = await get_company_info(current_user["id"])
+    if not company_id:
+        return []
+    try:
+        return await run_in_threadpool(template_registry.list, company_id)
+    except Exception as e:
+        logger.error(f"Error listing templates: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to list templates",
+        )
+
 
+@app.post(
+    "/process",
+    response_model=schemas.JobCreatedResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def process_documents(
+    seller_tc: Optional[UploadFile] = File(None),
+    buyer_tc: UploadFile = File(...),
+    template_id: Optional[str] = Form(None),
+    current_user=Depends(auth.get_current_active_user),
+):
+    """Queue an analysis of ``buyer_tc`` against an uploaded seller contract
+    or a registered template (``template_id``, or the company's primary one).
+    """
+    seller_content = buyer_content = None
+    try:
         # Validate files
-        await validate_pdf(seller_tc)
         await validate_pdf(buyer_tc)
+        company_name, company_id = await get_company_info(current_user["id"])
+        template = await resolve_template(seller_tc, template_id, company_name, company_id)
+
+        seller_content = await receive_pdf(seller_tc) if template is None else None
+        seller_filename = seller_tc.filename if template is None else template.filename
+        buyer_content = await receive_pdf(buyer_tc)
+
+        # Queue the analysis; the worker pool does all blocking work
+        job = await run_in_threadpool(
+            job_manager.submit,
+            current_user["id"],
+            run_analysis_job,
+            seller_content,
+            buyer_content,
+            seller_filename,
+            buyer_tc.filename,
+            company_name,
+            company_id,
+            metadata={
+                "seller_filename": seller_filename,
+                "buyer_filename": buyer_tc.filename,
+            },
+            template=template,
+        )
+        return {"job_id": job["id"], "status": job["status"]}
+
+    except HTTPException as he:
+        close_uploads(seller_content, buyer_content)
+        raise he
+    except Exception as e:
+        close_uploads(seller_content, buyer_content)
+        logger.error(f"Error queueing document processing: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred during document processing",
+        )
 
-        # Process the documents
-        seller_content = await seller_tc.read()
-        buyer_content = await buyer_tc.read()
 
-        # Extract text from PDFs
-        seller_text = extract_text(seller_content)
-        buyer_text = extract_text(buyer_content)
+@app.post("/process/stream")
+async def process_documents_stream(
+    seller_tc: Optional[UploadFile] = File(None),
+    buyer_tc: UploadFile = File(...),
+    template_id: Optional[str] = Form(None),
+    current_user=Depends(auth.get_current_active_user),
+):
+    """Queue an analysis and stream its progress as Server-Sent Events.
+
+    Events: ``job`` (job id), ``progress`` (stage and chunk completion),
+    ``chunk_start``/``token``/``chunk_end`` (model output per chunk index;
+    ``chunk_reset`` means discard that chunk's tokens, a retry follows),
+    then ``summary`` with the final report or ``error``. The job is also
+    visible through ``GET /jobs/{job_id}``. The seller side is chosen as in
+    ``/process``.
+    """
+    await validate_pdf(buyer_tc)
+    company_name, company_id = await get_company_info(current_user["id"])
+    template = await resolve_template(seller_tc, template_id, company_name, company_id)
+
+    seller_content = await receive_pdf(seller_tc) if template is None else None
+    seller_filename = seller_tc.filename if template is None else template.filename
+    try:
+        buyer_content = await receive_pdf(buyer_tc)
+    except HTTPException:
+        close_uploads(seller_content)
+        raise
+
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
 
-        # Process documents using the process module
-        result = process_documents_sync(
-            seller_text, 
-            buyer_text, 
-            seller_tc.filename, 
-            buyer_tc.filename, 
+    def push(event: str, data: dict):
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+    def on_done(job: dict):
+        if job and job.get("status") == JOB_COMPLETED:
+            push("summary", {"summary": job.get("summary")})
+        else:
+            push("error", {"detail": (job or {}).get("error") or "Analysis failed"})
+        push(None, None)
+
+    try:
+        job = await run_in_threadpool(
+            job_manager.submit,
+            current_user["id"],
+            run_analysis_job,
+            seller_content,
+            buyer_content,
+            seller_filename,
+            buyer_tc.filename,
             company_name,
-            company_id
+            company_id,
+            metadata={
+                "seller_filename": seller_filename,
+                "buyer_filename": buyer_tc.filename,
+            },
+            done_callback=on_done,
+            event_callback=push,
+            template=template,
+        )
+    except Exception as e:
+        close_uploads(seller_content, buyer_content)
+        logger.error(f"Error queueing document processing: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred during document processing",
         )
 
-        # Return the results (without PDF content)
-        return {"summary": result["summary"]}
+    async def event_stream():
+        yield format_sse("job", {"job_id": job["id"], "status": job["status"]})
+        while True:
+            event, data = await events.get()
+            if event is None:
+                break
+            yield format_sse(event, data)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
+@app.post("/process/batch")
+async def process_documents_batch(
+    seller_tc: Optional[UploadFile] = File(None),
+    buyer_tcs: List[UploadFile] = File(...),
+    template_id: Optional[str] = Form(None),
+    current_user=Depends(auth.get_current_active_user),
+):
+    """Compare one seller template against many buyer contracts.
+
+    The seller contract is extracted and segmented once, then each buyer
+    contract runs as its own job on the batch worker pool, sharing the LLM
+    rate limiter. A registered template can be used instead of uploading
+    the seller contract, as in ``/process``. Results stream as Server-Sent Events: ``batch`` (job id
+    per buyer file), one ``result`` per contract as it finishes (summary or
+    error), then ``done``.
+    """
+    if len(buyer_tcs) > BATCH_MAX_CONTRACTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many buyer contracts. Maximum is {BATCH_MAX_CONTRACTS}",
+        )
+    for buyer_tc in buyer_tcs:
+        await validate_pdf(buyer_tc)
+    company_name, company_id = await get_company_info(current_user["id"])
+    template = await resolve_template(seller_tc, template_id, company_name, company_id)
+    buyer_files = []
+    try:
+        for buyer_tc in buyer_tcs:
+            buyer_files.append((buyer_tc.filename, await receive_pdf(buyer_tc)))
+        if template is None:
+            # The template keeps only the extracted clauses, not the PDF
+            with await receive_pdf(seller_tc) as seller_content:
+                template = await run_in_threadpool(
+                    prepare_seller_template,
+                    seller_content,
+                    seller_tc.filename,
+                    company_name,
+                    company_id,
+                )
+    except HTTPException:
+        close_uploads(*(content for _, content in buyer_files))
+        raise
+    except Exception as e:
+        close_uploads(*(content for _, content in buyer_files))
+        logger.error(f"Error preparing seller template: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while processing the seller contract",
+        )
+
+    loop = asyncio.get_running_loop()
+    results: asyncio.Queue = asyncio.Queue()
+
+    def on_done(job: dict, index: int, buyer_filename: str):
+        job = job or {}
+        result = {
+            "index": index,
+            "job_id": job.get("id"),
+            "buyer_filename": buyer_filename,
+            "status": job.get("status"),
+        }
+        if job.get("status") == JOB_COMPLETED:
+            result["summary"] = job.get("summary")
+        else:
+            result["error"] = job.get("error") or "Analysis failed"
+        loop.call_soon_threadsafe(results.put_nowait, result)
+
+    jobs = []
+    try:
+        for index, (buyer_filename, buyer_content) in enumerate(buyer_files):
+            job = await run_in_threadpool(
+                batch_manager.submit,
+                current_user["id"],
+                run_template_job,
+                template,
+                buyer_content,
+                buyer_filename,
+                metadata={
+                    "seller_filename": template.filename,
+                    "buyer_filename": buyer_filename,
+                    "batch_index": index,
+                },
+                done_callback=lambda job, index=index, buyer_filename=buyer_filename: on_done(
+                    job, index, buyer_filename
+                ),
+            )
+            jobs.append(
+                {"index": index, "job_id": job["id"], "buyer_filename": buyer_filename}
+            )
     except Exception as e:
-        logger.error(f"Error during document processing: {str(e)}")
+        # Submitted jobs close their own uploads
+        close_uploads(*(content for _, content in buyer_files[len(jobs):]))
+        logger.error(f"Error queueing batch processing: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred during document processing",
         )
 
+    async def event_stream():
+        yield format_sse("batch", {"jobs": jobs})
+        completed = 0
+        for _ in jobs:
+            result = await results.get()
+            if result["status"] == JOB_COMPLETED:
+                completed += 1
+            yield format_sse("result", result)
+        yield format_sse("done", {"completed": completed, "failed": len(jobs) - completed})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/jobs/{job_id}", response_model=schemas.JobResponse)
+async def get_job(job_id: str, current_user=Depends(auth.get_current_active_user)):
+    job = await run_in_threadpool(job_manager.get, job_id)
+    if not job or job.get("user_id") != current_user["id"]:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/analysis-history", response_model=List[schemas.AnalysisHistoryResponse])
+async def get_analysis_history(current_user=Depends(auth.get_current_active_user)):
+    try:
+        return await run_in_threadpool(history_store.list_analyses, current_user["id"])
+    except Exception as e:
+        logger.error(f"Error fetching analysis history: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch analysis history",
+        )
+
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
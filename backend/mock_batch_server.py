@@ -0,0 +1,285 @@
+"""Local stand-in for the OpenAI Files, Batch and Chat Completions APIs.
+
+Implements just enough of ``/v1/files``, ``/v1/batches`` and
+``/v1/chat/completions`` for ``offline_batch.py`` and ``loadtest.py`` to run
+without network access::
+
+    python mock_batch_server.py --port 8765
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 python offline_batch.py ...
+
+Batches complete ``--delay`` seconds after creation. Each response echoes
+the clause labels of its request, and ``--fail-every N`` turns every Nth
+request into an error so partial failures can be exercised.
+
+Chat completions take ``--latency`` seconds (plus up to ``--jitter``).
+``--rpm`` enforces a per-minute request quota with OpenAI's rate-limit
+headers, and ``--error-rate`` answers that fraction of requests with a 429
+regardless of the quota.
+"""
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+
+import uvicorn
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+app = FastAPI(title="Mock OpenAI Batch API")
+app.state.delay = 0.0
+app.state.fail_every = 0
+app.state.latency = 0.0
+app.state.jitter = 0.0
+app.state.rpm = 0
+app.state.error_rate = 0.0
+app.state.window_start = 0.0
+app.state.window_requests = 0
+
+files = {}
+batches = {}
+stats = {"chat_completions": 0, "rate_limited": 0}
+
+
+def file_object(file_id: str) -> dict:
+    entry = files[file_id]
+    return {
+        "id": file_id,
+        "object": "file",
+        "bytes": len(entry["content"]),
+        "created_at": entry["created_at"],
+        "filename": entry["filename"],
+        "purpose": entry["purpose"],
+        "status": "processed",
+    }
+
+
+def store_file(content: bytes, filename: str, purpose: str) -> str:
+    file_id = f"file-{uuid.uuid4().hex}"
+    files[file_id] = {
+        "content": content,
+        "filename": filename,
+        "purpose": purpose,
+        "created_at": int(time.time()),
+    }
+    return file_id
+
+
+def clause_labels(body: dict) -> list:
+    user_message = body["messages"][-1]["content"]
+    return sorted({
+        int(label)
+        for label in (part.split("]")[0] for part in user_message.split("[Clause ")[1:])
+        if label.isdigit()
+    })
+
+
+def mock_analysis(body: dict) -> str:
+    """One labeled section per clause, the way the analysis prompt asks for."""
+    return "\n\n".join(
+        f"[Clause {n}] Mock analysis: the buyer's wording differs from the seller's terms."
+        for n in clause_labels(body)
+    ) or "Mock analysis: no labeled clauses."
+
+
+def run_batch(batch: dict):
+    """Produce the output and error files for a batch."""
+    outputs, errors = [], []
+    lines = files[batch["input_file_id"]]["content"].decode("utf-8").splitlines()
+    for number, line in enumerate(filter(None, lines), 1):
+        request = json.loads(line)
+        custom_id = request["custom_id"]
+        if app.state.fail_every and number % app.state.fail_every == 0:
+            errors.append({
+                "id": f"batch_req_{uuid.uuid4().hex}",
+                "custom_id": custom_id,
+                "response": None,
+                "error": {"code": "mock_failure", "message": "Injected failure"},
+            })
+            continue
+        outputs.append({
+            "id": f"batch_req_{uuid.uuid4().hex}",
+            "custom_id": custom_id,
+            "response": {
+                "status_code": 200,
+                "request_id": uuid.uuid4().hex,
+                "body": {
+                    "id": f"chatcmpl-{uuid.uuid4().hex}",
+                    "object": "chat.completion",
+                    "model": request["body"]["model"],
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": mock_analysis(request["body"])},
+                        "finish_reason": "stop",
+                    }],
+                },
+            },
+            "error": None,
+        })
+
+    def to_file(rows, name):
+        content = "".join(json.dumps(row) + "\n" for row in rows).encode("utf-8")
+        return store_file(content, name, "batch_output") if rows else None
+
+    batch["output_file_id"] = to_file(outputs, f"{batch['id']}_output.jsonl")
+    batch["error_file_id"] = to_file(errors, f"{batch['id']}_error.jsonl")
+    batch["request_counts"] = {
+        "total": len(outputs) + len(errors),
+        "completed": len(outputs),
+        "failed": len(errors),
+    }
+    batch["status"] = "completed"
+    batch["completed_at"] = int(time.time())
+
+
+@app.post("/v1/files")
+async def upload_file(file: UploadFile = File(...), purpose: str = Form(...)):
+    file_id = store_file(await file.read(), file.filename, purpose)
+    return file_object(file_id)
+
+
+@app.get("/v1/files/{file_id}")
+async def get_file(file_id: str):
+    if file_id not in files:
+        raise HTTPException(status_code=404, detail="File not found")
+    return file_object(file_id)
+
+
+@app.get("/v1/files/{file_id}/content")
+async def get_file_content(file_id: str):
+    if file_id not in files:
+        raise HTTPException(status_code=404, detail="File not found")
+    return Response(files[file_id]["content"], media_type="application/jsonl")
+
+
+@app.post("/v1/batches")
+async def create_batch(payload: dict):
+    if payload.get("input_file_id") not in files:
+        raise HTTPException(status_code=400, detail="Unknown input_file_id")
+    batch_id = f"batch_{uuid.uuid4().hex}"
+    batches[batch_id] = {
+        "id": batch_id,
+        "object": "batch",
+        "endpoint": payload["endpoint"],
+        "completion_window": payload["completion_window"],
+        "input_file_id": payload["input_file_id"],
+        "status": "in_progress",
+        "created_at": int(time.time()),
+        "output_file_id": None,
+        "error_file_id": None,
+        "request_counts": {"total": 0, "completed": 0, "failed": 0},
+    }
+    return batches[batch_id]
+
+
+def rate_limit_headers() -> dict:
+    """Advance the one-minute request window; returns its headers."""
+    now = time.monotonic()
+    if now - app.state.window_start >= 60:
+        app.state.window_start = now
+        app.state.window_requests = 0
+    app.state.window_requests += 1
+    reset_ms = int((app.state.window_start + 60 - now) * 1000)
+    limit = app.state.rpm or 10000
+    return {
+        "x-ratelimit-limit-requests": str(limit),
+        "x-ratelimit-remaining-requests": str(max(0, limit - app.state.window_requests)),
+        "x-ratelimit-reset-requests": f"{reset_ms}ms",
+        "x-ratelimit-limit-tokens": "10000000",
+        "x-ratelimit-remaining-tokens": "10000000",
+        "x-ratelimit-reset-tokens": "0ms",
+    }
+
+
+def rate_limited(headers: dict) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        headers=dict(headers, **{"retry-after-ms": headers["x-ratelimit-reset-requests"][:-2]}),
+        content={"error": {
+            "message": "Rate limit reached for requests",
+            "type": "requests",
+            "code": "rate_limit_exceeded",
+        }},
+    )
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(payload: dict):
+    stats["chat_completions"] += 1
+    headers = rate_limit_headers()
+    if app.state.rpm and app.state.window_requests > app.state.rpm:
+        stats["rate_limited"] += 1
+        return rate_limited(headers)
+    if app.state.error_rate and random.random() < app.state.error_rate:
+        stats["rate_limited"] += 1
+        return rate_limited(dict(headers, **{"x-ratelimit-reset-requests": "1000ms"}))
+
+    await asyncio.sleep(app.state.latency + random.uniform(0, app.state.jitter))
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    content = mock_analysis(payload)
+    if not payload.get("stream"):
+        return JSONResponse(headers=headers, content={
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+        })
+
+    def chunk(delta: dict, finish_reason=None) -> str:
+        return "data: " + json.dumps({
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": payload["model"],
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }) + "\n\n"
+
+    def stream():
+        yield chunk({"role": "assistant", "content": ""})
+        for word in content.split(" "):
+            yield chunk({"content": word + " "})
+        yield chunk({}, "stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), headers=headers, media_type="text/event-stream")
+
+
+@app.get("/v1/batches/{batch_id}")
+async def get_batch(batch_id: str):
+    batch = batches.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    if batch["status"] == "in_progress" and time.time() - batch["created_at"] >= app.state.delay:
+        run_batch(batch)
+    return batch
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock OpenAI Batch API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds before a batch completes")
+    parser.add_argument("--fail-every", type=int, default=0, help="Fail every Nth request")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per chat completion")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random seconds per chat completion")
+    parser.add_argument("--rpm", type=int, default=0, help="Chat completion requests allowed per minute")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of chat completions answered with 429")
+    args = parser.parse_args()
+    app.state.delay = args.delay
+    app.state.fail_every = args.fail_every
+    app.state.latency = args.latency
+    app.state.jitter = args.jitter
+    app.state.rpm = args.rpm
+    app.state.error_rate = args.error_rate
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,134 @@
+"""Local stand-in for the Supabase auth and REST endpoints the API calls.
+
+Every bearer token that looks like a JWT is accepted by ``/auth/v1/user``,
+and every user gets a company profile with no contract priorities::
+
+    python mock_supabase_server.py --port 8766
+    SUPABASE_URL=http://127.0.0.1:8766 uvicorn main:app
+
+``--latency`` adds that many seconds to every response. Writes to any other
+table are echoed back and kept in memory.
+"""
+import json
+import time
+import uuid
+import base64
+import asyncio
+import argparse
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Mock Supabase")
+app.state.latency = 0.0
+
+tables = {}
+stats = {"auth": 0, "rest": 0}
+
+
+def token_claims(request: Request) -> dict:
+    """Decode the bearer token's payload without verifying it."""
+    token = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+    try:
+        payload = token.split(".")[1]
+        return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except (IndexError, ValueError):
+        return {}
+
+
+def eq_filter(request: Request) -> dict:
+    """PostgREST ``column=eq.value`` query parameters as ``{column: value}``."""
+    return {
+        column: value[3:]
+        for column, value in request.query_params.items()
+        if value.startswith("eq.")
+    }
+
+
+def company_profile(user_id: str) -> dict:
+    return {
+        "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"company:{user_id}")),
+        "user_id": user_id,
+        "name": "Load Test Rentals",
+        "description": "Generated by mock_supabase_server.py",
+        "industry": "Equipment rental",
+        "created_at": "2024-01-01T00:00:00+00:00",
+    }
+
+
+@app.middleware("http")
+async def add_latency(request: Request, call_next):
+    if app.state.latency:
+        await asyncio.sleep(app.state.latency)
+    return await call_next(request)
+
+
+@app.get("/auth/v1/user")
+async def get_user(request: Request):
+    stats["auth"] += 1
+    claims = token_claims(request)
+    if not claims.get("sub"):
+        return JSONResponse(status_code=401, content={"msg": "invalid JWT"})
+    return {
+        "id": claims["sub"],
+        "email": claims.get("email", f"{claims['sub']}@example.com"),
+        "user_metadata": {},
+    }
+
+
+@app.get("/rest/v1/company_profiles")
+async def get_company_profiles(request: Request):
+    stats["rest"] += 1
+    user_id = eq_filter(request).get("user_id")
+    return [company_profile(user_id)] if user_id else []
+
+
+@app.get("/rest/v1/{table}")
+async def get_rows(table: str, request: Request):
+    stats["rest"] += 1
+    filters = eq_filter(request)
+    return [
+        row for row in tables.get(table, [])
+        if all(str(row.get(column)) == value for column, value in filters.items())
+    ]
+
+
+@app.post("/rest/v1/{table}")
+async def insert_rows(table: str, request: Request):
+    stats["rest"] += 1
+    body = await request.json()
+    rows = body if isinstance(body, list) else [body]
+    for row in rows:
+        row.setdefault("id", str(uuid.uuid4()))
+        row.setdefault("created_at", time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime()))
+    tables.setdefault(table, []).extend(rows)
+    return JSONResponse(status_code=201, content=rows)
+
+
+@app.patch("/rest/v1/{table}")
+async def update_rows(table: str, request: Request):
+    stats["rest"] += 1
+    body = await request.json()
+    filters = eq_filter(request)
+    updated = []
+    for row in tables.get(table, []):
+        if all(str(row.get(column)) == value for column, value in filters.items()):
+            row.update(body)
+            updated.append(row)
+    return updated
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock Supabase auth and REST server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    args = parser.parse_args()
+    app.state.latency = args.latency
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,251 @@
+"""Offline bulk analysis through the OpenAI Batch API.
+
+Every chunk-pair request for every buyer contract is written to one JSONL
+file, submitted as a single batch, polled until it finishes, and the
+responses are reassembled into one report per contract::
+
+    python offline_batch.py --seller seller.pdf --out reports buyer1.pdf buyer2.pdf
+
+Batch requests are not subject to the real-time rate limits. Set
+``OPENAI_BASE_URL`` to a running ``mock_batch_server.py`` to exercise the
+whole flow without network access.
+"""
+import os
+import json
+import time
+import argparse
+from dataclasses import dataclass, field
+
+from process import (
+    get_openai_client,
+    LLM_MODEL,
+    LLM_TEMPERATURE,
+    LLM_MAX_TOKENS,
+    build_chunk_messages,
+    build_seller_template,
+    plan_against_template,
+    preprocess_text,
+    join_analysis,
+    generate_change_summary,
+    extract_text,
+)
+from llm_cache import llm_cache, llm_cache_key
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+BATCH_POLL_INTERVAL = float(os.getenv("OFFLINE_BATCH_POLL_INTERVAL", "60"))
+BATCH_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+# Follow-up batches for requests that failed in the previous one
+OFFLINE_BATCH_RETRIES = int(os.getenv("OFFLINE_BATCH_RETRIES", "1"))
+
+
+@dataclass
+class BatchContract:
+    """One buyer contract's planned requests and the responses received so far."""
+
+    name: str
+    buyer_text: str
+    system_prompt: str
+    pairs: list
+    unchanged: list = field(default_factory=list)
+    history: object = None
+    responses: dict = field(default_factory=dict)
+    errors: dict = field(default_factory=dict)
+
+
+def request_id(contract_index: int, chunk_index: int) -> str:
+    return f"contract-{contract_index}-chunk-{chunk_index}"
+
+
+def parse_request_id(custom_id: str) -> tuple:
+    _, contract_index, _, chunk_index = custom_id.split("-")
+    return int(contract_index), int(chunk_index)
+
+
+def plan_contracts(seller_text: str, buyers: list, company_name: str = "Seller", company_id: str = None) -> list:
+    """Align and pack each ``(name, buyer_text)`` against the seller contract.
+
+    The seller contract is segmented and indexed once for all buyers.
+    """
+    template = build_seller_template(preprocess_text(seller_text), "seller contract", company_name, company_id)
+    contracts = []
+    for name, buyer_text in buyers:
+        plan = plan_against_template(template, [buyer_text])
+        pairs = list(plan.pairs)
+        print(f"Packed {name} into {len(pairs)} requests, {len(plan.unchanged)} clauses unchanged, {len(plan.history.reused)} reused from history")
+        contracts.append(
+            BatchContract(name, buyer_text, plan.system_prompt, pairs, plan.unchanged, plan.history)
+        )
+    return contracts
+
+
+def cache_key(contract: BatchContract, chunk_index: int) -> str:
+    buyer_chunk, seller_chunk = contract.pairs[chunk_index]
+    return llm_cache_key(
+        LLM_MODEL, contract.system_prompt, seller_chunk, buyer_chunk, LLM_TEMPERATURE, LLM_MAX_TOKENS
+    )
+
+
+def build_request_lines(contracts: list, company_name: str = "Seller") -> list:
+    """Build batch request lines for every chunk pair without a response yet."""
+    lines = []
+    for contract_index, contract in enumerate(contracts):
+        for chunk_index, (buyer_chunk, seller_chunk) in enumerate(contract.pairs):
+            if chunk_index in contract.responses:
+                continue
+            cached = llm_cache.get(cache_key(contract, chunk_index))
+            if cached is not None:
+                contract.responses[chunk_index] = cached
+                continue
+            lines.append({
+                "custom_id": request_id(contract_index, chunk_index),
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": {
+                    "model": LLM_MODEL,
+                    "messages": build_chunk_messages(
+                        contract.system_prompt, seller_chunk, buyer_chunk, company_name
+                    ),
+                    "temperature": LLM_TEMPERATURE,
+                    "max_tokens": LLM_MAX_TOKENS,
+                },
+            })
+    return lines
+
+
+def write_request_file(lines: list, path: str) -> str:
+    with open(path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+    return path
+
+
+def submit_batch(path: str) -> str:
+    """Upload the request file and create a batch; returns the batch id."""
+    with open(path, "rb") as f:
+        uploaded = get_openai_client().files.create(file=f, purpose="batch")
+    batch = get_openai_client().batches.create(
+        input_file_id=uploaded.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window=BATCH_COMPLETION_WINDOW,
+    )
+    print(f"Submitted batch {batch.id} from {path}")
+    return batch.id
+
+
+def wait_for_batch(batch_id: str, poll_interval: float = BATCH_POLL_INTERVAL):
+    """Poll the batch until it reaches a terminal status and return it."""
+    while True:
+        batch = get_openai_client().batches.retrieve(batch_id)
+        counts = batch.request_counts
+        if counts:
+            print(f"Batch {batch_id} {batch.status}: {counts.completed}/{counts.total} done, {counts.failed} failed")
+        else:
+            print(f"Batch {batch_id} {batch.status}")
+        if batch.status in BATCH_TERMINAL_STATUSES:
+            return batch
+        time.sleep(poll_interval)
+
+
+def read_file_lines(file_id: str) -> list:
+    if not file_id:
+        return []
+    content = get_openai_client().files.content(file_id).text
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+def collect_results(batch, contracts: list, company_id: str = None):
+    """Store each batch response (or error) on its contract."""
+    for line in read_file_lines(batch.output_file_id) + read_file_lines(batch.error_file_id):
+        contract_index, chunk_index = parse_request_id(line["custom_id"])
+        contract = contracts[contract_index]
+        response = line.get("response") or {}
+        if response.get("status_code") == 200:
+            content = response["body"]["choices"][0]["message"]["content"]
+            contract.responses[chunk_index] = content
+            llm_cache.set(cache_key(contract, chunk_index), content, company_id=company_id)
+        else:
+            error = line.get("error") or response.get("body", {}).get("error") or "no response"
+            contract.errors[chunk_index] = error
+
+
+def assemble_reports(contracts: list, company_name: str = "Seller") -> dict:
+    """Return ``{name: {"summary": ...}}``, or ``{"error": ...}`` for contracts with missing chunks."""
+    reports = {}
+    for contract in contracts:
+        missing = [i for i in range(len(contract.pairs)) if i not in contract.responses]
+        if missing:
+            errors = [f"chunk {i + 1}: {contract.errors.get(i, 'no response')}" for i in missing]
+            reports[contract.name] = {"error": "; ".join(str(e) for e in errors)}
+            continue
+        responses = [contract.responses[i] for i in range(len(contract.pairs))]
+        if contract.history:
+            contract.history.record(responses)
+        transformed_text = join_analysis(responses, contract.unchanged, contract.history)
+        reports[contract.name] = {
+            "summary": generate_change_summary(contract.buyer_text, transformed_text, company_name)
+        }
+    return reports
+
+
+def run_offline_batch(seller_content: bytes, buyer_files: list, company_name: str = "Seller", company_id: str = None, work_dir: str = ".", poll_interval: float = BATCH_POLL_INTERVAL, retries: int = OFFLINE_BATCH_RETRIES) -> dict:
+    """Analyze ``(name, pdf_bytes)`` buyer contracts against one seller contract.
+
+    All requests go out in one batch; requests that fail are resubmitted in
+    up to ``retries`` follow-up batches.
+    """
+    seller_text = extract_text(seller_content)
+    buyers = [(name, extract_text(content)) for name, content in buyer_files]
+    contracts = plan_contracts(seller_text, buyers, company_name, company_id)
+    os.makedirs(work_dir, exist_ok=True)
+
+    for attempt in range(retries + 1):
+        lines = build_request_lines(contracts, company_name)
+        print(f"Batch attempt {attempt + 1}: {len(lines)} of {sum(len(c.pairs) for c in contracts)} requests for {len(contracts)} contracts to submit")
+        if not lines:
+            break
+        for contract in contracts:
+            contract.errors.clear()
+        path = write_request_file(
+            lines, os.path.join(work_dir, f"batch_requests_{int(time.time())}_{attempt + 1}.jsonl")
+        )
+        batch = wait_for_batch(submit_batch(path), poll_interval)
+        collect_results(batch, contracts, company_id)
+    return assemble_reports(contracts, company_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze buyer contracts against a seller contract via the OpenAI Batch API")
+    parser.add_argument("--seller", required=True, help="Seller terms and conditions PDF")
+    parser.add_argument("--company-name", default="Seller")
+    parser.add_argument("--company-id", default=None, help="Company id for loading contract priorities")
+    parser.add_argument("--out", default="batch_reports", help="Directory for request files and reports")
+    parser.add_argument("--poll-interval", type=float, default=BATCH_POLL_INTERVAL)
+    parser.add_argument("--retries", type=int, default=OFFLINE_BATCH_RETRIES, help="Follow-up batches for failed requests")
+    parser.add_argument("buyers", nargs="+", help="Buyer terms and conditions PDFs")
+    args = parser.parse_args()
+
+    with open(args.seller, "rb") as f:
+        seller_content = f.read()
+    buyer_files = []
+    for path in args.buyers:
+        with open(path, "rb") as f:
+            buyer_files.append((os.path.basename(path), f.read()))
+
+    reports = run_offline_batch(
+        seller_content, buyer_files, args.company_name, args.company_id, args.out,
+        args.poll_interval, args.retries,
+    )
+    os.makedirs(args.out, exist_ok=True)
+    for name, report in reports.items():
+        stem = os.path.splitext(name)[0]
+        if "summary" in report:
+            with open(os.path.join(args.out, f"{stem}.txt"), "w", encoding="utf-8") as f:
+                f.write(report["summary"])
+            print(f"Wrote report for {name}")
+        else:
+            print(f"No report for {name}: {report['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,54 @@
 import os
-import pdfplumber
-from PyPDF2 import PdfReader, PdfWriter
-from reportlab.pdfgen import canvas
-from reportlab.lib.colors import yellow, red
-from diff_match_patch import diff_match_patch
-from openai import OpenAI
 from dotenv import load_dotenv
-import io
-import json
 import time
-from io import BytesIO
-import tempfile
-from supabase import create_client, Client
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterator, Optional
+from rate_limiter import AdaptiveRateLimiter, backoff_delay
+from extraction_cache import extraction_cache, content_hash
+from llm_cache import llm_cache, llm_cache_key
+from company_cache import company_cache
+from extraction import parse_pdf_text, iter_page_text
+from uploads import PDFContent
+from structure import normalize_text, iter_normalized
+from tokens import count_tokens, count_message_tokens, context_window
+from clause_diff import triage_aligned, describe_unchanged
+from analysis_history import IncrementalAnalysis
+from alignment import ClauseIndex, segment_clauses, iter_clauses, iter_align, pack_aligned_pairs
 
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env'))
 
-# Initialize Supabase client
-supabase: Client = create_client(
-    os.environ.get("SUPABASE_URL"),
-    os.environ.get("SUPABASE_KEY")
-)
+# The Supabase and OpenAI SDKs are slow to import, so their clients are
+# created on first use rather than when the module is imported
+_supabase = None
+_openai_client = None
+_client_lock = threading.Lock()
+
+def get_supabase():
+    """Return the shared Supabase client, creating it on first use."""
+    global _supabase
+    with _client_lock:
+        if _supabase is None:
+            from supabase import create_client
+            _supabase = create_client(
+                os.environ.get("SUPABASE_URL"),
+                os.environ.get("SUPABASE_KEY")
+            )
+        return _supabase
+
+def get_openai_client():
+    """Return the shared OpenAI client, creating it on first use.
+
+    Retries happen in analyze_chunk_pair so that 429s go through the shared
+    rate limiter.
+    """
+    global _openai_client
+    with _client_lock:
+        if _openai_client is None:
+            from openai import OpenAI
+            _openai_client = OpenAI(max_retries=0)
+        return _openai_client
 
 # Debug: Print environment variables
 print("Current working directory:", os.getcwd())
@@ -28,112 +57,75 @@ print("OPENAI_API_KEY exists:", "OPENAI_API_KEY" in os.environ)
 if "OPENAI_API_KEY" in os.environ:
     print("OPENAI_API_KEY length:", len(os.environ["OPENAI_API_KEY"]))
 
-# Initialize OpenAI client with explicit configuration
-client = OpenAI()
+# Chunk analysis request parameters
+LLM_MODEL = "gpt-3.5-turbo"
+LLM_TEMPERATURE = 0.1  # Lower temperature for more consistent output
+LLM_MAX_TOKENS = 2000
+
+# Tokens held back from the context window to absorb tokenizer differences
+TOKEN_SAFETY_MARGIN = 64
+# Optional cap on chunk tokens per request, e.g. to trade size for parallelism
+LLM_REQUEST_TOKEN_BUDGET = int(os.environ.get("LLM_REQUEST_TOKEN_BUDGET", "0"))
 
-def get_company_priorities(company_id: str) -> list:
+# Concurrency and pacing for chunk analysis requests
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "4"))
+LLM_REQUESTS_PER_MINUTE = float(os.environ.get("LLM_REQUESTS_PER_MINUTE", "60"))
+
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "5"))
+
+# Shared across all analyses in this process. LLM_REQUESTS_PER_MINUTE only
+# paces calls until the API's rate-limit headers have been seen.
+rate_limiter = AdaptiveRateLimiter(
+    rate=LLM_REQUESTS_PER_MINUTE / 60.0,
+    capacity=LLM_MAX_CONCURRENCY,
+    backoff_base=float(os.environ.get("LLM_BACKOFF_BASE", "1")),
+    backoff_max=float(os.environ.get("LLM_BACKOFF_MAX", "60")),
+)
+
+def fetch_company_priorities(company_id: str) -> list:
     """Fetch company priorities from Supabase."""
+    response = get_supabase().table('contract_priorities').select('*').eq('company_id', company_id).execute()
+    return response.data
+
+def get_company_priorities(company_id: str) -> Optional[list]:
+    """Return company priorities, from the company cache when fresh.
+
+    Returns None when they could not be fetched.
+    """
     try:
-        response = supabase.table('contract_priorities').select('*').eq('company_id', company_id).execute()
-        return response.data
+        return company_cache.get_priorities(company_id, fetch_company_priorities)
     except Exception as e:
         print(f"Error fetching priorities: {e}")
-        return []
-
-def extract_text(pdf_content: bytes) -> str:
-    """Extract text content from PDF bytes."""
-    text = ""
-    with io.BytesIO(pdf_content) as pdf_bytes:
-        with pdfplumber.open(pdf_bytes) as pdf:
-            print(f"Processing PDF with {len(pdf.pages)} pages")
-            for page_num, page in enumerate(pdf.pages, 1):
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-                    print(f"Extracted {len(page_text)} characters from page {page_num}")
-                else:
-                    print(f"Warning: No text extracted from page {page_num}")
-    print(f"Total extracted text length: {len(text)} characters")
+        return None
+
+def extract_text(pdf_content: PDFContent, file_hash: str = None) -> str:
+    """Extract text content from PDF bytes or a spooled upload.
+
+    Results are cached by the SHA-256 of the PDF bytes, so a repeat upload
+    of the same file skips PDF parsing entirely.
+    """
+    file_hash = file_hash or content_hash(pdf_content)
+    cached = extraction_cache.get(file_hash)
+    if cached is not None:
+        print(f"Extraction cache hit for {file_hash[:12]} ({len(cached)} characters)")
+        return cached
+
+    text = parse_pdf_text(pdf_content)
+    extraction_cache.set(file_hash, text)
     return text
 
 def preprocess_text(text: str) -> str:
-    """Clean and preprocess text to reduce token count."""
-    # Remove multiple spaces
-    text = ' '.join(text.split())
-    # Remove multiple newlines
-    text = '\n'.join(line for line in text.split('\n') if line.strip())
-    return text
+    """Clean and preprocess text to reduce token count.
 
-def split_into_chunks(text: str, max_tokens: int = 3000) -> list[str]:
-    """Split text into chunks of approximately max_tokens size."""
-    # Rough estimate: 1 token ≈ 4 characters
-    chunk_size = max_tokens * 4
-    chunks = []
-    current_chunk = ""
-    
-    print(f"\nSplitting text of length {len(text)} into chunks")
-    print(f"Target chunk size: {chunk_size} characters")
-    
-    # Split by sections (assuming sections are separated by multiple newlines)
-    sections = text.split('\n\n')
-    print(f"Found {len(sections)} sections")
-    
-    for section_num, section in enumerate(sections, 1):
-        if len(current_chunk) + len(section) < chunk_size:
-            current_chunk += section + '\n\n'
-        else:
-            if current_chunk:
-                print(f"Created chunk {len(chunks) + 1} with {len(current_chunk)} characters")
-                chunks.append(current_chunk.strip())
-            # If a single section is too large, split it by sentences
-            if len(section) > chunk_size:
-                print(f"Section {section_num} is too large ({len(section)} chars), splitting by sentences")
-                sentences = section.split('. ')
-                current_chunk = ""
-                for sentence in sentences:
-                    if len(current_chunk) + len(sentence) < chunk_size:
-                        current_chunk += sentence + '. '
-                    else:
-                        if current_chunk:
-                            print(f"Created chunk {len(chunks) + 1} with {len(current_chunk)} characters")
-                            chunks.append(current_chunk.strip())
-                        current_chunk = sentence + '. '
-            else:
-                current_chunk = section + '\n\n'
-    
-    if current_chunk:
-        print(f"Created final chunk {len(chunks) + 1} with {len(current_chunk)} characters")
-        chunks.append(current_chunk.strip())
-    
-    print(f"Total chunks created: {len(chunks)}")
-    total_chars = sum(len(chunk) for chunk in chunks)
-    print(f"Total characters in all chunks: {total_chars}")
-    print(f"Original text length: {len(text)}")
-    print(f"Character difference: {len(text) - total_chars}")
-    
-    return chunks
+    Collapses runs of whitespace but keeps clause and paragraph structure.
+    Buyer text streamed through ``plan_against_template`` is normalized the
+    same way, so both sides are segmented from identical text.
+    """
+    return normalize_text(text)
 
-def transform_clauses(buyer_text: str, seller_text: str, company_name: str = "Seller", company_id: str = None) -> str:
-    """Transform buyer's clauses to align with seller's model using GPT-3.5-turbo."""
-    try:
-        # Preprocess texts to reduce token count
-        buyer_text = preprocess_text(buyer_text)
-        seller_text = preprocess_text(seller_text)
-        
-        print(f"\nBuyer text length after preprocessing: {len(buyer_text)} characters")
-        print(f"Seller text length after preprocessing: {len(seller_text)} characters")
-        
-        # Split texts into chunks
-        buyer_chunks = split_into_chunks(buyer_text, max_tokens=3000)
-        seller_chunks = split_into_chunks(seller_text, max_tokens=3000)
-        
-        print(f"\nSplit into {len(buyer_chunks)} buyer chunks and {len(seller_chunks)} seller chunks")
-        
-        # Fetch company priorities only if company_id is provided
-        priorities = get_company_priorities(company_id) if company_id else []
-        
-        # Build dynamic system prompt based on priorities
-        system_prompt = f"""You are an expert legal counsel specializing in equipment rental agreements. You represent the equipment owner/lessor (the {company_name}) who is renting out specialized equipment to customers (the Buyer).
+def build_system_prompt(company_name: str, priorities: list) -> str:
+    """Build the analysis system prompt, including any company priorities."""
+    system_prompt = f"""You are an expert legal counsel specializing in equipment rental agreements. You represent the equipment owner/lessor (the {company_name}) who is renting out specialized equipment to customers (the Buyer).
 
 CRITICAL CONTEXT:
 - This is a RENTAL agreement, not a sale
@@ -141,13 +133,13 @@ CRITICAL CONTEXT:
 - The Buyer is renting the equipment for temporary use
 """
 
-        # Add company-specific priorities
-        if priorities:
-            system_prompt += "\nCOMPANY PRIORITIES:\n"
-            for priority in priorities:
-                system_prompt += f"- {priority['priority_name']}: {priority['priority_description']}\n"
-        
-        system_prompt += """
+    # Add company-specific priorities
+    if priorities:
+        system_prompt += "\nCOMPANY PRIORITIES:\n"
+        for priority in priorities:
+            system_prompt += f"- {priority['priority_name']}: {priority['priority_description']}\n"
+
+    system_prompt += """
 ANALYSIS FRAMEWORK:
 For each significant clause, analyze:
 1. CURRENT SITUATION:
@@ -165,29 +157,20 @@ For each significant clause, analyze:
    - Why is this the right solution?
    - What exact wording should be used?
 """
+    return system_prompt
+
+def build_chunk_messages(system_prompt: str, seller_chunk: str, buyer_chunk: str, company_name: str = "Seller") -> list:
+    """Build the chat messages for analyzing one buyer/seller chunk pair."""
+    return [
+        {
+            "role": "system",
+            "content": system_prompt
+        },
+        {
+            "role": "user",
+            "content": f"""Please analyze these contract sections with the above framework. Focus on protecting the {company_name}'s interests in this equipment rental agreement.
 
-        transformed_chunks = []
-        max_retries = 3
-        retry_delay = 30
-        
-        # Process each chunk with retry logic
-        for i, (buyer_chunk, seller_chunk) in enumerate(zip(buyer_chunks, seller_chunks)):
-            print(f"\nProcessing chunk {i+1}/{len(buyer_chunks)}")
-            print(f"Buyer chunk size: {len(buyer_chunk)} characters")
-            print(f"Seller chunk size: {len(seller_chunk)} characters")
-            
-            for attempt in range(max_retries):
-                try:
-                    response = client.chat.completions.create(
-                        model="gpt-3.5-turbo",
-                        messages=[
-                            {
-                                "role": "system",
-                                "content": system_prompt
-                            },
-                            {
-                                "role": "user",
-                                "content": f"""Please analyze these contract sections with the above framework. Focus on protecting the {company_name}'s interests in this equipment rental agreement.
+Clauses are labeled so that the same [Clause n] label in both sections marks corresponding provisions. "(no corresponding clause)" means the provision only appears on one side. Start the analysis of each clause on a new line with its [Clause n] label.
 
 {company_name.upper()}'S TERMS (Equipment Owner/Lessor):
 {seller_chunk}
@@ -196,35 +179,353 @@ BUYER'S TERMS (Equipment Renter):
 {buyer_chunk}
 
 Provide a detailed analysis of all significant differences, focusing on protecting the {company_name}'s interests in this rental arrangement."""
-                            }
-                        ],
-                        temperature=0.1,  # Lower temperature for more consistent output
-                        max_tokens=2000
-                    )
-                    transformed_chunks.append(response.choices[0].message.content)
-                    print(f"Successfully processed chunk {i+1}")
-                    print(f"Response length: {len(response.choices[0].message.content)} characters")
-                    break  # Success, exit retry loop
-                except Exception as e:
-                    if "rate_limit_exceeded" in str(e) and attempt < max_retries - 1:
-                        print(f"Rate limit hit, waiting {retry_delay} seconds before retry {attempt + 1}")
-                        time.sleep(retry_delay)
-                        retry_delay *= 2  # Exponential backoff
-                    else:
-                        print(f"Error processing chunk {i+1}: {str(e)}")
-                        raise Exception(f"Error in GPT-3.5-turbo transformation: {str(e)}")
-            
-            # Add a small delay between chunks to avoid rate limits
-            if i < len(buyer_chunks) - 1:
-                time.sleep(2)  # Reduced delay between chunks
-        
-        # Combine all transformed chunks
-        result = "\n\n".join(transformed_chunks)
-        print(f"\nTransformation complete. Final text length: {len(result)} characters")
-        return result
+        }
+    ]
+
+def count_llm_tokens(text: str) -> int:
+    return count_tokens(text, LLM_MODEL)
+
+def chunk_token_budget(system_prompt: str, company_name: str = "Seller") -> int:
+    """Tokens available for the buyer and seller chunks of one request.
+
+    The model's context window has to hold the system prompt, the user
+    prompt template, both chunks and the LLM_MAX_TOKENS reply.
+    """
+    overhead = count_message_tokens(build_chunk_messages(system_prompt, "", "", company_name), LLM_MODEL)
+    budget = context_window(LLM_MODEL) - LLM_MAX_TOKENS - overhead - TOKEN_SAFETY_MARGIN
+    if LLM_REQUEST_TOKEN_BUDGET:
+        budget = min(budget, LLM_REQUEST_TOKEN_BUDGET)
+    print(f"Request budget: {budget} chunk tokens ({overhead} prompt tokens, {LLM_MAX_TOKENS} reply tokens)")
+    return budget
+
+def analyze_chunk_pair(index: int, total: int, buyer_chunk: str, seller_chunk: str, system_prompt: str, company_name: str = "Seller", company_id: str = None, event_callback=None) -> str:
+    """Analyze a single buyer/seller chunk pair, retrying on rate limit errors.
+
+    Responses are cached by model, prompt, chunks and sampling parameters, so
+    re-running an identical comparison returns cached chunks without a call.
+    When ``event_callback(event, data)`` is given, the model's output is
+    streamed and forwarded as ``chunk_start``, ``token`` and ``chunk_end``
+    events. If a transient error interrupts a stream that already forwarded
+    output, ``chunk_reset`` tells the client to discard that chunk's tokens;
+    a retry then streams it again from ``chunk_start``.
+    """
+    print(f"\nProcessing chunk {index+1}/{total or '?'}")
+    print(f"Buyer chunk size: {len(buyer_chunk)} characters")
+    print(f"Seller chunk size: {len(seller_chunk)} characters")
+
+    def emit(event, **data):
+        if event_callback:
+            event_callback(event, {"index": index, **data})
+
+    cache_key = llm_cache_key(
+        LLM_MODEL, system_prompt, seller_chunk, buyer_chunk, LLM_TEMPERATURE, LLM_MAX_TOKENS
+    )
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        print(f"LLM cache hit for chunk {index+1}")
+        emit("chunk_start", cached=True)
+        emit("token", content=cached)
+        emit("chunk_end", cached=True)
+        return cached
+
+    from httpx import TransportError
+    from openai import RateLimitError, APIConnectionError, InternalServerError
+
+    client = get_openai_client()
+    messages = build_chunk_messages(system_prompt, seller_chunk, buyer_chunk, company_name)
+    # Completion tokens count against the token quota up to max_tokens
+    request_tokens = count_message_tokens(messages, LLM_MODEL) + LLM_MAX_TOKENS
+    # Whether this chunk's chunk_start has been sent for the current attempt
+    streaming = False
+
+    for attempt in range(LLM_MAX_RETRIES):
+        waited = rate_limiter.acquire(request_tokens)
+        if waited:
+            print(f"Chunk {index+1} waited {waited:.2f}s for the rate limiter")
+        # Every acquire is settled by exactly one update, throttled or release
+        settled = False
+        try:
+            if event_callback:
+                raw = client.chat.completions.with_raw_response.create(
+                    model=LLM_MODEL,
+                    messages=messages,
+                    temperature=LLM_TEMPERATURE,
+                    max_tokens=LLM_MAX_TOKENS,
+                    stream=True
+                )
+                rate_limiter.update(raw.headers, request_tokens)
+                settled = True
+                stream = raw.parse()
+                emit("chunk_start", cached=False)
+                streaming = True
+                parts = []
+                for event in stream:
+                    if not event.choices:
+                        continue
+                    delta = event.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        emit("token", content=delta)
+                content = "".join(parts)
+                emit("chunk_end", cached=False)
+                streaming = False
+            else:
+                raw = client.chat.completions.with_raw_response.create(
+                    model=LLM_MODEL,
+                    messages=messages,
+                    temperature=LLM_TEMPERATURE,
+                    max_tokens=LLM_MAX_TOKENS
+                )
+                rate_limiter.update(raw.headers, request_tokens)
+                settled = True
+                content = raw.parse().choices[0].message.content
+            print(f"Successfully processed chunk {index+1}")
+            print(f"Response length: {len(content)} characters")
+            llm_cache.set(cache_key, content, company_id=company_id)
+            return content
+        except RateLimitError as e:
+            # An exhausted quota will not recover by retrying
+            if e.code == "insufficient_quota" or attempt == LLM_MAX_RETRIES - 1:
+                rate_limiter.release(request_tokens)
+                print(f"Error processing chunk {index+1}: {str(e)}")
+                raise Exception(f"Error in GPT-3.5-turbo transformation: {str(e)}")
+            delay = rate_limiter.throttled(e.response.headers, request_tokens)
+            print(f"Rate limit hit on chunk {index+1}, backing off {delay:.2f}s before retry {attempt + 1}")
+        # A connection dropped mid-stream surfaces as httpx's TransportError
+        except (APIConnectionError, InternalServerError, TransportError) as e:
+            if not settled:
+                rate_limiter.release(request_tokens)
+            if streaming:
+                # The partial output is discarded; a retry streams the whole chunk again
+                emit("chunk_reset", attempt=attempt + 1)
+                streaming = False
+            if attempt == LLM_MAX_RETRIES - 1:
+                print(f"Error processing chunk {index+1}: {str(e)}")
+                raise Exception(f"Error in GPT-3.5-turbo transformation: {str(e)}")
+            delay = backoff_delay(attempt, rate_limiter.backoff_base, rate_limiter.backoff_max)
+            print(f"Transient error on chunk {index+1} ({str(e)}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+        except Exception as e:
+            if not settled:
+                rate_limiter.release(request_tokens)
+            if streaming:
+                emit("chunk_reset", attempt=attempt + 1)
+            print(f"Error processing chunk {index+1}: {str(e)}")
+            raise Exception(f"Error in GPT-3.5-turbo transformation: {str(e)}")
+
+def prepare_system_prompt(company_name: str = "Seller", company_id: str = None) -> str:
+    """Fetch the company's priorities and build the analysis system prompt."""
+    # Fetch company priorities only if company_id is provided
+    if not company_id:
+        return build_system_prompt(company_name, [])
+
+    priorities = get_company_priorities(company_id)
+    if priorities is None:
+        # A failed fetch says nothing about the priorities, so neither the
+        # cached analyses nor the cached prompt are touched
+        return build_system_prompt(company_name, [])
+
+    # Drop this company's cached analyses if its priorities changed
+    llm_cache.observe_priorities(company_id, priorities)
+
+    # Build dynamic system prompt based on priorities
+    return company_cache.get_prompt(
+        company_id, company_name, priorities,
+        lambda: build_system_prompt(company_name, priorities),
+    )
+
+def analyze_chunk_pairs(pairs, system_prompt: str, company_name: str = "Seller", company_id: str = None, max_concurrency: int = None, progress_callback=None, event_callback=None) -> list[str]:
+    """Analyze ``(buyer_chunk, seller_chunk)`` pairs concurrently.
+
+    ``pairs`` may be a generator: each pair is submitted to the worker pool
+    as soon as it is produced, so analysis overlaps with whatever produces
+    the chunks. Results are returned in pair order. ``event_callback`` is
+    passed through to ``analyze_chunk_pair`` to stream model output.
+    """
+    max_workers = max(1, max_concurrency or LLM_MAX_CONCURRENCY)
+    total = len(pairs) if isinstance(pairs, (list, tuple)) else None
+    futures = []
+
+    def on_done(index):
+        def callback(future):
+            if progress_callback and not future.cancelled() and future.exception() is None:
+                progress_callback(index, total or len(futures))
+        return callback
+
+    # Process chunk pairs concurrently; the rate limiter paces the requests
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            for i, (buyer_chunk, seller_chunk) in enumerate(pairs):
+                # Stop producing work as soon as any chunk has failed
+                if any(f.done() and not f.cancelled() and f.exception() for f in futures):
+                    break
+                future = executor.submit(
+                    analyze_chunk_pair, i, total, buyer_chunk, seller_chunk, system_prompt, company_name, company_id, event_callback
+                )
+                future.add_done_callback(on_done(i))
+                futures.append(future)
+            print(f"Submitted {len(futures)} chunk pairs to {max_workers} workers")
+            return [future.result() for future in futures]
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+
+@dataclass
+class ChunkPlan:
+    """Analysis requests for one buyer contract and the clauses they leave out.
+
+    ``pairs`` lazily yields the ``(buyer_chunk, seller_chunk)`` requests in
+    report order. ``unchanged`` lists the clauses matching the seller's
+    wording and ``history`` the clauses reused from an earlier revision.
+    """
+    system_prompt: str
+    pairs: Iterator
+    unchanged: list
+    history: IncrementalAnalysis
+
+def plan_against_template(template: "SellerTemplate", buyer_pages) -> ChunkPlan:
+    """Align buyer text against a seller template and pack it into requests.
+
+    ``buyer_pages`` is consumed lazily, so requests can be sent while later
+    pages are still being extracted; ``pairs`` is an iterator and
+    ``unchanged`` and ``history`` fill up as it is consumed.
+    """
+    buyer_clauses = iter_clauses(iter_normalized(buyer_pages), template.budget // 2, count_llm_tokens)
+    aligned = iter_align(buyer_clauses, template.clauses, index=template.index)
+    # Clauses that match the seller's wording are reported without the model,
+    # and clauses analyzed in an earlier revision reuse that analysis
+    unchanged = []
+    history = IncrementalAnalysis(template.system_prompt, template.company_id)
+    pairs = pack_aligned_pairs(history.filter(triage_aligned(aligned, unchanged)), template.budget, count_llm_tokens)
+    return ChunkPlan(template.system_prompt, pairs, unchanged, history)
+
+def join_analysis(transformed_chunks: list, unchanged: list, history: IncrementalAnalysis = None) -> str:
+    """Join chunk analyses, followed by the clauses that needed no analysis."""
+    sections = list(transformed_chunks)
+    for section in (history.describe_reused() if history else "", describe_unchanged(unchanged)):
+        if section:
+            sections.append(f"---\n{section}")
+    return "\n\n".join(sections)
+
+def analyze_against_template(template: "SellerTemplate", buyer_pages, max_concurrency: int = None, progress_callback=None, event_callback=None) -> str:
+    """Analyze buyer text, streamed page by page, against a seller template."""
+    try:
+        plan = plan_against_template(template, buyer_pages)
+        transformed_chunks = analyze_chunk_pairs(
+            plan.pairs, template.system_prompt, template.company_name, template.company_id,
+            max_concurrency, progress_callback, event_callback
+        )
+        recorded = plan.history.record(transformed_chunks)
+
+        transformed_text = join_analysis(transformed_chunks, plan.unchanged, plan.history)
+        print(f"\n{len(plan.unchanged)} clauses matched the template without analysis, {len(plan.history.reused)} reused from history, {recorded} recorded")
+        print(f"Transformation complete. Final text length: {len(transformed_text)} characters")
+        return transformed_text
+    except Exception as e:
+        print(f"Final error: {str(e)}")
+        raise Exception(f"Error in GPT-3.5-turbo transformation: {str(e)}")
+
+def iter_document_text(pdf_content: PDFContent, file_hash: str = None):
+    """Yield a PDF's text page by page, or all at once on an extraction cache hit."""
+    file_hash = file_hash or content_hash(pdf_content)
+    cached = extraction_cache.get(file_hash)
+    if cached is not None:
+        print(f"Extraction cache hit for {file_hash[:12]} ({len(cached)} characters)")
+        yield cached
+        return
+
+    pages = []
+    for page_text in iter_page_text(pdf_content):
+        pages.append(page_text)
+        yield page_text
+    extraction_cache.set(file_hash, "".join(pages))
+
+@dataclass
+class SellerTemplate:
+    """A seller contract extracted and segmented once for repeated comparisons."""
+
+    filename: str
+    company_name: str
+    company_id: Optional[str]
+    system_prompt: str
+    budget: int
+    clauses: list
+    index: ClauseIndex
+
+def prepare_seller_template(seller_content: PDFContent, seller_filename: str, company_name: str = "Seller", company_id: str = None) -> SellerTemplate:
+    """Extract and segment the seller contract and build its clause index."""
+    # The seller side is needed in full to build the clause index
+    seller_text = preprocess_text("".join(iter_document_text(seller_content)))
+    return build_seller_template(seller_text, seller_filename, company_name, company_id)
+
+def build_seller_template(seller_text: str, seller_filename: str, company_name: str = "Seller", company_id: str = None, clauses: list = None, clause_size: int = None) -> SellerTemplate:
+    """Segment normalized seller text and build its clause index.
+
+    ``clauses`` segmented earlier are reused when they were split at
+    ``clause_size``, the size this request budget allows; otherwise the text
+    is segmented again.
+    """
+    system_prompt = prepare_system_prompt(company_name, company_id)
+    budget = chunk_token_budget(system_prompt, company_name)
+
+    if clauses is not None and clause_size == budget // 2:
+        seller_clauses = clauses
+    else:
+        seller_clauses = segment_clauses(seller_text, budget // 2, count_llm_tokens)
+        print(f"Segmented seller contract {seller_filename} into {len(seller_clauses)} clauses")
+    return SellerTemplate(
+        filename=seller_filename,
+        company_name=company_name,
+        company_id=company_id,
+        system_prompt=system_prompt,
+        budget=budget,
+        clauses=seller_clauses,
+        index=ClauseIndex(seller_clauses),
+    )
+
+def compare_with_template(template: SellerTemplate, buyer_content: PDFContent, buyer_filename: str, progress_callback=None, event_callback=None) -> dict:
+    """Analyze one buyer contract against a prepared seller template.
+
+    Buyer clauses are aligned and sent for analysis as soon as enough of them
+    fill a request, while later buyer pages are still being parsed.
+    ``event_callback`` receives the model's token stream for each chunk.
+    """
+    company_name = template.company_name
+    print(f"Comparing {buyer_filename} against {template.filename} for {company_name}")
+    buyer_pages = []
+
+    def buyer_text_stream():
+        for page_text in iter_document_text(buyer_content):
+            buyer_pages.append(page_text)
+            yield page_text
+
+    # Buyer clauses are aligned and packed as soon as they are extracted
+    transformed_text = analyze_against_template(
+        template, buyer_text_stream(),
+        progress_callback=progress_callback, event_callback=event_callback
+    )
+    summary = generate_change_summary("".join(buyer_pages), transformed_text, company_name)
+    return {
+        "summary": summary
+    }
+
+def process_documents_streaming(seller_content: PDFContent, buyer_content: PDFContent, seller_filename: str, buyer_filename: str, company_name: str = "Seller", company_id: str = None, progress_callback=None, event_callback=None) -> dict:
+    """Extract, chunk and analyze both PDFs as a single streaming pipeline.
+
+    The seller contract is segmented into an index of clauses first, then the
+    buyer contract is streamed against it (see ``compare_with_template``).
+    """
+    print(f"Streaming documents: {buyer_filename} and {seller_filename} for {company_name}")
+    try:
+        template = prepare_seller_template(seller_content, seller_filename, company_name, company_id)
     except Exception as e:
         print(f"Final error: {str(e)}")
         raise Exception(f"Error in GPT-3.5-turbo transformation: {str(e)}")
+    return compare_with_template(
+        template, buyer_content, buyer_filename,
+        progress_callback=progress_callback, event_callback=event_callback
+    )
 
 def generate_change_summary(buyer_text: str, transformed_text: str, company_name: str = "Seller") -> str:
     """Generate a human-readable summary of the legal differences."""
@@ -252,18 +553,3 @@ def generate_change_summary(buyer_text: str, transformed_text: str, company_name
     
     # Add a header and combine the sections
     return f"=== CONTRACT ANALYSIS REPORT FOR {company_name.upper()} ===\n" + "\n".join(formatted_sections)
-
-def process_documents_sync(seller_text: str, buyer_text: str, seller_filename: str, buyer_filename: str, company_name: str = "Seller", company_id: str = None) -> dict:
-    """Process documents synchronously and return the summary."""
-    print(f"Processing documents: {buyer_filename} and {seller_filename} for {company_name}")
-    
-    # Transform buyer's contract
-    transformed_text = transform_clauses(buyer_text, seller_text, company_name, company_id)
-    
-    # Generate changes summary
-    summary = generate_change_summary(buyer_text, transformed_text, company_name)
-    
-    # Return just the summary without PDF content
-    return {
-        "summary": summary
-    } 
\ No newline at end of file
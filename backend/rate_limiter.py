@@ -0,0 +1,224 @@
+import re
+import random
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket used to pace outgoing LLM requests.
+
+    Tokens refill continuously at ``rate`` per second up to ``capacity``.
+    ``acquire`` blocks the calling thread until enough tokens are available,
+    so concurrent workers share a single request budget instead of each
+    sleeping a fixed amount between calls.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until ``tokens`` are available and return the time spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Parse a rate-limit reset value such as ``"1s"``, ``"6m0s"`` or ``"120ms"``."""
+    if not value:
+        return None
+    parts = DURATION_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def backoff_delay(attempt: int, base: float = 1.0, maximum: float = 60.0) -> float:
+    """Exponential backoff for ``attempt`` (0-based) with jitter."""
+    return random.uniform(0.5, 1.0) * min(maximum, base * 2 ** attempt)
+
+
+class RateLimitWindow:
+    """Remaining quota for one limit (requests or tokens) and when it resets.
+
+    ``in_flight`` counts quota reserved by calls that have not responded
+    yet, since the server's reported remaining quota does not include them.
+    """
+
+    def __init__(self):
+        self.limit = None
+        self.remaining = None
+        self.reset_at = None
+        self.in_flight = 0.0
+
+    def update(self, limit, remaining, reset_after, now: float):
+        if limit is not None:
+            self.limit = float(limit)
+        if remaining is not None:
+            self.remaining = float(remaining) - self.in_flight
+        if reset_after is not None:
+            self.reset_at = now + reset_after
+
+    def wait_for(self, amount: float, margin: float, now: float) -> float:
+        """Seconds until ``amount`` fits under the limit."""
+        if self.remaining is None or self.reset_at is None:
+            return 0.0
+        if now >= self.reset_at:
+            # The window has reset; assume the full limit until headers say otherwise
+            if self.limit is not None:
+                self.remaining = self.limit - self.in_flight
+            self.reset_at = None
+            return 0.0
+        if self.remaining - amount < margin:
+            return self.reset_at - now
+        return 0.0
+
+    def reserve(self, amount: float):
+        self.in_flight += amount
+        if self.remaining is not None:
+            self.remaining -= amount
+
+    def finish(self, amount: float):
+        self.in_flight = max(0.0, self.in_flight - amount)
+
+
+class AdaptiveRateLimiter:
+    """Process-wide limiter paced by the API's rate-limit response headers.
+
+    Each response's ``x-ratelimit-remaining-*`` and ``x-ratelimit-reset-*``
+    headers update the remaining request and token quota; ``acquire``
+    reserves quota for a call and blocks only when the call would not fit
+    before the window resets. Until the first headers arrive, calls are
+    paced by a ``TokenBucket`` at the configured rate. A 429 blocks every
+    caller for the server's ``retry-after`` plus a little jitter, or for a
+    jittered exponential backoff when the server gives no delay.
+
+    Every ``acquire`` must be matched by one of ``update`` (success),
+    ``throttled`` (429) or ``release`` (any other failure).
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0, margin: float = 0.02, backoff_base: float = 1.0, backoff_max: float = 60.0):
+        self.fallback = TokenBucket(rate, capacity)
+        self.requests = RateLimitWindow()
+        self.tokens = RateLimitWindow()
+        # Fraction of each limit held back for other clients and estimate error
+        self.margin = margin
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.blocked_until = 0.0
+        self.consecutive_throttles = 0
+        self.throttles = 0
+        self.observed = False
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 0.0) -> float:
+        """Block until a call using ``tokens`` fits the quota; returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self.blocked_until - now
+                if self.observed:
+                    wait = max(
+                        wait,
+                        self.requests.wait_for(1, self.margin * (self.requests.limit or 0), now),
+                        self.tokens.wait_for(tokens, self.margin * (self.tokens.limit or 0), now),
+                    )
+                if wait <= 0:
+                    self.requests.reserve(1)
+                    self.tokens.reserve(tokens)
+                    observed = self.observed
+                    break
+            time.sleep(wait)
+            waited += wait
+        if not observed:
+            waited += self.fallback.acquire()
+        return waited
+
+    def _finish(self, headers, tokens: float, now: float):
+        self.requests.finish(1)
+        self.tokens.finish(tokens)
+        if headers is None:
+            return
+        self.requests.update(
+            headers.get("x-ratelimit-limit-requests"),
+            headers.get("x-ratelimit-remaining-requests"),
+            parse_duration(headers.get("x-ratelimit-reset-requests")),
+            now,
+        )
+        self.tokens.update(
+            headers.get("x-ratelimit-limit-tokens"),
+            headers.get("x-ratelimit-remaining-tokens"),
+            parse_duration(headers.get("x-ratelimit-reset-tokens")),
+            now,
+        )
+        self.observed = self.observed or self.requests.remaining is not None
+
+    def update(self, headers, tokens: float = 0.0):
+        """Record the quota reported by a successful response's headers."""
+        with self._lock:
+            self._finish(headers, tokens, time.monotonic())
+            self.consecutive_throttles = 0
+
+    def release(self, tokens: float = 0.0):
+        """Return the reservation of a call that failed without a response."""
+        with self._lock:
+            self._finish(None, tokens, time.monotonic())
+
+    def throttled(self, headers=None, tokens: float = 0.0) -> float:
+        """Back off every caller after a 429 and return the delay applied."""
+        retry_after = None
+        if headers is not None:
+            if headers.get("retry-after-ms"):
+                retry_after = parse_duration(headers.get("retry-after-ms") + "ms")
+            else:
+                retry_after = parse_duration(headers.get("retry-after"))
+        with self._lock:
+            now = time.monotonic()
+            self._finish(headers, tokens, now)
+            self.throttles += 1
+            if now < self.blocked_until:
+                # Part of a throttle already being waited out
+                return self.blocked_until - now
+            if retry_after is not None:
+                delay = retry_after + random.uniform(0, min(1.0, 0.1 * retry_after + 0.05))
+            else:
+                delay = backoff_delay(self.consecutive_throttles, self.backoff_base, self.backoff_max)
+            self.blocked_until = now + delay
+            self.consecutive_throttles += 1
+        return delay
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "observed": self.observed,
+                "remaining_requests": self.requests.remaining,
+                "remaining_tokens": self.tokens.remaining,
+                "throttles": self.throttles,
+            }
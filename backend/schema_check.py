@@ -0,0 +1,88 @@
+"""Check the Supabase schema the API depends on.
+
+Run once per deployment rather than on every import of ``main``::
+
+    python schema_check.py
+
+Queries every table the API reads or writes and reports each one that is
+missing or not readable with ``SUPABASE_KEY``. Nothing is created: run
+``create_tables.sql`` in the Supabase SQL editor for the missing tables.
+Exits with status 1 when any table failed the check.
+"""
+import os
+import sys
+import logging
+from typing import Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from supabase_rest import sync_client
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
+SUPABASE_URL = os.getenv("SUPABASE_URL", "your-supabase-url")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY", "your-supabase-key")
+
+# Every table the API uses, and what uses it
+TABLES = {
+    "company_profiles": "company profiles",
+    "contract_priorities": "company priorities in the analysis prompt",
+    "analysis_jobs": "JOB_STORE=supabase",
+    "clause_analyses": "HISTORY_STORE=supabase",
+    "analysis_history": "HISTORY_STORE=supabase",
+    "company_documents": "TEMPLATE_STORE=supabase",
+}
+
+# PostgREST error codes for a table that does not exist
+MISSING_TABLE_CODES = {"42P01", "PGRST205"}
+
+
+def check_table(client: httpx.Client, table: str) -> Optional[str]:
+    """Describe why ``table`` can't be used, or return None when it answered normally."""
+    try:
+        response = client.get(f"/rest/v1/{table}", params={"select": "*", "limit": "1"})
+    except httpx.HTTPError as e:
+        return f"request failed: {str(e)}"
+    if response.is_success:
+        return None
+    try:
+        code = response.json().get("code")
+    except ValueError:
+        code = None
+    if response.status_code == 404 or code in MISSING_TABLE_CODES:
+        return "missing"
+    if response.status_code in (401, 403):
+        return f"not readable with SUPABASE_KEY ({response.status_code}); use the service role key"
+    return f"unexpected response {response.status_code}: {response.text[:200]}"
+
+
+def check_tables(url: str = SUPABASE_URL, key: str = SUPABASE_KEY) -> bool:
+    """Check every table in ``TABLES``, logging each failure. Returns True when all passed."""
+    logger.info(f"Checking {len(TABLES)} Supabase tables...")
+    client = sync_client(url, key)
+    failed = []
+    for table, used_by in TABLES.items():
+        problem = check_table(client, table)
+        if problem is None:
+            logger.info(f"{table}: ok")
+        else:
+            logger.error(f"{table} ({used_by}): {problem}")
+            failed.append(table)
+
+    if failed:
+        logger.error(f"{len(failed)} of {len(TABLES)} tables failed the check: {', '.join(failed)}")
+        logger.error("Create missing tables by running create_tables.sql in the Supabase SQL editor")
+        return False
+    logger.info("All tables are reachable")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_tables() else 1)
@@ -50,6 +50,26 @@ class ProcessResponse(BaseModel):
     summary: str
 
 
+# Analysis job schemas
+class JobCreatedResponse(BaseModel):
+    job_id: str
+    status: str
+
+
+class JobResponse(BaseModel):
+    id: str
+    status: str
+    stage: Optional[str] = None
+    chunks_total: int = 0
+    chunks_completed: int = 0
+    completed_chunks: List[int] = []
+    summary: Optional[str] = None
+    error: Optional[str] = None
+    metadata: dict = {}
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
 # Company profile schemas
 class CompanyProfileBase(BaseModel):
     name: str
@@ -0,0 +1,149 @@
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional
+
+NUMBERED_HEADING = re.compile(r"^\s*(\d{1,3}\.(?:\d{1,3}\.?)*)\s+(?=[A-Z(])")
+KEYWORD_HEADING = re.compile(
+    r"^\s*(article|section|clause|schedule|annex|appendix|exhibit)\s+(\d+(?:\.\d+)*|[ivxlc]+)\b",
+    re.IGNORECASE,
+)
+# Keyword headings that introduce a top-level division of the contract
+TOP_LEVEL_KEYWORDS = {"article", "schedule", "annex", "appendix", "exhibit"}
+
+
+@dataclass
+class ClauseNode:
+    """A node in the clause tree built from normalized contract text.
+
+    ``text`` holds the clause's own heading and body, excluding children.
+    The root node has level 0 and holds any preamble before the first heading.
+    """
+
+    level: int
+    number: Optional[str]
+    heading: Optional[str]
+    text: str = ""
+    children: List["ClauseNode"] = field(default_factory=list)
+
+    def walk(self):
+        """Yield this node and all descendants in document order."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def heading_level(line: str) -> Optional[int]:
+    """Return the nesting level of a clause heading line, or None.
+
+    Recognizes numbered headings ("12.3 Payment" is level 2), keyword
+    headings ("Article IV", "Section 5") and short all-caps titles.
+    """
+    stripped = line.strip()
+    if not stripped or len(stripped) > 120:
+        return None
+    match = NUMBERED_HEADING.match(stripped)
+    if match:
+        return len([part for part in match.group(1).split(".") if part])
+    match = KEYWORD_HEADING.match(stripped)
+    if match:
+        if match.group(1).lower() in TOP_LEVEL_KEYWORDS:
+            return 1
+        return 1 + match.group(2).count(".") + 1
+    words = stripped.split()
+    if (
+        len(words) <= 10
+        and stripped.isupper()
+        and sum(c.isalpha() for c in stripped) >= 4
+        and not stripped.endswith(".")
+    ):
+        return 1
+    return None
+
+
+def is_heading(line: str) -> bool:
+    return heading_level(line) is not None
+
+
+def heading_number(line: str) -> Optional[str]:
+    match = NUMBERED_HEADING.match(line) or KEYWORD_HEADING.match(line)
+    if not match:
+        return None
+    return match.group(0).strip().rstrip(".")
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace while keeping clause and paragraph structure.
+
+    Runs of spaces are collapsed and wrapped lines are joined, but each
+    clause heading starts a new block separated by a blank line, and
+    paragraph breaks (blank lines) inside a clause are kept as single
+    newlines.
+    """
+    return "".join(iter_normalized([text]))
+
+
+def iter_normalized(text_stream: Iterable[str]) -> Iterator[str]:
+    """Normalize a stream of raw text, yielding each paragraph as it completes.
+
+    The joined output equals ``normalize_text`` of the joined input however
+    the stream is split, so pages can be normalized while later ones are
+    still being extracted.
+    """
+    pending = ""
+    current = []
+    # Separator before the next paragraph: none at the start, then a newline
+    separator = ""
+
+    def raw_lines():
+        nonlocal pending
+        for piece in text_stream:
+            pending += piece
+            *lines, pending = pending.split("\n")
+            yield from lines
+        yield pending
+
+    for raw_line in raw_lines():
+        line = " ".join(raw_line.split())
+        if line and not is_heading(line):
+            current.append(line)
+            continue
+        if current:
+            yield separator + " ".join(current)
+            current.clear()
+            separator = "\n"
+        if line:
+            # Each heading starts a new block
+            yield ("\n\n" if separator else "") + line
+            separator = "\n"
+    if current:
+        yield separator + " ".join(current)
+
+
+def build_clause_tree(text: str) -> ClauseNode:
+    """Build a lightweight clause tree from normalized text.
+
+    Each block that starts with a heading becomes a node nested under the
+    closest preceding heading of a lower level.
+    """
+    root = ClauseNode(level=0, number=None, heading=None)
+    stack = [root]
+    for block in normalize_text(text).split("\n\n"):
+        if not block:
+            continue
+        first_line = block.split("\n", 1)[0]
+        level = heading_level(first_line)
+        if level is None:
+            # Text before the first heading belongs to the root
+            root.text = f"{root.text}\n{block}".strip()
+            continue
+        node = ClauseNode(
+            level=level,
+            number=heading_number(first_line),
+            heading=first_line,
+            text=block,
+        )
+        while stack[-1].level >= level:
+            stack.pop()
+        stack[-1].children.append(node)
+        stack.append(node)
+    return root
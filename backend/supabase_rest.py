@@ -0,0 +1,224 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+SUPABASE_MAX_KEEPALIVE = int(os.getenv("SUPABASE_MAX_KEEPALIVE", "10"))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+SUPABASE_RETRIES = int(os.getenv("SUPABASE_RETRIES", "2"))
+
+# Only requests that are safe to repeat are retried after a response
+RETRY_STATUSES = {502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def supabase_settings() -> Tuple[str, str]:
+    """The project URL and service key from the environment.
+
+    Read when a client is built rather than at import, so a ``.env`` loaded
+    after this module is imported still applies.
+    """
+    return (
+        os.getenv("SUPABASE_URL", "your-supabase-url"),
+        os.getenv("SUPABASE_KEY", "your-supabase-key"),
+    )
+
+
+def service_headers(key: str) -> Dict[str, str]:
+    return {
+        "apikey": key,
+        "Authorization": f"Bearer {key}",
+        "Content-Type": "application/json",
+    }
+
+
+class SupabaseREST:
+    """Pooled async client for Supabase REST and auth endpoints.
+
+    One ``httpx.AsyncClient`` is shared by all handlers so connections are
+    kept alive between requests. Connection failures are retried for every
+    method (nothing reached the server); 502/503/504 responses and other
+    transport errors only for idempotent methods. Without an explicit ``url``
+    and ``key`` they are read from the environment by ``start``.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        key: Optional[str] = None,
+        max_connections: int = SUPABASE_MAX_CONNECTIONS,
+        max_keepalive: int = SUPABASE_MAX_KEEPALIVE,
+        timeout: float = SUPABASE_TIMEOUT,
+        retries: int = SUPABASE_RETRIES,
+    ):
+        self.url = url
+        self.key = key
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+        )
+        self.timeout = httpx.Timeout(timeout)
+        self.retries = retries
+        self.client: Optional[httpx.AsyncClient] = None
+
+    async def start(self):
+        if self.client is None:
+            env_url, env_key = supabase_settings()
+            self.url = self.url or env_url
+            self.key = self.key or env_key
+            self.client = httpx.AsyncClient(
+                base_url=self.url,
+                headers=service_headers(self.key),
+                limits=self.limits,
+                timeout=self.timeout,
+            )
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        params: Dict[str, Any] = None,
+        json: Any = None,
+        headers: Dict[str, str] = None,
+        credentials: bool = True,
+    ) -> httpx.Response:
+        """Send a request; ``path`` is relative to the Supabase URL.
+
+        With ``credentials=False`` the service key headers are left off, for
+        public endpoints such as the JWKS.
+        """
+        if self.client is None:
+            # Outside the app lifespan (scripts, tests) start on first use
+            await self.start()
+        method = method.upper()
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                request = self.client.build_request(
+                    method, path, params=params, json=json, headers=headers
+                )
+                if not credentials:
+                    for name in service_headers(self.key):
+                        if name != "Content-Type":
+                            request.headers.pop(name, None)
+                response = await self.client.send(request)
+            except httpx.ConnectError as e:
+                if last_attempt:
+                    raise
+                logger.warning(f"Supabase {method} {path} could not connect: {str(e)}")
+            except httpx.TransportError as e:
+                if last_attempt or method not in IDEMPOTENT_METHODS:
+                    raise
+                logger.warning(f"Supabase {method} {path} failed: {str(e)}")
+            else:
+                if (
+                    response.status_code not in RETRY_STATUSES
+                    or last_attempt
+                    or method not in IDEMPOTENT_METHODS
+                ):
+                    return response
+                logger.warning(f"Supabase {method} {path} returned {response.status_code}")
+            await asyncio.sleep(0.2 * 2**attempt)
+
+    async def get(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", path, **kwargs)
+
+    async def patch(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("PATCH", path, **kwargs)
+
+    async def delete(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("DELETE", path, **kwargs)
+
+
+# Started and closed by the FastAPI lifespan in main.py
+supabase_rest = SupabaseREST()
+
+
+_sync_clients: Dict[tuple, httpx.Client] = {}
+_sync_clients_lock = threading.Lock()
+
+
+def sync_client(url: str, key: str) -> httpx.Client:
+    """Pooled blocking client shared by every store using the same project."""
+    with _sync_clients_lock:
+        client = _sync_clients.get((url, key))
+        if client is None:
+            client = httpx.Client(
+                base_url=url,
+                headers=service_headers(key),
+                limits=httpx.Limits(
+                    max_connections=SUPABASE_MAX_CONNECTIONS,
+                    max_keepalive_connections=SUPABASE_MAX_KEEPALIVE,
+                ),
+                timeout=httpx.Timeout(SUPABASE_TIMEOUT),
+            )
+            _sync_clients[(url, key)] = client
+        return client
+
+
+class SupabaseTable:
+    """Blocking access to one Supabase REST table, for stores used from worker threads.
+
+    Requests are retried like ``SupabaseREST`` requests. Unsuccessful
+    responses raise ``RuntimeError`` naming the attempted ``action``.
+    """
+
+    def __init__(self, table: str, url: Optional[str] = None, key: Optional[str] = None, retries: int = SUPABASE_RETRIES):
+        env_url, env_key = supabase_settings()
+        self.path = f"/rest/v1/{table}"
+        self.client = sync_client(url or env_url, key or env_key)
+        self.retries = retries
+
+    def request(self, method: str, action: str, params: Dict[str, Any] = None, json: Any = None, prefer: str = "return=representation") -> httpx.Response:
+        method = method.upper()
+        headers = {"Prefer": prefer}
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                response = self.client.request(method, self.path, params=params, json=json, headers=headers)
+            except httpx.ConnectError as e:
+                if last_attempt:
+                    raise
+                logger.warning(f"Supabase {method} {self.path} could not connect: {str(e)}")
+            except httpx.TransportError as e:
+                if last_attempt or method not in IDEMPOTENT_METHODS:
+                    raise
+                logger.warning(f"Supabase {method} {self.path} failed: {str(e)}")
+            else:
+                if (
+                    response.status_code not in RETRY_STATUSES
+                    or last_attempt
+                    or method not in IDEMPOTENT_METHODS
+                ):
+                    if not response.is_success:
+                        raise RuntimeError(f"Failed to {action}: {response.text}")
+                    return response
+                logger.warning(f"Supabase {method} {self.path} returned {response.status_code}")
+            time.sleep(0.2 * 2**attempt)
+
+    def select(self, params: Dict[str, Any], action: str) -> List[Dict]:
+        return self.request("GET", action, params=params).json()
+
+    def insert(self, rows: Any, action: str) -> List[Dict]:
+        return self.request("POST", action, json=rows).json()
+
+    def upsert(self, rows: List[Dict], action: str):
+        self.request("POST", action, json=rows, prefer="resolution=merge-duplicates,return=minimal")
+
+    def update(self, params: Dict[str, Any], fields: Dict[str, Any], action: str) -> List[Dict]:
+        return self.request("PATCH", action, params=params, json=fields).json()
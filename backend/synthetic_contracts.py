@@ -0,0 +1,82 @@
+"""Deterministic synthetic contract PDFs for benchmarks and load tests.
+
+Contracts are rental terms with numbered clause headings and boilerplate
+sentences, so extraction, segmentation and alignment see the same kind of
+structure as real uploads. The same ``seed`` always produces the same PDF.
+"""
+import os
+import io
+import random
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+TOPICS = [
+    ("Payment Terms", "invoice payment days net interest late fees amount due rent deposit"),
+    ("Delivery", "delivery equipment site transport shipping arrival schedule unloading"),
+    ("Return of Equipment", "return equipment condition wear cleaning inspection end term"),
+    ("Liability", "liability damages indirect consequential cap limitation loss negligence"),
+    ("Indemnification", "indemnify defend hold harmless claims third party costs"),
+    ("Insurance", "insurance coverage policy certificate insured amount premium"),
+    ("Termination", "terminate termination notice breach cure period default"),
+    ("Maintenance", "maintenance repair service technician inspection servicing parts"),
+    ("Confidentiality", "confidential information disclose disclosure secrecy records"),
+    ("Governing Law", "governing law jurisdiction courts dispute arbitration venue"),
+    ("Intellectual Property", "intellectual property ownership license software patents"),
+    ("Force Majeure", "force majeure events beyond control delay suspension"),
+]
+
+LINES_PER_PAGE = 46
+LINE_WIDTH = 95
+
+
+def contract_lines(pages: int, party: str = "Lessee", seed: int = 0) -> list:
+    """Return text lines for a contract filling about ``pages`` pages."""
+    rnd = random.Random(seed)
+    lines = []
+    number = 0
+    while len(lines) < pages * LINES_PER_PAGE:
+        number += 1
+        title, vocabulary = TOPICS[(number - 1) % len(TOPICS)]
+        words = vocabulary.split()
+        lines.append(f"{number}. {title.upper()}")
+        for sub in range(1, rnd.randint(2, 4) + 1):
+            sentences = " ".join(
+                f"The {party} shall " + " ".join(rnd.choice(words) for _ in range(rnd.randint(8, 16))) + "."
+                for _ in range(rnd.randint(3, 6))
+            )
+            paragraph = f"{number}.{sub} {sentences}"
+            lines.extend(paragraph[i:i + LINE_WIDTH] for i in range(0, len(paragraph), LINE_WIDTH))
+        lines.append("")
+    return lines[:pages * LINES_PER_PAGE]
+
+
+def contract_pdf(pages: int, party: str = "Lessee", seed: int = 0) -> bytes:
+    """Render a synthetic contract of exactly ``pages`` pages."""
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter, invariant=1)
+    lines = contract_lines(pages, party, seed)
+    for start in range(0, len(lines), LINES_PER_PAGE):
+        y = 750
+        for line in lines[start:start + LINES_PER_PAGE]:
+            pdf.drawString(40, y, line)
+            y -= 15
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def build_corpus(page_counts: list, directory: str, party: str = "Lessee", seed: int = 0) -> dict:
+    """Write one contract per page count to ``directory``; returns ``{pages: path}``.
+
+    Existing files are reused, so a corpus is generated once per machine.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for pages in page_counts:
+        path = os.path.join(directory, f"{party.lower()}_{pages}p_seed{seed}.pdf")
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(contract_pdf(pages, party, seed + pages))
+        paths[pages] = path
+    return paths
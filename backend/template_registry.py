@@ -0,0 +1,197 @@
+import os
+import uuid
+import hashlib
+import logging
+import threading
+from dataclasses import asdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from alignment import SEGMENTER_VERSION, Clause
+from cache import LRUCache
+from extraction_cache import content_hash
+from uploads import PDFContent
+from supabase_rest import SupabaseTable
+from process import SellerTemplate, build_seller_template, extract_text, preprocess_text, prepare_system_prompt
+
+logger = logging.getLogger(__name__)
+
+# Built templates (with their clause index) kept per worker
+TEMPLATE_CACHE_MAX_ENTRIES = int(os.getenv("TEMPLATE_CACHE_MAX_ENTRIES", "64"))
+TEMPLATE_CACHE_TTL = float(os.getenv("TEMPLATE_CACHE_TTL", "3600"))
+
+TEMPLATE_DOCUMENT_TYPE = "seller_template"
+
+
+class TemplateStore:
+    """Storage backend for registered seller templates.
+
+    Templates are plain dicts matching ``schemas.CompanyDocumentResponse``
+    plus the extracted ``normalized_text``, its ``clauses`` and the
+    ``clause_size`` and ``segmenter_version`` they were segmented with.
+    """
+
+    def create(self, template: Dict[str, Any]) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def get(self, template_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def list(self, company_id: str) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def clear_primary(self, company_id: str):
+        """Unmark the company's current primary template."""
+        raise NotImplementedError
+
+
+class InMemoryTemplateStore(TemplateStore):
+    """Process-local template store. Templates are lost when the worker restarts."""
+
+    def __init__(self):
+        self._templates: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, template):
+        with self._lock:
+            self._templates[template["id"]] = dict(template)
+            return dict(template)
+
+    def get(self, template_id):
+        with self._lock:
+            template = self._templates.get(template_id)
+            return dict(template) if template else None
+
+    def list(self, company_id):
+        with self._lock:
+            rows = [dict(t) for t in self._templates.values() if t["company_id"] == company_id]
+        return sorted(rows, key=lambda t: t["uploaded_at"], reverse=True)
+
+    def clear_primary(self, company_id):
+        with self._lock:
+            for template in self._templates.values():
+                if template["company_id"] == company_id:
+                    template["is_primary_template"] = False
+
+
+class SupabaseTemplateStore(TemplateStore):
+    """Template store persisted to the ``company_documents`` table via Supabase REST."""
+
+    # Columns returned when listing, leaving out the stored text and clauses
+    SUMMARY_COLUMNS = "id,company_id,filename,document_type,description,is_primary_template,file_path,content_hash,uploaded_at"
+
+    def __init__(self, url: str, key: str, table: str = "company_documents"):
+        self.table = SupabaseTable(table, url, key)
+
+    def create(self, template):
+        return self.table.insert(template, "save template")[0]
+
+    def get(self, template_id):
+        rows = self.table.select({"id": f"eq.{template_id}"}, "fetch template")
+        return rows[0] if rows else None
+
+    def list(self, company_id):
+        return self.table.select(
+            {
+                "select": self.SUMMARY_COLUMNS,
+                "company_id": f"eq.{company_id}",
+                "document_type": f"eq.{TEMPLATE_DOCUMENT_TYPE}",
+                "order": "uploaded_at.desc",
+            },
+            "list templates",
+        )
+
+    def clear_primary(self, company_id):
+        self.table.update(
+            {"company_id": f"eq.{company_id}", "is_primary_template": "eq.true"},
+            {"is_primary_template": False},
+            "update templates",
+        )
+
+
+def create_template_store() -> TemplateStore:
+    """Build the store selected by the ``TEMPLATE_STORE`` environment variable."""
+    if os.getenv("TEMPLATE_STORE", "memory") == "supabase":
+        return SupabaseTemplateStore(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+    return InMemoryTemplateStore()
+
+
+class TemplateRegistry:
+    """Seller templates extracted and segmented once, then reused by id.
+
+    Registering a template parses the PDF and stores its normalized text and
+    clauses. Comparisons load it by id and only rebuild the clause index,
+    which is kept in a per-worker cache keyed by the system prompt it was
+    built for.
+    """
+
+    def __init__(self, store: TemplateStore, max_entries: int = TEMPLATE_CACHE_MAX_ENTRIES, ttl: float = TEMPLATE_CACHE_TTL):
+        self.store = store
+        self.templates = LRUCache(maxsize=max_entries, ttl=ttl)
+
+    def register(self, pdf_content: PDFContent, filename: str, company_name: str, company_id: str, description: str = None, is_primary: bool = True) -> Dict[str, Any]:
+        """Extract, normalize and segment a seller PDF and store the result."""
+        file_hash = content_hash(pdf_content)
+        text = preprocess_text(extract_text(pdf_content, file_hash))
+        template = build_seller_template(text, filename, company_name, company_id)
+        record = {
+            "id": str(uuid.uuid4()),
+            "company_id": company_id,
+            "filename": filename,
+            "document_type": TEMPLATE_DOCUMENT_TYPE,
+            "description": description,
+            "is_primary_template": is_primary,
+            # Only the extracted text is kept, not the PDF itself
+            "file_path": filename,
+            "content_hash": file_hash,
+            "uploaded_at": datetime.utcnow().isoformat(),
+            "normalized_text": text,
+            "clauses": [asdict(clause) for clause in template.clauses],
+            "clause_size": template.budget // 2,
+            "segmenter_version": SEGMENTER_VERSION,
+        }
+        if is_primary:
+            self.store.clear_primary(company_id)
+        record = self.store.create(record)
+        self.templates.set(self.cache_key(record["id"], template.system_prompt), template)
+        logger.info(f"Registered template {record['id']} ({filename}) with {len(template.clauses)} clauses for company {company_id}")
+        return record
+
+    def list(self, company_id: str) -> List[Dict[str, Any]]:
+        return self.store.list(company_id)
+
+    def primary_id(self, company_id: str) -> Optional[str]:
+        for template in self.list(company_id):
+            if template.get("is_primary_template"):
+                return template["id"]
+        return None
+
+    def load(self, template_id: str, company_name: str, company_id: str) -> Optional[SellerTemplate]:
+        """Return the company's template ready for comparisons, or None if not found."""
+        # The prompt carries the company name and priorities the template was built for
+        key = self.cache_key(template_id, prepare_system_prompt(company_name, company_id))
+        cached = self.templates.get(key)
+        if cached is not None and cached.company_id == company_id:
+            return cached
+
+        record = self.store.get(template_id)
+        if not record or record["company_id"] != company_id:
+            return None
+        # Clauses cut by an older segmenter would not line up with buyer clauses
+        clauses = None
+        if record.get("segmenter_version") == SEGMENTER_VERSION:
+            clauses = [Clause(**clause) for clause in record["clauses"]]
+        template = build_seller_template(
+            record["normalized_text"], record["filename"], company_name, company_id,
+            clauses=clauses, clause_size=record["clause_size"],
+        )
+        self.templates.set(key, template)
+        return template
+
+    @staticmethod
+    def cache_key(template_id: str, system_prompt: str) -> str:
+        return f"{template_id}:{hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()}"
+
+
+# Shared by request handlers and analysis jobs in this process
+template_registry = TemplateRegistry(create_template_store())
@@ -0,0 +1,155 @@
+import textwrap
+
+import pytest
+
+from alignment import (
+    MISSING_CLAUSE,
+    Clause,
+    align_clauses,
+    iter_align,
+    iter_clauses,
+    pack_aligned_pairs,
+    segment_clauses,
+    split_oversized,
+)
+from clause_diff import IDENTICAL, compare_clause
+from structure import iter_normalized, normalize_text
+from synthetic_contracts import contract_lines
+
+SELLER = """1. PAYMENT TERMS
+The Buyer shall pay each invoice within thirty days of receipt.
+
+2. DELIVERY
+The Seller shall deliver the equipment to the site on the agreed schedule.
+
+3. GOVERNING LAW
+This agreement is governed by the laws of England and the courts of London."""
+
+BUYER = """1. DELIVERY
+The Seller shall deliver the equipment to the site on the agreed schedule and unload it.
+
+2. PAYMENT TERMS
+The Buyer shall pay each invoice within sixty days of receipt.
+
+3. WARRANTY
+The Seller warrants the equipment is free from defects for twelve months."""
+
+
+def headings(pairs):
+    return [(p.buyer and p.buyer.heading, p.seller and p.seller.heading) for p in pairs]
+
+
+def test_segment_clauses_splits_at_headings():
+    clauses = segment_clauses(SELLER, 1000)
+    assert [c.heading for c in clauses] == ["1. PAYMENT TERMS", "2. DELIVERY", "3. GOVERNING LAW"]
+    assert [c.index for c in clauses] == [0, 1, 2]
+    assert clauses[0].text == "1. PAYMENT TERMS The Buyer shall pay each invoice within thirty days of receipt."
+
+
+def test_segment_clauses_keeps_preamble_as_first_clause():
+    clauses = segment_clauses("This agreement is made between the parties.\n\n" + SELLER, 1000)
+    assert clauses[0].heading is None
+    assert clauses[0].text == "This agreement is made between the parties."
+    assert len(clauses) == 4
+
+
+def test_iter_clauses_matches_across_page_boundaries():
+    pages = [BUYER[:50], BUYER[50:130], BUYER[130:]]
+    streamed = [c.text for c in iter_clauses(pages, 1000)]
+    assert streamed == [c.text for c in iter_clauses([BUYER], 1000)]
+    assert [text.split(" The")[0] for text in streamed] == ["1. DELIVERY", "2. PAYMENT TERMS", "3. WARRANTY"]
+
+
+def test_iter_clauses_splits_oversized_clauses_under_the_same_heading():
+    body = " ".join(f"Sentence number {n} of the clause." for n in range(20))
+    clauses = list(iter_clauses(["1. LIABILITY\n", body + "\n"], 120))
+    assert len(clauses) > 1
+    assert all(len(c.text) <= 120 for c in clauses)
+    assert {c.heading for c in clauses} == {"1. LIABILITY"}
+
+
+def test_split_oversized_prefers_sentence_boundaries():
+    assert split_oversized("One sentence here. Two sentence here. Three here.", 20) == [
+        "One sentence here.",
+        "Two sentence here.",
+        "Three here.",
+    ]
+
+
+def test_split_oversized_cuts_text_without_boundaries():
+    parts = split_oversized("x" * 95, 20)
+    assert "".join(parts) == "x" * 95
+    assert all(len(part) <= 20 for part in parts)
+
+
+def test_align_matches_reordered_clauses_by_heading_and_content():
+    aligned = align_clauses(segment_clauses(BUYER, 1000), segment_clauses(SELLER, 1000))
+    assert headings(aligned) == [
+        ("1. DELIVERY", "2. DELIVERY"),
+        ("2. PAYMENT TERMS", "1. PAYMENT TERMS"),
+        ("3. WARRANTY", None),
+        (None, "3. GOVERNING LAW"),
+    ]
+    assert [p.status for p in aligned] == ["matched", "matched", "buyer_only", "seller_only"]
+    assert all(p.score > 0.5 for p in aligned[:2])
+
+
+def test_iter_align_agrees_with_align_clauses():
+    buyer, seller = segment_clauses(BUYER, 1000), segment_clauses(SELLER, 1000)
+    assert headings(iter_align(buyer, seller)) == headings(align_clauses(buyer, seller))
+
+
+def test_align_leaves_dissimilar_clauses_unmatched():
+    buyer = [Clause(0, None, "Completely unrelated wording about parking permits.")]
+    seller = [Clause(0, None, "The Buyer shall pay each invoice within thirty days.")]
+    assert [p.status for p in align_clauses(buyer, seller)] == ["buyer_only", "seller_only"]
+
+
+def test_pack_labels_both_sides_and_fills_placeholders():
+    aligned = align_clauses(segment_clauses(BUYER, 1000), segment_clauses(SELLER, 1000))
+    [(buyer_chunk, seller_chunk)] = pack_aligned_pairs(aligned, 10_000)
+    assert buyer_chunk.count("[Clause ") == seller_chunk.count("[Clause ") == 4
+    assert "[Clause 3] 3. WARRANTY" in buyer_chunk
+    assert f"[Clause 3] {MISSING_CLAUSE}" in seller_chunk
+    assert f"[Clause 4] {MISSING_CLAUSE}" in buyer_chunk
+
+
+@pytest.mark.parametrize("budget", [200, 400, 700])
+def test_pack_keeps_requests_within_budget(budget):
+    aligned = align_clauses(segment_clauses(BUYER, 1000), segment_clauses(SELLER, 1000))
+    pairs = list(pack_aligned_pairs(aligned, budget))
+    # Every clause is sent exactly once
+    assert sum(buyer.count("[Clause") for buyer, _ in pairs) == 4
+    for buyer, seller in pairs:
+        single_clause = buyer.count("[Clause") == 1
+        assert single_clause or len(buyer) + len(seller) <= budget
+
+
+def test_pack_uses_the_length_function():
+    aligned = align_clauses(segment_clauses(BUYER, 1000), segment_clauses(SELLER, 1000))
+    words = lambda text: len(text.split())
+    assert len(list(pack_aligned_pairs(aligned, 10_000))) == 1
+    assert len(list(pack_aligned_pairs(aligned, 60, words))) > 1
+
+
+@pytest.mark.parametrize("max_size", [120, 400, 1000])
+def test_identical_text_gives_all_identical_pairs(max_size):
+    text = "\n".join(contract_lines(8))
+    seller = segment_clauses(text, max_size)
+    # The buyer side streams pages, split mid-line
+    pages = [text[i:i + 1500] for i in range(0, len(text), 1500)]
+    aligned = list(iter_align(iter_clauses(pages, max_size), seller))
+
+    assert len(aligned) == len(seller)
+    assert all(compare_clause(pair).status == IDENTICAL for pair in aligned)
+
+
+@pytest.mark.parametrize("max_size", [120, 400])
+def test_normalized_streams_segment_like_normalized_text(max_size):
+    # Wrapped lines and uneven spacing, as PDF extraction produces them
+    lines = [wrapped for line in contract_lines(8) for wrapped in textwrap.wrap(line, 60) or [""]]
+    text = "\n ".join(line.replace(" ", "   ") for line in lines)
+    pages = [text[i:i + 1500] for i in range(0, len(text), 1500)]
+    streamed = iter_clauses(iter_normalized(pages), max_size)
+
+    assert [c.text for c in streamed] == [c.text for c in segment_clauses(normalize_text(text), max_size)]
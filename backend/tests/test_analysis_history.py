@@ -0,0 +1,152 @@
+import analysis_history
+from alignment import AlignedClause, Clause
+from analysis_history import (
+    IncrementalAnalysis,
+    InMemoryHistoryStore,
+    clause_hash,
+    split_by_clause,
+)
+
+PROMPT = "You are reviewing terms for Acme."
+
+
+def pair(buyer, seller="Seller wording.", heading=None):
+    return AlignedClause(Clause(0, heading, buyer), Clause(0, heading, seller) if seller else None)
+
+
+def test_split_by_clause():
+    response = (
+        "Overview of the changes.\n"
+        "**[Clause 1] Payment**\nThe buyer pays later.\n\n"
+        "[Clause 2]\nDelivery is unchanged in substance.\n"
+        "- [Clause 3] Liability: capped lower."
+    )
+    sections = split_by_clause(response)
+    assert sorted(sections) == [1, 2, 3]
+    assert sections[1] == "**[Clause 1] Payment**\nThe buyer pays later."
+    assert sections[2] == "[Clause 2]\nDelivery is unchanged in substance."
+    assert sections[3] == "- [Clause 3] Liability: capped lower."
+
+
+def test_split_by_clause_keeps_repeated_labels():
+    sections = split_by_clause("[Clause 1] first part\n[Clause 2] other\n[Clause 1] second part")
+    assert sections[1] == "[Clause 1] first part\n\n[Clause 1] second part"
+
+
+def test_split_by_clause_ignores_inline_mentions():
+    assert split_by_clause("See [Clause 2] for details.") == {}
+
+
+def test_clause_hash_ignores_whitespace_but_not_wording_or_prompt():
+    base = clause_hash(pair("The Buyer shall pay."), PROMPT)
+    assert clause_hash(pair("The  Buyer\nshall pay. "), PROMPT) == base
+    assert clause_hash(pair("The Buyer must pay."), PROMPT) != base
+    assert clause_hash(pair("The Buyer shall pay.", seller=None), PROMPT) != base
+    assert clause_hash(pair("The Buyer shall pay."), PROMPT + " Priorities changed.") != base
+
+
+def test_incremental_analysis_reuses_recorded_clauses():
+    store = InMemoryHistoryStore()
+    first = [pair("Pay in 30 days."), pair("Deliver to site."), pair("Cap liability.")]
+
+    revision1 = IncrementalAnalysis(PROMPT, store=store)
+    assert list(revision1.filter(first)) == first
+    recorded = revision1.record([
+        "[Clause 1] Payment is fine.\n[Clause 2] Delivery is fine.",
+        "[Clause 3] Liability cap is low.",
+    ])
+    assert recorded == 3
+
+    # The second revision changes only the delivery clause
+    second = [pair("Pay in 30 days."), pair("Deliver to the buyer's site."), pair("Cap liability.")]
+    revision2 = IncrementalAnalysis(PROMPT, store=store)
+    assert list(revision2.filter(second)) == [second[1]]
+    assert revision2.reused == [
+        (second[0], "[Clause 1] Payment is fine."),
+        (second[2], "[Clause 3] Liability cap is low."),
+    ]
+
+
+def test_record_numbers_clauses_in_the_order_they_were_sent():
+    store = InMemoryHistoryStore()
+    seeded = IncrementalAnalysis(PROMPT, store=store)
+    list(seeded.filter([pair("Old clause.")]))
+    seeded.record(["[Clause 1] Old analysis."])
+
+    revision = IncrementalAnalysis(PROMPT, store=store)
+    sent = list(revision.filter([pair("Old clause."), pair("New clause.")]))
+    assert sent == [pair("New clause.")]
+    # The new clause is the first one sent, so its label is [Clause 1]
+    revision.record(["[Clause 1] New analysis."])
+    assert store.get_clause_analyses([clause_hash(pair("New clause."), PROMPT)]) == {
+        clause_hash(pair("New clause."), PROMPT): "[Clause 1] New analysis."
+    }
+
+
+def test_record_skips_clauses_missing_from_the_response():
+    analysis = IncrementalAnalysis(PROMPT, store=InMemoryHistoryStore())
+    list(analysis.filter([pair("One."), pair("Two.")]))
+    assert analysis.record(["[Clause 2] Only the second."]) == 1
+
+
+def test_filter_batches_lookups(monkeypatch):
+    monkeypatch.setattr(analysis_history, "HISTORY_LOOKUP_BATCH", 2)
+    store = InMemoryHistoryStore()
+    lookups = []
+    original = store.get_clause_analyses
+    monkeypatch.setattr(store, "get_clause_analyses", lambda hashes: lookups.append(len(hashes)) or original(hashes))
+
+    pairs = [pair(f"Clause {n}.") for n in range(5)]
+    assert list(IncrementalAnalysis(PROMPT, store=store).filter(pairs)) == pairs
+    assert lookups == [2, 2, 1]
+
+
+def test_disabled_history_analyzes_everything(monkeypatch):
+    store = InMemoryHistoryStore()
+    seeded = IncrementalAnalysis(PROMPT, store=store)
+    list(seeded.filter([pair("Clause.")]))
+    seeded.record(["[Clause 1] Analysis."])
+
+    monkeypatch.setattr(analysis_history, "INCREMENTAL_ANALYSIS", False)
+    assert list(IncrementalAnalysis(PROMPT, store=store).filter([pair("Clause.")])) == [pair("Clause.")]
+
+
+class BrokenStore(InMemoryHistoryStore):
+    def get_clause_analyses(self, hashes):
+        raise RuntimeError("history unavailable")
+
+    def save_clause_analyses(self, analyses, company_id=None):
+        raise RuntimeError("history unavailable")
+
+
+def test_store_failures_fall_back_to_full_analysis():
+    analysis = IncrementalAnalysis(PROMPT, store=BrokenStore())
+    pairs = [pair("One."), pair("Two.")]
+    assert list(analysis.filter(pairs)) == pairs
+    assert analysis.record(["[Clause 1] x\n[Clause 2] y"]) == 0
+
+
+def test_describe_reused_relabels_with_the_clause_title():
+    analysis = IncrementalAnalysis(PROMPT, store=InMemoryHistoryStore())
+    analysis.reused = [
+        (pair("Pay in 30 days.", heading="4. PAYMENT"), "**[Clause 7] Payment**\nStill fine."),
+        (pair("An unheaded clause about delivery schedules and sites."), "[Clause 2] Fine."),
+    ]
+    report = analysis.describe_reused()
+    assert report.startswith("CLAUSES UNCHANGED SINCE A PREVIOUS REVISION (earlier analysis):")
+    assert "**[4. PAYMENT] Payment**\nStill fine." in report
+    assert "[An unheaded clause about delivery schedules and sites....] Fine." in report
+    assert "[Clause" not in report
+    assert IncrementalAnalysis(PROMPT, store=InMemoryHistoryStore()).describe_reused() == ""
+
+
+def test_in_memory_store_is_bounded():
+    store = InMemoryHistoryStore(max_clauses=2, max_analyses=2)
+    store.save_clause_analyses({"a": "A", "b": "B", "c": "C"})
+    assert store.get_clause_analyses(["a", "b", "c"]) == {"b": "B", "c": "C"}
+
+    for n in range(3):
+        store.save_analysis({"id": str(n), "user_id": "u1", "created_at": f"2026-01-0{n + 1}"})
+    store.save_analysis({"id": "other", "user_id": "u2", "created_at": "2026-01-09"})
+    assert [a["id"] for a in store.list_analyses("u1")] == ["2"]
+    assert [a["id"] for a in store.list_analyses("u2")] == ["other"]
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import httpx
+import jose.jwt
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+import auth
+import cache
+from cache import LRUCache
+
+SECRET = "test-jwt-secret"
+
+
+def make_token(secret=SECRET, audience="authenticated", expires_in=3600):
+    claims = {"sub": "user-1", "email": "user@example.com", "aud": audience, "exp": int(time.time()) + expires_in}
+    return jwt.encode(claims, secret, algorithm="HS256")
+
+
+@pytest.fixture
+def remote_calls(monkeypatch):
+    """Fresh token cache, and a Supabase REST stub that records /auth/v1/user calls."""
+    monkeypatch.setattr(auth, "token_cache", LRUCache(maxsize=16, ttl=300))
+    monkeypatch.setattr(auth, "SUPABASE_JWT_SECRET", SECRET)
+    calls = []
+
+    async def get(path, **kwargs):
+        calls.append(path)
+        return httpx.Response(200, json={"id": "remote-user", "email": "remote@example.com"})
+
+    monkeypatch.setattr(auth.supabase_rest, "get", get)
+    return calls
+
+
+def verify(token):
+    return asyncio.run(auth.verify_token(token))
+
+
+def test_valid_token_is_verified_locally(remote_calls):
+    user = verify(make_token())
+
+    assert user["id"] == "user-1"
+    assert user["email"] == "user@example.com"
+    assert remote_calls == []
+
+
+@pytest.mark.parametrize("token", [
+    make_token(expires_in=-60),
+    make_token(audience="anon"),
+    make_token(secret="some-other-secret"),
+], ids=["expired", "wrong-audience", "bad-signature"])
+def test_invalid_tokens_are_rejected(remote_calls, token):
+    with pytest.raises(HTTPException) as error:
+        verify(token)
+
+    assert error.value.status_code == 401
+    assert remote_calls == []
+
+
+def test_cached_token_is_rejected_after_it_expires(remote_calls, monkeypatch):
+    token = make_token(expires_in=60)
+    assert verify(token)["id"] == "user-1"
+    assert verify(token)["id"] == "user-1"
+    assert auth.token_cache.stats()["hits"] == 1
+
+    # Move both the cache clock and the clock jose checks "exp" against
+    now = time.monotonic()
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now + 120)
+
+    class Later(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime.utcnow() + timedelta(seconds=120)
+
+    monkeypatch.setattr(jose.jwt, "datetime", Later)
+    with pytest.raises(HTTPException):
+        verify(token)
+
+
+def test_remote_verification_only_without_a_secret(remote_calls, monkeypatch):
+    token = make_token(secret="project-secret")
+    with pytest.raises(HTTPException):
+        verify(token)
+    assert remote_calls == []
+
+    monkeypatch.setattr(auth, "SUPABASE_JWT_SECRET", None)
+    assert verify(token)["id"] == "remote-user"
+    assert remote_calls == ["/auth/v1/user"]
@@ -0,0 +1,83 @@
+import pytest
+
+import cache
+from cache import LRUCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_evicts_least_recently_used():
+    lru = LRUCache(maxsize=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    # Reading "a" makes "b" the least recently used
+    assert lru.get("a") == 1
+    lru.set("c", 3)
+
+    assert "b" not in lru
+    assert lru.get("a") == 1
+    assert lru.get("c") == 3
+    assert lru.stats()["evictions"] == 1
+
+
+def test_overwriting_refreshes_position():
+    lru = LRUCache(maxsize=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.set("a", 10)
+    lru.set("c", 3)
+
+    assert lru.get("a") == 10
+    assert "b" not in lru
+
+
+def test_entries_expire_after_ttl(clock):
+    lru = LRUCache(maxsize=10, ttl=5)
+    lru.set("a", 1)
+    clock[0] += 4.9
+    assert lru.get("a") == 1
+    clock[0] += 0.2
+    assert lru.get("a", "missing") == "missing"
+    assert len(lru) == 0
+    assert lru.stats()["expirations"] == 1
+
+
+def test_per_entry_ttl_overrides_default(clock):
+    lru = LRUCache(maxsize=10, ttl=60)
+    lru.set("short", 1, ttl=1)
+    lru.set("long", 2)
+    clock[0] += 2
+
+    assert "short" not in lru
+    assert "long" in lru
+
+
+def test_without_ttl_entries_never_expire(clock):
+    lru = LRUCache(maxsize=10)
+    lru.set("a", 1)
+    clock[0] += 10 ** 9
+    assert lru.get("a") == 1
+
+
+def test_delete_and_clear():
+    lru = LRUCache(maxsize=10)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.delete("a")
+    assert not lru.delete("a")
+    lru.clear()
+    assert len(lru) == 0
+
+
+def test_stats_count_hits_and_misses():
+    lru = LRUCache(maxsize=10)
+    lru.set("a", 1)
+    lru.get("a")
+    lru.get("b")
+    stats = lru.stats()
+    assert (stats["hits"], stats["misses"], stats["size"], stats["maxsize"]) == (1, 1, 1, 10)
@@ -0,0 +1,165 @@
+import pytest
+
+import clause_diff
+from alignment import AlignedClause, Clause
+from clause_diff import (
+    COSMETIC,
+    IDENTICAL,
+    SUBSTANTIVE,
+    canonical,
+    compare_clause,
+    describe_unchanged,
+    near_identical,
+    triage_aligned,
+)
+
+SELLER = (
+    "4.1 Payment. The Buyer shall pay each invoice within thirty (30) days of receipt, "
+    "and late amounts accrue interest at the statutory rate until paid in full."
+)
+
+
+def pair(buyer, seller=SELLER, heading="4.1 Payment"):
+    return AlignedClause(
+        Clause(0, heading, buyer) if buyer is not None else None,
+        Clause(0, heading, seller) if seller is not None else None,
+        0.9,
+    )
+
+
+def test_canonical_ignores_case_punctuation_and_numbering():
+    assert canonical("7.2  The BUYER shall: pay!") == canonical("The buyer shall pay")
+    assert canonical("Article IV The Buyer shall pay") == "the buyer shall pay"
+
+
+def test_canonical_keeps_currency_and_percent_signs():
+    assert canonical("$500") != canonical("€500")
+    assert canonical("5% of the fee") != canonical("5 of the fee")
+
+
+def test_canonical_folds_ligatures():
+    assert canonical("ﬁnal ofﬁce") == "final office"
+
+
+def test_identical():
+    assert compare_clause(pair("  " + SELLER.replace(" ", "\n", 3))).status == IDENTICAL
+
+
+@pytest.mark.parametrize(
+    "buyer",
+    [
+        SELLER.upper(),
+        SELLER.replace("4.1", "9.3"),
+        SELLER.replace(",", "").replace("(30)", "30"),
+    ],
+)
+def test_formatting_only_changes_are_cosmetic(buyer):
+    comparison = compare_clause(pair(buyer))
+    assert comparison.status == COSMETIC
+    assert comparison.similarity == 1.0
+
+
+def test_only_exact_canonical_matches_are_skipped_by_default():
+    assert compare_clause(pair(SELLER.replace("each invoice", "the invoice"))).status == SUBSTANTIVE
+
+
+def test_article_changes_are_near_identical_when_enabled(monkeypatch):
+    monkeypatch.setattr(clause_diff, "CLAUSE_COSMETIC_SIMILARITY", 0.9)
+    comparison = compare_clause(pair(SELLER.replace("the statutory rate", "a statutory rate")))
+    assert comparison.status == COSMETIC
+    assert 0.9 <= comparison.similarity < 1.0
+
+
+@pytest.mark.parametrize(
+    "buyer",
+    [
+        SELLER.replace("shall pay", "shall not pay"),
+        SELLER.replace("shall", "may"),
+        SELLER.replace("(30)", "(60)"),
+        SELLER.replace("thirty (30) days", "thirty (30) business days"),
+        SELLER.replace("statutory rate", "rate of 12%"),
+        "The Buyer may withhold payment of any disputed invoice indefinitely.",
+    ],
+)
+def test_changed_obligations_are_substantive(buyer):
+    assert compare_clause(pair(buyer)).status == SUBSTANTIVE
+
+
+INDEMNITY = (
+    "The Lessee shall indemnify the Lessor against all losses caused by its negligence "
+    "during the rental period, up to $500 per incident."
+)
+
+
+@pytest.mark.parametrize(
+    "buyer",
+    [
+        # Party swap
+        INDEMNITY.replace("The Lessee shall indemnify the Lessor", "The Lessor shall indemnify the Lessee"),
+        INDEMNITY.replace("Lessee shall", "Lessor shall"),
+        # Qualifier insertions
+        INDEMNITY.replace("its negligence", "its gross negligence"),
+        INDEMNITY.replace("during the rental period", "after the rental period"),
+        # Currency change
+        INDEMNITY.replace("$500", "€500"),
+        INDEMNITY.replace("$500", "500"),
+        # A typo can hide a different word, so it is left to the model
+        INDEMNITY.replace("indemnify", "indemnfy"),
+    ],
+)
+@pytest.mark.parametrize("threshold", [1.0, 0.9])
+def test_small_real_changes_are_substantive(monkeypatch, buyer, threshold):
+    monkeypatch.setattr(clause_diff, "CLAUSE_COSMETIC_SIMILARITY", threshold)
+    assert compare_clause(pair(buyer, INDEMNITY)).status == SUBSTANTIVE
+
+
+def test_one_sided_clauses_are_substantive():
+    assert compare_clause(pair(SELLER, None)).status == SUBSTANTIVE
+    assert compare_clause(pair(None, SELLER)).status == SUBSTANTIVE
+
+
+def test_near_identical_threshold():
+    a = canonical(SELLER)
+    b = canonical(SELLER.replace("the statutory", "a statutory"))
+    assert near_identical(a, b, threshold=0.9) > 0.9
+    assert near_identical(a, b, threshold=0.9999) == 0.0
+    # A threshold of 1 only allows exact canonical matches
+    assert near_identical(a, b, threshold=1.0) == 0.0
+
+
+def test_triage_passes_substantive_and_collects_the_rest():
+    pairs = [
+        pair(SELLER),
+        pair(SELLER.upper()),
+        pair(SELLER.replace("(30)", "(60)")),
+        pair("A new clause on warranties.", None, heading="9. WARRANTY"),
+    ]
+    unchanged = []
+    sent = list(triage_aligned(pairs, unchanged))
+    assert sent == pairs[2:]
+    assert [c.status for c in unchanged] == [IDENTICAL, COSMETIC]
+
+
+def test_triage_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(clause_diff, "SKIP_UNCHANGED_CLAUSES", False)
+    unchanged = []
+    pairs = [pair(SELLER), pair(SELLER.upper())]
+    assert list(triage_aligned(pairs, unchanged)) == pairs
+    assert unchanged == []
+
+
+def test_describe_unchanged(monkeypatch):
+    monkeypatch.setattr(clause_diff, "CLAUSE_COSMETIC_SIMILARITY", 0.9)
+    unchanged = []
+    list(triage_aligned(
+        [pair(SELLER), pair(SELLER.upper()), pair(SELLER.replace("the statutory", "a statutory"), heading=None)],
+        unchanged,
+    ))
+    report = describe_unchanged(unchanged)
+    lines = report.splitlines()
+    assert lines[0] == "CLAUSES MATCHING YOUR TEMPLATE (no analysis needed):"
+    assert lines[1] == "- 4.1 Payment: identical to your terms"
+    assert lines[2].endswith("differs only in formatting, punctuation or numbering")
+    assert lines[3].startswith("- 4.1 Payment. The Buyer shall pay each invoice within thirty...")
+    assert "differs only in articles (" in lines[3]
+    assert describe_unchanged([]) == ""
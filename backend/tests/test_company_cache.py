@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+import cache
+from company_cache import CompanyCache
+
+PRIORITIES = [{"priority_name": "Payment", "priority_description": "Net 30 or shorter"}]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+class Store:
+    """Counts priority fetches, like the contract_priorities table would see them."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.fetches = 0
+        self._lock = threading.Lock()
+
+    def fetch(self, company_id):
+        with self._lock:
+            self.fetches += 1
+        time.sleep(self.delay)
+        return list(PRIORITIES)
+
+
+def test_priorities_are_fetched_again_after_ttl(clock):
+    companies = CompanyCache(ttl=60)
+    store = Store()
+    companies.get_priorities("acme", store.fetch)
+    clock[0] += 59
+    companies.get_priorities("acme", store.fetch)
+    assert store.fetches == 1
+
+    clock[0] += 2
+    assert companies.get_priorities("acme", store.fetch) == PRIORITIES
+    assert store.fetches == 2
+
+
+def test_profile_update_invalidates_company_entries():
+    companies = CompanyCache()
+    store = Store()
+    companies.set_profile("user-1", {"id": "acme", "name": "Acme"})
+    priorities = companies.get_priorities("acme", store.fetch)
+    companies.get_prompt("acme", "Acme", priorities, lambda: "prompt")
+
+    companies.invalidate_user("user-1")
+
+    assert companies.get_profile("user-1") is None
+    assert companies.get_prompt("acme", "Acme", priorities, lambda: "rebuilt") == "rebuilt"
+    companies.get_priorities("acme", store.fetch)
+    assert store.fetches == 2
+
+
+def test_prompt_is_rebuilt_for_refetched_priorities_or_new_name():
+    companies = CompanyCache()
+    priorities = list(PRIORITIES)
+    assert companies.get_prompt("acme", "Acme", priorities, lambda: "first") == "first"
+    assert companies.get_prompt("acme", "Acme", priorities, lambda: "second") == "first"
+    assert companies.get_prompt("acme", "Acme", list(PRIORITIES), lambda: "third") == "third"
+    assert companies.get_prompt("acme", "Acme Ltd", priorities, lambda: "fourth") == "fourth"
+
+
+def test_concurrent_misses_fetch_once():
+    companies = CompanyCache()
+    store = Store(delay=0.1)
+    start = threading.Barrier(8)
+    results = []
+
+    def worker():
+        start.wait()
+        results.append(companies.get_priorities("acme", store.fetch))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert store.fetches == 1
+    assert results == [PRIORITIES] * 8
@@ -0,0 +1,58 @@
+import pytest
+
+from extraction import PageExtractor
+from extraction_engines import PyPDF2Engine, text_quality_problem
+from synthetic_contracts import contract_pdf
+
+GOOD_TEXT = "1. PAYMENT TERMS The Lessee shall pay each invoice within thirty days of receipt."
+
+
+@pytest.fixture(scope="module")
+def pdf():
+    return contract_pdf(2)
+
+
+def test_readable_text_passes():
+    assert text_quality_problem(GOOD_TEXT) is None
+
+
+@pytest.mark.parametrize("text, problem", [
+    (None, "only 0 characters"),
+    ("Page 3", "only 6 characters"),
+    ("The Lessee ��� shall pay  each invoice \x07\x07", "garbage ratio"),
+    ("TheLesseeshallpayeachinvoice withinthirtydaysofreceipt", "average word length"),
+    ("T h e L e s s e e shall pay each invoice", "single-letter words"),
+], ids=["empty", "short", "garbage", "run-together", "letter-spaced"])
+def test_unreliable_text_is_flagged(text, problem):
+    assert problem in text_quality_problem(text)
+
+
+def test_good_fast_path_pages_do_not_open_pdfplumber(pdf):
+    with PageExtractor(pdf, fast_path=True) as extractor:
+        pages = [extractor.extract_page(index) for index in range(extractor.page_count())]
+        assert extractor.slow is None
+
+    assert [page.engine for page in pages] == ["pypdf2", "pypdf2"]
+    assert all("Lessee" in page.text for page in pages)
+
+
+@pytest.mark.parametrize("fast_output", [
+    "TheLesseeshallpayeachinvoicewithinthirtydaysofreceipt",
+    RuntimeError("unsupported font encoding"),
+], ids=["low-quality", "error"])
+def test_failed_fast_path_pages_fall_back_to_pdfplumber(pdf, monkeypatch, fast_output):
+    extract = PyPDF2Engine.extract_page
+
+    def first_page_fails(self, index):
+        if index == 0:
+            if isinstance(fast_output, Exception):
+                raise fast_output
+            return fast_output
+        return extract(self, index)
+
+    monkeypatch.setattr(PyPDF2Engine, "extract_page", first_page_fails)
+    with PageExtractor(pdf, fast_path=True) as extractor:
+        pages = [extractor.extract_page(index) for index in range(extractor.page_count())]
+
+    assert [page.engine for page in pages] == ["pdfplumber", "pypdf2"]
+    assert "Lessee" in pages[0].text
@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+
+import cache
+from jobs import JOB_COMPLETED, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, InMemoryJobStore, JobManager
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(InMemoryJobStore(), max_workers=1)
+    yield manager
+    manager.shutdown()
+
+
+def run_to_end(manager, fn, *args, **kwargs):
+    """Submit a job and wait for its done callback; returns (queued record, final record)."""
+    done = threading.Event()
+    final = {}
+
+    def on_done(job):
+        final.update(job)
+        done.set()
+
+    job = manager.submit("user-1", fn, *args, done_callback=on_done, **kwargs)
+    assert done.wait(5)
+    return job, final
+
+
+def test_submitted_job_runs_to_completion(manager):
+    started = threading.Event()
+    release = threading.Event()
+
+    def analysis(name, job_id):
+        started.set()
+        assert release.wait(5)
+        manager.chunk_progress(job_id)(0, 1)
+        return f"summary for {name}"
+
+    done = threading.Event()
+    job = manager.submit("user-1", analysis, "contract.pdf", metadata={"buyer": "contract.pdf"}, done_callback=lambda job: done.set())
+    assert job["status"] == JOB_QUEUED
+    assert started.wait(5)
+    assert manager.get(job["id"])["status"] == JOB_RUNNING
+
+    release.set()
+    assert done.wait(5)
+    result = manager.get(job["id"])
+    assert result["status"] == JOB_COMPLETED
+    assert result["summary"] == "summary for contract.pdf"
+    assert result["completed_chunks"] == [0]
+    assert result["metadata"] == {"buyer": "contract.pdf"}
+
+
+def test_job_that_raises_ends_failed(manager):
+    def analysis(job_id):
+        raise ValueError("could not parse PDF")
+
+    job, final = run_to_end(manager, analysis)
+
+    assert final["status"] == JOB_FAILED
+    assert final["error"] == "could not parse PDF"
+    assert manager.get(job["id"])["status"] == JOB_FAILED
+
+
+def test_finished_jobs_expire_after_retention(clock):
+    store = InMemoryJobStore(retention=60)
+    store.create({"id": "running", "status": JOB_RUNNING})
+    store.create({"id": "finished", "status": JOB_RUNNING})
+    store.update("finished", status=JOB_COMPLETED)
+
+    clock[0] += 59
+    assert store.get("finished")["status"] == JOB_COMPLETED
+    clock[0] += 2
+
+    assert store.get("finished") is None
+    # Unfinished jobs are kept however long they run
+    assert store.get("running")["status"] == JOB_RUNNING
+
+
+def test_only_the_newest_finished_jobs_are_kept():
+    store = InMemoryJobStore(max_finished=2)
+    for n in range(3):
+        store.create({"id": f"job-{n}", "status": JOB_RUNNING})
+        store.update(f"job-{n}", status=JOB_FAILED)
+
+    assert store.get("job-0") is None
+    assert store.get("job-1") and store.get("job-2")
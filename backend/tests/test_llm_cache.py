@@ -0,0 +1,90 @@
+import pytest
+
+import cache
+import process
+from llm_cache import LLMResponseCache, llm_cache_key
+
+PRIORITIES = [{"priority_name": "Payment", "priority_description": "Net 30 or shorter"}]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def key(buyer_chunk):
+    return llm_cache_key("gpt-test", "prompt", "seller", buyer_chunk, 0.3, 2000)
+
+
+def test_key_covers_every_request_parameter():
+    assert key("buyer") == key("buyer")
+    assert key("buyer") != key("buyer 2")
+    assert key("buyer") != llm_cache_key("gpt-test", "prompt", "seller", "buyer", 0.3, 1000)
+
+
+def test_hit_after_set():
+    responses = LLMResponseCache()
+    assert responses.get(key("a")) is None
+    responses.set(key("a"), "analysis")
+
+    assert responses.get(key("a")) == "analysis"
+    assert responses.stats()["hits"] == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    responses = LLMResponseCache(ttl=60)
+    responses.set(key("a"), "analysis")
+    clock[0] += 59
+    assert responses.get(key("a")) == "analysis"
+    clock[0] += 2
+
+    assert responses.get(key("a")) is None
+    assert responses.stats()["expirations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    responses = LLMResponseCache(max_entries=2)
+    responses.set(key("a"), "first")
+    responses.set(key("b"), "second")
+    responses.get(key("a"))
+    responses.set(key("c"), "third")
+
+    assert responses.get(key("b")) is None
+    assert responses.get(key("a")) == "first"
+    assert responses.get(key("c")) == "third"
+
+
+def test_changed_priorities_drop_only_that_companys_responses():
+    responses = LLMResponseCache()
+    assert not responses.observe_priorities("acme", PRIORITIES)
+    responses.set(key("a"), "acme analysis", company_id="acme")
+    responses.set(key("b"), "other analysis", company_id="other")
+
+    assert not responses.observe_priorities("acme", list(PRIORITIES))
+    assert responses.get(key("a")) == "acme analysis"
+
+    assert responses.observe_priorities("acme", [])
+    assert responses.get(key("a")) is None
+    assert responses.get(key("b")) == "other analysis"
+
+
+def test_failed_priority_fetch_keeps_cached_responses(monkeypatch):
+    responses = LLMResponseCache()
+    monkeypatch.setattr(process, "llm_cache", responses)
+    monkeypatch.setattr(process.company_cache, "get_priorities", lambda company_id, fetch: PRIORITIES)
+    process.prepare_system_prompt("Acme", "acme")
+    responses.set(key("a"), "acme analysis", company_id="acme")
+
+    def unavailable(company_id, fetch):
+        raise ConnectionError("priorities unavailable")
+
+    monkeypatch.setattr(process.company_cache, "get_priorities", unavailable)
+    assert "Payment" not in process.prepare_system_prompt("Acme", "acme")
+    assert responses.get(key("a")) == "acme analysis"
+
+    # Priorities fetched again unchanged still match the recorded fingerprint
+    monkeypatch.setattr(process.company_cache, "get_priorities", lambda company_id, fetch: PRIORITIES)
+    assert "Payment" in process.prepare_system_prompt("Acme", "acme")
+    assert responses.get(key("a")) == "acme analysis"
@@ -0,0 +1,39 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from jose import jwt
+
+import auth
+import main
+from cache import LRUCache
+
+SECRET = "test-jwt-secret"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(auth, "SUPABASE_JWT_SECRET", SECRET)
+    monkeypatch.setattr(auth, "token_cache", LRUCache(maxsize=16, ttl=300))
+    monkeypatch.setattr(main, "METRICS_TOKEN", "scraper-token")
+    return TestClient(main.app)
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.mark.parametrize("path", ["/metrics/cache", "/metrics/event-loop"])
+def test_metrics_need_credentials(client, path):
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers=bearer("not-a-token")).status_code == 401
+
+
+@pytest.mark.parametrize("path", ["/metrics/cache", "/metrics/event-loop"])
+def test_metrics_accept_the_metrics_token_or_a_user(client, path):
+    user_token = jwt.encode(
+        {"sub": "user-1", "aud": "authenticated", "exp": int(time.time()) + 3600}, SECRET, algorithm="HS256"
+    )
+
+    assert client.get(path, headers=bearer("scraper-token")).status_code == 200
+    assert client.get(path, headers=bearer(user_token)).status_code == 200
@@ -0,0 +1,76 @@
+import pytest
+from fastapi.testclient import TestClient
+from openai import OpenAI
+
+import analysis_history
+import mock_batch_server
+import offline_batch
+import process
+from analysis_history import InMemoryHistoryStore
+from llm_cache import LLMResponseCache
+from synthetic_contracts import contract_pdf
+
+
+@pytest.fixture
+def mock_api(monkeypatch):
+    """Point offline_batch at the in-process mock, with empty caches and history."""
+    client = OpenAI(api_key="test", base_url="http://testserver/v1", http_client=TestClient(mock_batch_server.app))
+    monkeypatch.setattr(offline_batch, "get_openai_client", lambda: client)
+    monkeypatch.setattr(offline_batch, "llm_cache", LLMResponseCache())
+    monkeypatch.setattr(analysis_history, "history_store", InMemoryHistoryStore())
+    # A small request budget gives several requests per contract
+    monkeypatch.setattr(process, "LLM_REQUEST_TOKEN_BUDGET", 600)
+    monkeypatch.setattr(mock_batch_server.app.state, "fail_every", 0)
+    return mock_batch_server.app.state
+
+
+@pytest.fixture
+def contracts():
+    seller = contract_pdf(2, party="Lessee")
+    buyers = [("renter.pdf", contract_pdf(2, party="Renter")), ("customer.pdf", contract_pdf(2, party="Customer", seed=1))]
+    return seller, buyers
+
+
+def test_reports_every_contract_and_records_clause_history(mock_api, contracts, tmp_path, monkeypatch, capsys):
+    seller, buyers = contracts
+    reports = offline_batch.run_offline_batch(seller, buyers, "Acme", work_dir=str(tmp_path), poll_interval=0)
+
+    assert sorted(reports) == ["customer.pdf", "renter.pdf"]
+    assert all("Mock analysis" in report["summary"] for report in reports.values())
+
+    # Each labeled response was stored per clause, so a rerun without the
+    # response cache reuses every clause instead of sending requests
+    monkeypatch.setattr(offline_batch, "llm_cache", LLMResponseCache())
+    capsys.readouterr()
+    reports = offline_batch.run_offline_batch(seller, buyers, "Acme", work_dir=str(tmp_path), poll_interval=0)
+    assert all("UNCHANGED SINCE A PREVIOUS REVISION" in report["summary"] for report in reports.values())
+    assert "Batch attempt 1: 0 of 0 requests" in capsys.readouterr().out
+
+
+def test_failed_requests_are_retried_in_follow_up_batches(mock_api, contracts, tmp_path, capsys):
+    seller, buyers = contracts
+    mock_api.fail_every = 2
+
+    reports = offline_batch.run_offline_batch(seller, buyers, "Acme", work_dir=str(tmp_path), poll_interval=0, retries=0)
+    assert any("error" in report for report in reports.values())
+
+    reports = offline_batch.run_offline_batch(seller, buyers, "Acme", work_dir=str(tmp_path), poll_interval=0, retries=5)
+    assert all("summary" in report for report in reports.values())
+    assert "Batch attempt 2:" in capsys.readouterr().out
+
+
+def test_seller_template_is_built_once(mock_api, monkeypatch):
+    built = []
+    build = offline_batch.build_seller_template
+
+    def counting_build(*args, **kwargs):
+        built.append(args[1])
+        return build(*args, **kwargs)
+
+    monkeypatch.setattr(offline_batch, "build_seller_template", counting_build)
+    seller_text = "\n".join(["1. PAYMENT", "The Lessee pays within 30 days."])
+    buyers = [(f"buyer{n}.pdf", seller_text.replace("30", str(n))) for n in range(3)]
+
+    contracts = offline_batch.plan_contracts(seller_text, buyers, "Acme")
+    assert len(contracts) == 3
+    assert len(built) == 1
@@ -0,0 +1,153 @@
+import pytest
+
+import rate_limiter
+from rate_limiter import AdaptiveRateLimiter, RateLimitWindow, TokenBucket, backoff_delay, parse_duration
+
+
+@pytest.mark.parametrize(
+    "value, seconds",
+    [
+        ("1s", 1.0),
+        ("6m0s", 360.0),
+        ("120ms", 0.12),
+        ("1h2m3s", 3723.0),
+        ("2.5", 2.5),
+    ],
+)
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == pytest.approx(seconds)
+
+
+@pytest.mark.parametrize("value", [None, "", "soon"])
+def test_parse_duration_unparseable(value):
+    assert parse_duration(value) is None
+
+
+def test_backoff_delay_is_jittered_and_capped():
+    for attempt in range(10):
+        delay = backoff_delay(attempt, base=1.0, maximum=8.0)
+        ceiling = min(8.0, 2 ** attempt)
+        assert ceiling / 2 <= delay <= ceiling
+
+
+def test_token_bucket_rejects_non_positive_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+
+def test_token_bucket_waits_for_refill(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(rate_limiter.time, "sleep", lambda seconds: clock.__setitem__(0, clock[0] + seconds))
+
+    bucket = TokenBucket(rate=2.0, capacity=2)
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == pytest.approx(0.5)
+
+
+def test_window_waits_until_reset_when_quota_is_short():
+    window = RateLimitWindow()
+    window.update(limit=100, remaining=10, reset_after=5.0, now=0.0)
+    assert window.wait_for(5, margin=2, now=1.0) == 0.0
+    assert window.wait_for(9, margin=2, now=1.0) == pytest.approx(4.0)
+
+
+def test_window_restores_limit_after_reset():
+    window = RateLimitWindow()
+    window.update(limit=100, remaining=0, reset_after=5.0, now=0.0)
+    assert window.wait_for(1, margin=0, now=6.0) == 0.0
+    assert window.remaining == 100
+
+
+def test_window_counts_in_flight_reservations():
+    window = RateLimitWindow()
+    window.reserve(30)
+    window.update(limit=100, remaining=80, reset_after=1.0, now=0.0)
+    # The server's count doesn't include the call still in flight
+    assert window.remaining == 50
+    window.finish(30)
+    assert window.in_flight == 0
+
+
+def headers(remaining_requests="99", remaining_tokens="9000", reset="1s", **extra):
+    return {
+        "x-ratelimit-limit-requests": "100",
+        "x-ratelimit-remaining-requests": remaining_requests,
+        "x-ratelimit-reset-requests": reset,
+        "x-ratelimit-limit-tokens": "10000",
+        "x-ratelimit-remaining-tokens": remaining_tokens,
+        "x-ratelimit-reset-tokens": reset,
+        **extra,
+    }
+
+
+def test_limiter_follows_response_headers():
+    limiter = AdaptiveRateLimiter(rate=1000, capacity=10)
+    assert not limiter.stats()["observed"]
+
+    limiter.acquire(500)
+    limiter.update(headers(), 500)
+
+    stats = limiter.stats()
+    assert stats["observed"]
+    assert stats["remaining_requests"] == 99
+    assert stats["remaining_tokens"] == 9000
+
+
+def test_limiter_blocks_when_tokens_would_exceed_quota(monkeypatch):
+    clock = [0.0]
+    slept = []
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: clock[0])
+
+    def sleep(seconds):
+        slept.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(rate_limiter.time, "sleep", sleep)
+    limiter = AdaptiveRateLimiter(rate=1000, capacity=10, margin=0.0)
+    limiter.acquire(100)
+    limiter.update(headers(remaining_tokens="150", reset="2s"), 100)
+
+    assert limiter.acquire(100) == 0.0
+    # Only 50 tokens remain until the window resets
+    assert limiter.acquire(100) == pytest.approx(2.0)
+    assert slept == [pytest.approx(2.0)]
+
+
+def test_throttled_uses_retry_after():
+    limiter = AdaptiveRateLimiter(rate=1000, capacity=10)
+    limiter.acquire(10)
+    delay = limiter.throttled({"retry-after": "3"}, 10)
+    assert 3.0 <= delay <= 3.0 + 0.35
+    assert limiter.stats()["throttles"] == 1
+
+
+def test_throttled_prefers_retry_after_ms():
+    limiter = AdaptiveRateLimiter(rate=1000, capacity=10)
+    limiter.acquire()
+    delay = limiter.throttled({"retry-after-ms": "200", "retry-after": "30"})
+    assert 0.2 <= delay < 1.0
+
+
+def test_throttled_backs_off_without_retry_after(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: clock[0])
+    limiter = AdaptiveRateLimiter(rate=1000, capacity=10, backoff_base=1.0, backoff_max=60.0)
+
+    first = limiter.throttled()
+    assert 0.5 <= first <= 1.0
+    # A second 429 during the same block shares the remaining wait
+    clock[0] = first / 2
+    assert limiter.throttled() == pytest.approx(first / 2)
+    clock[0] = first + 0.01
+    second = limiter.throttled()
+    assert 1.0 <= second <= 2.0
+
+
+def test_release_returns_reservation():
+    limiter = AdaptiveRateLimiter(rate=1000, capacity=10)
+    limiter.acquire(100)
+    assert limiter.tokens.in_flight == 100
+    limiter.release(100)
+    assert limiter.tokens.in_flight == 0
@@ -0,0 +1,39 @@
+import os
+import sys
+import subprocess
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Stands in for backend/.env: only main.py's own load_dotenv call sets the
+# values, so they are applied only if it runs before the modules read them
+CHECK = f"""
+import os
+import dotenv
+
+env_file = os.path.join({BACKEND!r}, ".env")
+settings = {{"LLM_MAX_CONCURRENCY": "7", "MAX_UPLOAD_BYTES": "12345"}}
+
+def load_dotenv(dotenv_path=None, **kwargs):
+    if dotenv_path == env_file:
+        os.environ.update(settings)
+    return True
+
+dotenv.load_dotenv = load_dotenv
+
+import main, process, uploads
+print(process.LLM_MAX_CONCURRENCY, uploads.MAX_UPLOAD_BYTES, main.MAX_UPLOAD_BYTES)
+"""
+
+
+def test_env_file_settings_apply_to_every_module():
+    env = {k: v for k, v in os.environ.items() if k not in ("LLM_MAX_CONCURRENCY", "MAX_UPLOAD_BYTES")}
+    result = subprocess.run(
+        [sys.executable, "-c", CHECK],
+        cwd=BACKEND,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert result.stdout.strip().splitlines()[-1] == "7 12345 12345"
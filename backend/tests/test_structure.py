@@ -0,0 +1,86 @@
+import pytest
+
+from structure import build_clause_tree, heading_level, heading_number, iter_normalized, normalize_text
+
+
+@pytest.mark.parametrize(
+    "line, level",
+    [
+        ("1. PAYMENT TERMS", 1),
+        ("12.3 Payment", 2),
+        ("4.2.1 Late fees", 3),
+        ("Article IV", 1),
+        ("ARTICLE 2", 1),
+        ("Schedule 1", 1),
+        ("Section 5 Fees", 2),
+        ("Section 5.2 Fees", 3),
+        ("CONFIDENTIALITY", 1),
+        ("  GOVERNING LAW  ", 1),
+    ],
+)
+def test_heading_level(line, level):
+    assert heading_level(line) == level
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "",
+        "The Buyer shall pay each invoice.",
+        # A number followed by lower case continues a sentence
+        "12.3 the amount due",
+        # Short all-caps text ending a sentence is not a title
+        "USA.",
+        "NET",
+        "A" * 130,
+    ],
+)
+def test_not_a_heading(line):
+    assert heading_level(line) is None
+
+
+def test_heading_number():
+    assert heading_number("12.3 Payment") == "12.3"
+    assert heading_number("1. PAYMENT TERMS") == "1"
+    assert heading_number("Article IV Definitions") == "Article IV"
+    assert heading_number("CONFIDENTIALITY") is None
+
+
+def test_normalize_text_keeps_clause_and_paragraph_structure():
+    text = "1. TERMS\nThe buyer   shall\npay.\n\nSecond para.\n1.1 Fees\nFee text.\n2. LAW\nLaw text."
+    assert normalize_text(text) == (
+        "1. TERMS\nThe buyer shall pay.\nSecond para."
+        "\n\n1.1 Fees\nFee text."
+        "\n\n2. LAW\nLaw text."
+    )
+
+
+def test_normalize_text_collapses_blank_runs():
+    assert normalize_text("\n\n  One   line\n\n\n\nTwo line  \n\n") == "One line\nTwo line"
+
+
+@pytest.mark.parametrize("page_size", [1, 7, 40, 1000])
+def test_iter_normalized_matches_normalize_text_however_paged(page_size):
+    text = "Preamble\n\n1. TERMS\nThe buyer   shall\npay.\n\n\nSecond para.\n1.1 Fees\nFee text.\n2. LAW\nLaw text.\n"
+    pages = [text[i:i + page_size] for i in range(0, len(text), page_size)]
+    assert "".join(iter_normalized(pages)) == normalize_text(text)
+
+
+def test_build_clause_tree_nests_by_level():
+    root = build_clause_tree(
+        "Preamble text.\n1. TERMS\nTerms body.\n1.1 Fees\nFee text.\n1.2 Taxes\nTax text.\n2. LAW\nLaw text."
+    )
+    assert root.level == 0
+    assert root.text == "Preamble text."
+    assert [(c.number, [g.number for g in c.children]) for c in root.children] == [
+        ("1", ["1.1", "1.2"]),
+        ("2", []),
+    ]
+    fees = root.children[0].children[0]
+    assert fees.heading == "1.1 Fees"
+    assert fees.text == "1.1 Fees\nFee text."
+
+
+def test_walk_is_document_order():
+    root = build_clause_tree("1. TERMS\nA.\n1.1 Fees\nB.\n2. LAW\nC.")
+    assert [node.number for node in root.walk()] == [None, "1", "1.1", "2"]
@@ -0,0 +1,65 @@
+import asyncio
+
+import httpx
+
+import supabase_rest
+from supabase_rest import SupabaseREST, SupabaseTable
+
+
+def test_client_reads_settings_when_started(monkeypatch):
+    # The shared client is created at import, before main.py loads the .env
+    client = SupabaseREST()
+    monkeypatch.setenv("SUPABASE_URL", "https://project.supabase.co")
+    monkeypatch.setenv("SUPABASE_KEY", "service-key")
+
+    async def started():
+        await client.start()
+        try:
+            return client.client.base_url, client.client.headers["apikey"]
+        finally:
+            await client.close()
+
+    base_url, apikey = asyncio.run(started())
+    assert str(base_url).rstrip("/") == "https://project.supabase.co"
+    assert apikey == "service-key"
+
+
+def test_explicit_settings_win_over_environment(monkeypatch):
+    monkeypatch.setenv("SUPABASE_URL", "https://env.supabase.co")
+    client = SupabaseREST(url="https://explicit.supabase.co", key="explicit-key")
+    asyncio.run(client.start())
+    assert client.url == "https://explicit.supabase.co"
+    assert client.client.headers["apikey"] == "explicit-key"
+    asyncio.run(client.close())
+
+
+def test_table_reads_settings_when_built(monkeypatch):
+    monkeypatch.setenv("SUPABASE_URL", "https://tables.supabase.co")
+    monkeypatch.setenv("SUPABASE_KEY", "table-key")
+    monkeypatch.setattr(supabase_rest, "_sync_clients", {})
+    table = SupabaseTable("analysis_jobs")
+    assert str(table.client.base_url).rstrip("/") == "https://tables.supabase.co"
+    assert table.client.headers["authorization"] == "Bearer table-key"
+
+
+def test_public_requests_omit_the_service_key():
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers)
+        return httpx.Response(200, json={"keys": []})
+
+    async def fetch():
+        client = SupabaseREST(url="https://project.supabase.co", key="service-key")
+        client.client = httpx.AsyncClient(
+            base_url=client.url,
+            headers=supabase_rest.service_headers(client.key),
+            transport=httpx.MockTransport(handler),
+        )
+        await client.get("/auth/v1/.well-known/jwks.json", credentials=False)
+        await client.get("/rest/v1/company_profiles")
+        await client.close()
+
+    asyncio.run(fetch())
+    assert "apikey" not in seen[0] and "authorization" not in seen[0]
+    assert seen[1]["apikey"] == "service-key"
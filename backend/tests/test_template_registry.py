@@ -0,0 +1,48 @@
+from dataclasses import asdict
+
+import pytest
+
+import template_registry
+from alignment import SEGMENTER_VERSION, Clause
+from template_registry import InMemoryTemplateStore, TemplateRegistry
+
+
+def stored_template(**fields):
+    record = {
+        "id": "tpl-1",
+        "company_id": "company-1",
+        "filename": "seller.pdf",
+        "uploaded_at": "2024-01-01T00:00:00",
+        "normalized_text": "1. Payment\nThe buyer pays within 30 days.",
+        "clauses": [asdict(Clause(0, "1. Payment", "1. Payment\nThe buyer pays within 30 days."))],
+        "clause_size": 500,
+    }
+    record.update(fields)
+    return record
+
+
+@pytest.fixture
+def built(monkeypatch):
+    """Record the stored clauses each load hands to ``build_seller_template``."""
+    calls = []
+    monkeypatch.setattr(template_registry, "prepare_system_prompt", lambda name, company_id: "prompt")
+
+    def build(text, filename, company_name, company_id, clauses=None, clause_size=None):
+        calls.append(clauses)
+        return object()
+
+    monkeypatch.setattr(template_registry, "build_seller_template", build)
+    return calls
+
+
+@pytest.mark.parametrize("fields, reused", [
+    ({"segmenter_version": SEGMENTER_VERSION}, True),
+    ({"segmenter_version": SEGMENTER_VERSION - 1}, False),
+    ({}, False),
+])
+def test_load_resegments_clauses_from_older_segmenter(built, fields, reused):
+    store = InMemoryTemplateStore()
+    store.create(stored_template(**fields))
+
+    assert TemplateRegistry(store).load("tpl-1", "Acme", "company-1") is not None
+    assert (built[0] is not None) == reused
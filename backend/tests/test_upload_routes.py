@@ -0,0 +1,23 @@
+from fastapi.testclient import TestClient
+
+import main
+
+
+def test_oversized_upload_is_rejected_before_the_body_is_read(monkeypatch):
+    monkeypatch.setattr(main, "upload_request_limit", lambda files: 1000 * files)
+    client = TestClient(main.app)
+
+    response = client.post("/process", files={"buyer_tc": ("b.pdf", b"x" * 5000, "application/pdf")})
+    assert response.status_code == 413
+
+    # Within the limit the request reaches the route, which asks for a login
+    response = client.post("/process", files={"buyer_tc": ("b.pdf", b"x" * 100, "application/pdf")})
+    assert response.status_code == 401
+
+
+def test_batch_route_allows_one_file_per_contract(monkeypatch):
+    monkeypatch.setattr(main, "upload_request_limit", lambda files: 1000 * files)
+    client = TestClient(main.app)
+    files = [("buyer_tcs", (f"b{n}.pdf", b"x" * 800, "application/pdf")) for n in range(3)]
+
+    assert client.post("/process/batch", files=files).status_code == 401
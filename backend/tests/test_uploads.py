@@ -0,0 +1,117 @@
+import os
+import hashlib
+import tempfile
+
+import pytest
+
+from uploads import InvalidPDF, SpooledPDF, UploadTooLarge, adopt_upload, check_pdf_structure, upload_request_limit
+
+
+def pdf_bytes(body: bytes = b"1 0 obj << >> endobj\n", padding: int = 0) -> bytes:
+    """A minimal PDF: header, body and a trailer pointing at its xref table."""
+    content = b"%PDF-1.4\n" + body + b" " * padding
+    xref = len(content)
+    return content + b"xref\n0 1\ntrailer << >>\nstartxref\n" + str(xref).encode() + b"\n%%EOF\n"
+
+
+def framework_file(data: bytes, max_memory: int = 1024 * 1024) -> tempfile.SpooledTemporaryFile:
+    """The file Starlette writes a multipart upload into."""
+    file = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    file.write(data)
+    file.seek(0)
+    return file
+
+
+def spooled(data: bytes, max_memory: int = 1024 * 1024) -> SpooledPDF:
+    with framework_file(data, max_memory) as file:
+        return SpooledPDF.from_spooled(file, "upload.pdf")
+
+
+def test_accepts_well_formed_pdf():
+    with spooled(pdf_bytes()) as upload:
+        check_pdf_structure(upload)
+
+
+def test_accepts_header_after_leading_bytes_and_trailing_data():
+    with spooled(b"\x00" * 100 + pdf_bytes() + b"\n" * 50) as upload:
+        check_pdf_structure(upload)
+
+
+def test_rejects_missing_header():
+    with spooled(pdf_bytes().replace(b"%PDF-", b"%XYZ-")) as upload:
+        with pytest.raises(InvalidPDF, match="not a PDF"):
+            check_pdf_structure(upload)
+
+
+def test_rejects_header_beyond_window():
+    with spooled(b" " * 2048 + pdf_bytes()) as upload:
+        with pytest.raises(InvalidPDF, match="not a PDF"):
+            check_pdf_structure(upload)
+
+
+def test_rejects_truncated_pdf():
+    data = pdf_bytes(padding=5000)
+    with spooled(data[: len(data) // 2]) as upload:
+        with pytest.raises(InvalidPDF, match="truncated"):
+            check_pdf_structure(upload)
+
+
+def test_rejects_xref_offset_outside_file():
+    data = pdf_bytes().replace(b"startxref\n", b"startxref\n9999999")
+    with spooled(data) as upload:
+        with pytest.raises(InvalidPDF, match="outside the file"):
+            check_pdf_structure(upload)
+
+
+def test_trailer_is_found_in_upload_on_disk():
+    with spooled(pdf_bytes(padding=200_000), max_memory=1024) as upload:
+        assert upload.path is not None
+        check_pdf_structure(upload)
+
+
+def test_small_uploads_stay_in_memory():
+    data = pdf_bytes()
+    with spooled(data) as upload:
+        assert upload.path is None
+        assert upload.size == len(data)
+        assert upload.sha256 == hashlib.sha256(data).hexdigest()
+        assert upload.stream().read() == data
+
+
+def test_uploads_on_disk_are_used_without_copying():
+    data = pdf_bytes(padding=10_000)
+    file = framework_file(data, max_memory=1024)
+    upload = SpooledPDF.from_spooled(file, "upload.pdf")
+    # The framework closes its file after the response; the upload outlives it
+    file.close()
+
+    assert upload.sha256 == hashlib.sha256(data).hexdigest()
+    assert upload.size == len(data)
+    first, second = upload.stream(), upload.stream()
+    assert first.read(8) == b"%PDF-1.4"
+    assert second.read() == data
+    with open(upload.path, "rb") as reopened:
+        assert reopened.read() == data
+
+    fd_path = upload.path
+    upload.close()
+    assert upload.path is None
+    assert not os.path.exists(fd_path)
+
+
+@pytest.mark.parametrize("max_memory", [1024 * 1024, 1024])
+def test_rejects_uploads_over_the_limit(max_memory):
+    with framework_file(pdf_bytes(padding=200_000), max_memory) as file:
+        with pytest.raises(UploadTooLarge):
+            SpooledPDF.from_spooled(file, "big.pdf", max_bytes=100_000)
+
+
+def test_adopt_upload_rejects_invalid_structure():
+    with framework_file(b"not a pdf at all") as file:
+        with pytest.raises(InvalidPDF):
+            adopt_upload(file, "notes.txt")
+
+
+def test_upload_request_limit_scales_with_files():
+    assert upload_request_limit(2, max_bytes=1000) - upload_request_limit(1, max_bytes=1000) == 1000
+    assert upload_request_limit(1, max_bytes=1000) > 1000
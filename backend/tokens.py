@@ -0,0 +1,89 @@
+import os
+import re
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Context window (prompt + reply) per model, in tokens
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4o-mini": 128000,
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+}
+DEFAULT_CONTEXT_WINDOW = 16385
+
+# Tokens added by the chat format per message and to prime the reply
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+# Approximates BPE pre-tokenization when no tokenizer is available: words
+# split into ~4 character pieces, digit runs into ~3 digit pieces, and every
+# other symbol is its own token.
+ESTIMATE_PATTERN = re.compile(r"[A-Za-z]+|\d+|\S")
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+
+def context_window(model: str) -> int:
+    override = os.getenv("LLM_CONTEXT_WINDOW")
+    if override:
+        return int(override)
+    return MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+
+
+def get_encoding(model: str):
+    """Return the tiktoken encoding for ``model``, or None if unavailable.
+
+    tiktoken reads its BPE files from ``TIKTOKEN_CACHE_DIR`` when they have
+    been cached there (see the Dockerfile), so no network access is needed at
+    runtime. If the package or its files are missing, token counts fall back
+    to ``estimate_tokens``.
+    """
+    with _encodings_lock:
+        if model in _encodings:
+            return _encodings[model]
+        try:
+            import tiktoken
+
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning(f"Tokenizer unavailable for {model}, estimating token counts: {str(e)}")
+            encoding = None
+        _encodings[model] = encoding
+        return encoding
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate a BPE token count without a tokenizer."""
+    count = 0
+    for piece in ESTIMATE_PATTERN.findall(text):
+        if piece[0].isalpha():
+            count += (len(piece) + 3) // 4
+        elif piece[0].isdigit():
+            count += (len(piece) + 2) // 3
+        else:
+            count += 1
+    return count
+
+
+def count_tokens(text: str, model: str) -> int:
+    if not text:
+        return 0
+    encoding = get_encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: list, model: str) -> int:
+    """Count the prompt tokens for a list of chat messages."""
+    return TOKENS_PER_REPLY + sum(
+        TOKENS_PER_MESSAGE + count_tokens(message["content"], model)
+        for message in messages
+    )
@@ -0,0 +1,149 @@
+import os
+import io
+import re
+import mmap
+import hashlib
+from typing import BinaryIO, Optional, Union
+
+# Largest PDF accepted per uploaded file
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_READ_SIZE = 64 * 1024
+# Form fields, part headers and boundaries around the files in one request
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Readers accept a header anywhere in the first KiB and trailing bytes after %%EOF
+HEADER_WINDOW = 1024
+TRAILER_WINDOW = 2048
+STARTXREF = re.compile(rb"startxref\s+(\d+)\s+%%EOF")
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class InvalidPDF(ValueError):
+    pass
+
+
+class SpooledPDF:
+    """A PDF upload, as bytes when small and as a file on disk otherwise.
+
+    Wraps the ``SpooledTemporaryFile`` the web framework wrote while parsing
+    the form rather than copying it; the file is only read to compute the
+    SHA-256 used by the extraction cache. ``stream()`` returns a read-only
+    view for the parser: the bytes themselves, or a memory map of the file,
+    so nothing is copied.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.size = 0
+        self.sha256: Optional[str] = None
+        # Duplicated descriptor of an upload on disk, so it outlives the
+        # framework closing its own file object after the response
+        self._fd: Optional[int] = None
+        self._buffer: Union[bytes, mmap.mmap, None] = None
+
+    @classmethod
+    def from_spooled(cls, file, filename: str, max_bytes: int = MAX_UPLOAD_BYTES) -> "SpooledPDF":
+        """Wrap a ``SpooledTemporaryFile``, rejecting it past ``max_bytes``."""
+        upload = cls(filename)
+        digest = hashlib.sha256()
+        file.seek(0)
+        try:
+            in_memory = isinstance(file, io.BytesIO) or not getattr(file, "_rolled", True)
+            blocks = []
+            while True:
+                block = file.read(UPLOAD_READ_SIZE)
+                if not block:
+                    break
+                upload.size += len(block)
+                if upload.size > max_bytes:
+                    raise UploadTooLarge(f"File too large. Maximum size is {max_bytes // (1024 * 1024)}MB")
+                digest.update(block)
+                if in_memory:
+                    blocks.append(block)
+            upload.sha256 = digest.hexdigest()
+            if in_memory:
+                # No larger than the framework's in-memory spool size
+                upload._buffer = b"".join(blocks)
+            else:
+                upload._fd = os.dup(file.fileno())
+                upload._buffer = mmap.mmap(upload._fd, 0, access=mmap.ACCESS_READ) if upload.size else b""
+            return upload
+        except Exception:
+            upload.close()
+            raise
+
+    @property
+    def path(self) -> Optional[str]:
+        """Path the upload can be opened at, or None while it is held in memory.
+
+        The framework's temp file has no name; on Linux it is reachable
+        through its descriptor under ``/proc``, also from extraction workers.
+        """
+        if self._fd is not None and os.path.isdir(f"/proc/{os.getpid()}/fd"):
+            return f"/proc/{os.getpid()}/fd/{self._fd}"
+        return None
+
+    @property
+    def buffer(self) -> Union[bytes, mmap.mmap]:
+        return self._buffer
+
+    def stream(self) -> BinaryIO:
+        """A new binary stream over the upload, with its own read position."""
+        if self._fd is not None and self.size:
+            return mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+        # BytesIO shares an immutable bytes object until it is written to
+        return io.BytesIO(self._buffer)
+
+    def close(self):
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+        self._buffer = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# What the extraction pipeline accepts as a PDF
+PDFContent = Union[bytes, SpooledPDF]
+
+
+def check_pdf_structure(upload: SpooledPDF):
+    """Reject uploads without a PDF header or a trailer pointing at an xref.
+
+    Only the first and last few KiB are read. A truncated upload loses its
+    ``startxref ... %%EOF`` trailer, so it is caught here instead of deep
+    inside the parser.
+    """
+    buffer = upload.buffer
+    if buffer.find(b"%PDF-", 0, HEADER_WINDOW) < 0:
+        raise InvalidPDF("File is not a PDF document")
+    match = STARTXREF.search(buffer[max(0, upload.size - TRAILER_WINDOW):])
+    if not match:
+        raise InvalidPDF("PDF is truncated or has no cross-reference table")
+    if int(match.group(1)) >= upload.size:
+        raise InvalidPDF("PDF cross-reference offset is outside the file")
+
+
+def upload_request_limit(files: int, max_bytes: int = MAX_UPLOAD_BYTES) -> int:
+    """Largest request body accepted for a form carrying up to ``files`` PDFs."""
+    return files * max_bytes + MULTIPART_OVERHEAD
+
+
+def adopt_upload(file: BinaryIO, filename: str, max_bytes: int = MAX_UPLOAD_BYTES) -> SpooledPDF:
+    """Wrap an upload the framework already spooled and check its structure."""
+    upload = SpooledPDF.from_spooled(file, filename, max_bytes)
+    try:
+        check_pdf_structure(upload)
+        return upload
+    except Exception:
+        upload.close()
+        raise